@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+"""
+Замеры производительности расчетных этапов на синтетических сетях.
+Запуск из корня проекта:  python -m benchmarks.run --output results.json
+Сравнение двух запусков:  python -m benchmarks.compare old.json new.json
+"""
@@ -0,0 +1,56 @@
+# benchmarks/compare.py
+
+import argparse
+import json
+import sys
+
+# Замедление (или рост памяти) больше чем на столько считается регрессией
+DEFAULT_TOLERANCE = 0.2
+
+
+def _key(entry: dict):
+    return entry["stage"], entry["layout"], entry["traffic"], entry["nodes"]
+
+
+def compare(base: dict, new: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """Строки сравнения (ключ, время до/после, память до/после, регрессия) для замеров, есть в обоих файлах."""
+    base_entries = {_key(e): e for e in base["results"] if "time_s" in e}
+    rows = []
+    for entry in new["results"]:
+        old = base_entries.get(_key(entry))
+        if old is None or "time_s" not in entry:
+            continue
+        time_ratio = entry["time_s"] / old["time_s"] if old["time_s"] > 0 else 1.0
+        memory_ratio = None
+        if entry.get("peak_mb") is not None and old.get("peak_mb"):
+            memory_ratio = entry["peak_mb"] / old["peak_mb"]
+        regression = time_ratio > 1 + tolerance or (memory_ratio is not None and memory_ratio > 1 + tolerance)
+        rows.append((_key(entry), old, entry, time_ratio, memory_ratio, regression))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сравнение двух запусков benchmarks.run")
+    parser.add_argument("base", help="JSON базового запуска")
+    parser.add_argument("new", help="JSON нового запуска")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимый относительный рост времени и памяти")
+    args = parser.parse_args(argv)
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = compare(base, new, args.tolerance)
+    for (stage, layout, traffic, nodes), old, entry, time_ratio, memory_ratio, regression in rows:
+        memory = f"память x{memory_ratio:.2f}" if memory_ratio is not None else ""
+        mark = "  РЕГРЕССИЯ" if regression else ""
+        print(f"{stage:15} {layout:9} {traffic:7} N={nodes:<7} "
+              f"{old['time_s']:.4f} -> {entry['time_s']:.4f} с (x{time_ratio:.2f}) {memory}{mark}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"Сравнено замеров: {len(rows)}, регрессий: {regressions}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/generators.py
+
+import math
+from typing import Dict, List
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+
+# Средний шаг между соседними узлами (в пикселях холста): поле растет вместе с числом узлов
+NODE_SPACING = 30
+# Сколько соседей по каждой из осей рассматривается как кандидаты в рёбра остова
+NEIGHBOUR_WINDOW = 8
+# Разреженная нагрузка: число получателей у каждого узла
+SPARSE_DESTINATIONS = 3
+# Суммарный трафик гравитационной модели на узел, Мбит/с
+GRAVITY_TRAFFIC_PER_NODE = 2.0
+
+
+def _field_size(n: int) -> int:
+    return max(100, int(NODE_SPACING * math.sqrt(n)))
+
+
+def _make_nodes(xy: np.ndarray) -> Dict[int, Node]:
+    return {i: Node(id=i, name=f"N{i}", position=(int(x), int(y)), cost=10.0)
+            for i, (x, y) in enumerate(xy.tolist())}
+
+
+# --- Расположение узлов ---
+
+def geometric_nodes(n: int, seed: int) -> Dict[int, Node]:
+    """Узлы, равномерно разбросанные по квадратному полю."""
+    rng = np.random.default_rng(seed)
+    return _make_nodes(rng.uniform(0, _field_size(n), size=(n, 2)))
+
+
+def grid_nodes(n: int, seed: int) -> Dict[int, Node]:
+    """Узлы в узлах квадратной решетки (построчно); seed не влияет на результат."""
+    side = math.ceil(math.sqrt(n))
+    k = np.arange(n)
+    return _make_nodes(np.column_stack([k % side, k // side]) * NODE_SPACING)
+
+
+def clustered_nodes(n: int, seed: int) -> Dict[int, Node]:
+    """Узлы, сгруппированные в кластеры (города) с нормальным разбросом вокруг центров."""
+    rng = np.random.default_rng(seed)
+    size = _field_size(n)
+    clusters = max(2, round(math.sqrt(n) / 3))
+    centres = rng.uniform(0.1 * size, 0.9 * size, size=(clusters, 2))
+    members = rng.integers(0, clusters, size=n)
+    spread = size / (2 * math.sqrt(clusters))
+    xy = centres[members] + rng.normal(0, spread / 3, size=(n, 2))
+    return _make_nodes(np.clip(xy, 0, size))
+
+
+LAYOUTS = {"geometric": geometric_nodes, "grid": grid_nodes, "clustered": clustered_nodes}
+
+
+# --- Топология ---
+
+def build_topology(nodes: Dict[int, Node], seed: int) -> List[Edge]:
+    """
+    Топология того же вида, что строит Этап 1: остов минимальной длины плюс резервное
+    ребро от каждого листа к случайному узлу. prim_mst для больших сетей не годится
+    (O(N^2) памяти), поэтому остов ищется Краскалом среди ближайших соседей по осям:
+    NEIGHBOUR_WINDOW следующих узлов в порядке сортировки по x и по y. Цепочка по x
+    уже связывает все узлы, так что остов всегда получается.
+    """
+    ids = list(nodes.keys())
+    n = len(ids)
+    if n < 2:
+        return []
+    xy = np.array([nodes[i].position for i in ids], dtype=np.float64)
+    parts = []
+    for axis in (0, 1):
+        order = np.argsort(xy[:, axis], kind='stable')
+        for shift in range(1, min(NEIGHBOUR_WINDOW, n - 1) + 1):
+            parts.append(np.column_stack([order[:-shift], order[shift:]]))
+    pairs = np.concatenate(parts)
+    lengths = np.hypot(*(xy[pairs[:, 0]] - xy[pairs[:, 1]]).T)
+    pairs = pairs[np.argsort(lengths, kind='stable')].tolist()
+
+    # Краскал с системой непересекающихся множеств
+    root = list(range(n))
+
+    def find(a):
+        while root[a] != a:
+            root[a] = root[root[a]]
+            a = root[a]
+        return a
+
+    links = set()
+    degree = [0] * n
+    for a, b in pairs:
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            root[ra] = rb
+            links.add((min(a, b), max(a, b)))
+            degree[a] += 1
+            degree[b] += 1
+            if len(links) == n - 1:
+                break
+
+    # Резервные рёбра листьев, как на Этапе 1
+    rng = np.random.default_rng(seed)
+    for leaf in [i for i in range(n) if degree[i] == 1]:
+        for target in rng.integers(0, n, size=4).tolist():
+            key = (min(leaf, target), max(leaf, target))
+            if target != leaf and key not in links:
+                links.add(key)
+                break
+
+    edges = []
+    for a, b in sorted(links):
+        length = float(np.hypot(*(xy[a] - xy[b])))
+        edges.append(Edge(from_id=ids[a], to_id=ids[b], length=length))
+    return edges
+
+
+# --- Матрицы нагрузки ---
+
+def dense_traffic(nodes: Dict[int, Node], seed: int) -> List[TrafficDemand]:
+    """Требование между каждой упорядоченной парой узлов, объем 0.1..2 Мбит/с."""
+    rng = np.random.default_rng(seed)
+    ids = list(nodes.keys())
+    n = len(ids)
+    volumes = rng.uniform(0.1, 2.0, size=(n, n)).round(2).tolist()
+    return [TrafficDemand(from_id=ids[i], to_id=ids[j], volume=volumes[i][j])
+            for i in range(n) for j in range(n) if i != j]
+
+
+def sparse_traffic(nodes: Dict[int, Node], seed: int) -> List[TrafficDemand]:
+    """У каждого узла SPARSE_DESTINATIONS случайных получателей, объем 0.5..5 Мбит/с."""
+    rng = np.random.default_rng(seed)
+    ids = list(nodes.keys())
+    n = len(ids)
+    if n < 2:
+        return []
+    targets = rng.integers(0, n - 1, size=(n, SPARSE_DESTINATIONS))
+    targets += targets >= np.arange(n)[:, None]  # без требований к самому себе
+    volumes = rng.uniform(0.5, 5.0, size=targets.shape).round(2)
+    demands = {}
+    for i, row in enumerate(targets.tolist()):
+        for j, volume in zip(row, volumes[i].tolist()):
+            demands[(ids[i], ids[j])] = volume
+    return [TrafficDemand(from_id=a, to_id=b, volume=v) for (a, b), v in demands.items()]
+
+
+def gravity_traffic(nodes: Dict[int, Node], seed: int) -> List[TrafficDemand]:
+    """
+    Гравитационная модель: трафик пары пропорционален произведению "масс" узлов
+    (логнормальные веса, как население городов); суммарно GRAVITY_TRAFFIC_PER_NODE на узел.
+    """
+    rng = np.random.default_rng(seed)
+    ids = list(nodes.keys())
+    n = len(ids)
+    mass = rng.lognormal(0.0, 1.0, size=n)
+    volumes = np.outer(mass, mass)
+    np.fill_diagonal(volumes, 0.0)
+    volumes *= GRAVITY_TRAFFIC_PER_NODE * n / volumes.sum()
+    volumes = volumes.round(3).tolist()
+    return [TrafficDemand(from_id=ids[i], to_id=ids[j], volume=volumes[i][j])
+            for i in range(n) for j in range(n) if i != j and volumes[i][j] > 0]
+
+
+TRAFFIC = {"dense": dense_traffic, "sparse": sparse_traffic, "gravity": gravity_traffic}
+
+
+def traffic_size(kind: str, n: int) -> int:
+    """Число требований, которое создаст генератор (без построения), - чтобы заранее отсечь гигантские."""
+    return n * SPARSE_DESTINATIONS if kind == "sparse" else n * (n - 1)
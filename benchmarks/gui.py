@@ -0,0 +1,236 @@
+# benchmarks/gui.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.generators import LAYOUTS, TRAFFIC
+from benchmarks.stages import Workload
+
+GUI_TIERS = (200, 1_000)
+# Сколько перетаскиваний узлов, протяжек рёбер и щелчков проигрывается
+DRAGS = 10
+EDGE_DRAWS = 5
+CLICKS = 50
+# Шагов мыши в одном перетаскивании (каждый шаг - кадр)
+DRAG_STEPS = 20
+DIALOG_OPENS = 3
+
+
+def _stats(name: str, samples, workload: Workload) -> dict:
+    """Запись результата в формате benchmarks.run: time_s - медиана, чтобы compare мог сравнивать."""
+    ms = np.asarray(samples) * 1000
+    return {"stage": name, "layout": workload.layout, "traffic": workload.traffic, "nodes": workload.size,
+            "count": len(ms), "time_s": float(np.median(ms)) / 1000, "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)), "max_ms": float(ms.max()), "peak_mb": None}
+
+
+class InteractionReplay:
+    """Большой сгенерированный проект в MainWindow и проигрывание сценария действий пользователя."""
+
+    def __init__(self, workload: Workload, seed: int):
+        # Импорт здесь: платформа Qt и домашний каталог уже подменены в main()
+        from PyQt6.QtWidgets import QApplication
+        import main_app
+        from stage3_logic import accumulate_flows
+        import topology_versions as tv
+
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.workload = workload
+        self.rng = np.random.default_rng(seed)
+        window = main_app.MainWindow()
+        window.nodes.update(workload.nodes)
+        for edge in workload.edges:
+            edge.cost = window._calculate_cost_from_length(edge.length)
+        window.edges.extend(workload.edges)
+        window.demands = workload.demands
+        window.versions.bump_all()
+        routes = window.get_routes()
+        accumulate_flows(window.edges, routes, window.demands, window.get_edge_index())
+        for edge in window.edges:
+            window._assign_capacity(edge)
+        window.versions.bump(tv.CAPACITIES)
+        window.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+
+        xy = np.array([node.position for node in workload.nodes.values()])
+        field = int(xy.max()) + 60 if len(xy) else 600
+        window.resize(max(1420, field + 500), max(822, field + 100))
+        window.show()
+        self.app.processEvents()
+        self.window = window
+        self.canvas = window.drawingCanvas
+
+    # --- Низкоуровневые события ---
+
+    def _send(self, kind, x: int, y: int):
+        from PyQt6.QtCore import QEvent, QPointF, Qt
+        from PyQt6.QtGui import QMouseEvent
+        types = {"press": QEvent.Type.MouseButtonPress, "move": QEvent.Type.MouseMove,
+                 "release": QEvent.Type.MouseButtonRelease}
+        button = Qt.MouseButton.NoButton if kind == "move" else Qt.MouseButton.LeftButton
+        buttons = Qt.MouseButton.NoButton if kind == "release" else Qt.MouseButton.LeftButton
+        point = QPointF(x, y)
+        event = QMouseEvent(types[kind], point, self.canvas.mapToGlobal(point), button, buttons,
+                            Qt.KeyboardModifier.NoModifier)
+        self.app.sendEvent(self.canvas, event)
+
+    def _frame(self, frames: list):
+        """Синхронная перерисовка холста: время одного кадра (paintEvent)."""
+        start = time.perf_counter()
+        self.canvas.repaint()
+        frames.append(time.perf_counter() - start)
+
+    def _random_node(self):
+        ids = list(self.window.nodes)
+        return self.window.nodes[ids[int(self.rng.integers(len(ids)))]]
+
+    # --- Сценарии ---
+
+    def replay_drags(self, frames: list, presses: list):
+        """Перетаскивание узлов в режиме перемещения: нажатие, DRAG_STEPS шагов, отпускание."""
+        self.window.is_move_mode = True
+        for _ in range(DRAGS):
+            x, y = self._random_node().position
+            dx, dy = self.rng.integers(-150, 150, size=2)
+            start = time.perf_counter()
+            self._send("press", x, y)
+            presses.append(time.perf_counter() - start)
+            self._frame(frames)
+            for step in range(1, DRAG_STEPS + 1):
+                self._send("move", x + dx * step // DRAG_STEPS, y + dy * step // DRAG_STEPS)
+                self._frame(frames)
+            self._send("release", x + dx, y + dy)
+            self._frame(frames)
+
+    def replay_edge_draws(self, frames: list, presses: list):
+        """Протяжка нового ребра от узла к узлу."""
+        self.window.is_move_mode = False
+        for _ in range(EDGE_DRAWS):
+            (x1, y1), (x2, y2) = self._random_node().position, self._random_node().position
+            start = time.perf_counter()
+            self._send("press", x1, y1)
+            presses.append(time.perf_counter() - start)
+            for step in range(1, DRAG_STEPS + 1):
+                self._send("move", x1 + (x2 - x1) * step // DRAG_STEPS, y1 + (y2 - y1) * step // DRAG_STEPS)
+                self._frame(frames)
+            self._send("release", x2, y2)
+            self._frame(frames)
+
+    def replay_clicks(self, frames: list, presses: list):
+        """Щелчки по серединам рёбер и пустым местам (выделение и снятие выделения)."""
+        nodes, edges = self.window.nodes, self.window.edges
+        for i in range(CLICKS):
+            if i % 2 and edges:
+                edge = edges[int(self.rng.integers(len(edges)))]
+                (x1, y1), (x2, y2) = nodes[edge.from_id].position, nodes[edge.to_id].position
+                x, y = (x1 + x2) // 2, (y1 + y2) // 2
+            else:
+                x, y = (int(v) for v in self.rng.integers(0, self.canvas.width(), size=2))
+            start = time.perf_counter()
+            self._send("press", x, y)
+            presses.append(time.perf_counter() - start)
+            self._send("release", x, y)
+            self._frame(frames)
+
+    def hit_tests(self):
+        """Задержка поиска узла и ребра под курсором в разных точках холста."""
+        from PyQt6.QtCore import QPoint
+        node_times, edge_times = [], []
+        for _ in range(CLICKS):
+            x, y = (int(v) for v in self.rng.integers(0, self.canvas.width(), size=2))
+            start = time.perf_counter()
+            self.canvas._get_node_at(QPoint(x, y))
+            node_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            self.canvas._get_edge_at(QPoint(x, y))
+            edge_times.append(time.perf_counter() - start)
+        return node_times, edge_times
+
+    def open_routes_dialog(self):
+        """Открытие окна маршрутов с нуля (маршруты уже рассчитаны)."""
+        times = []
+        for _ in range(DIALOG_OPENS):
+            dialog = self.window.routes_dialog
+            if dialog is not None:
+                # Закрытие окна сбрасывает routes_dialog в главном окне
+                dialog.close()
+                dialog.deleteLater()
+            self.app.processEvents()
+            start = time.perf_counter()
+            self.window.calculate_routes()
+            self.app.processEvents()
+            times.append(time.perf_counter() - start)
+        return times
+
+    def open_evaluation_dialog(self):
+        """Полная оценка проекта (Этап 4) до появления модального окна; окно закрывается таймером."""
+        from PyQt6.QtCore import QTimer
+
+        times = []
+        for _ in range(DIALOG_OPENS):
+            start = [0.0]
+
+            def close_dialog():
+                times.append(time.perf_counter() - start[0])
+                self.app.activeModalWidget().done(0)
+
+            QTimer.singleShot(0, close_dialog)
+            start[0] = time.perf_counter()
+            self.window.evaluate_project()
+        return times
+
+    def run(self) -> list:
+        frames, presses = [], []
+        self.replay_drags(frames, presses)
+        self.replay_edge_draws(frames, presses)
+        self.replay_clicks(frames, presses)
+        node_times, edge_times = self.hit_tests()
+        routes_times = self.open_routes_dialog()
+        evaluation_times = self.open_evaluation_dialog()
+        w = self.workload
+        return [_stats("gui_paint_frame", frames, w), _stats("gui_mouse_press", presses, w),
+                _stats("gui_hit_test_node", node_times, w), _stats("gui_hit_test_edge", edge_times, w),
+                _stats("gui_routes_dialog", routes_times, w), _stats("gui_evaluation_dialog", evaluation_times, w)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры отклика интерфейса на сгенерированном проекте")
+    parser.add_argument("--tiers", nargs="+", type=int, default=list(GUI_TIERS), help="числа узлов")
+    parser.add_argument("--layout", choices=list(LAYOUTS), default="geometric")
+    parser.add_argument("--traffic", choices=list(TRAFFIC), default="sparse")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл JSON с результатами (формат benchmarks.run)")
+    args = parser.parse_args(argv)
+
+    # Без экрана, а кэш и автосохранение - во временном каталоге: замеры не трогают
+    # данные пользователя и не ускоряются кэшем прошлых запусков
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ntd_gui_bench_", ignore_cleanup_errors=True) as home:
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        for size in sorted(args.tiers):
+            replay = InteractionReplay(Workload(args.layout, args.traffic, size, args.seed), args.seed)
+            for entry in replay.run():
+                print(f"{entry['stage']:22} N={size:<6} p50 {entry['p50_ms']:9.3f} мс  "
+                      f"p99 {entry['p99_ms']:9.3f} мс  ({entry['count']} замеров)")
+                results.append(entry)
+            replay.window.journal_timer.stop()
+            replay.window.close()
+
+    report = {"meta": {"created": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+                       "qt_platform": os.environ["QT_QPA_PLATFORM"], "seed": args.seed},
+              "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
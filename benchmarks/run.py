@@ -0,0 +1,110 @@
+# benchmarks/run.py
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.generators import LAYOUTS, TRAFFIC
+from benchmarks.stages import STAGES, Workload
+
+TIERS = (100, 1_000, 10_000, 100_000)
+# Этап не запускаем, если по времени предыдущего размера он займет дольше, с
+DEFAULT_TIME_BUDGET = 60.0
+
+
+def measure(run, repeat: int, memory: bool) -> dict:
+    """Лучшее из repeat времен и (отдельным прогоном под tracemalloc) пиковая память."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    result = {"time_s": min(times), "times_s": times, "peak_mb": None}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(stages, tiers, layouts, traffic, seed: int = 1, repeat: int = 3, memory: bool = True,
+                   time_budget: float = DEFAULT_TIME_BUDGET, log=print) -> dict:
+    """Все сочетания этап x расположение x нагрузка x размер; итог - словарь для JSON."""
+    results = []
+    for layout in layouts:
+        for kind in traffic:
+            # Время предыдущего размера по каждому этапу - для прогноза следующего
+            previous = {}
+            for size in sorted(tiers):
+                workload = Workload(layout, kind, size, seed)
+                for name in stages:
+                    stage = STAGES[name]
+                    entry = {"stage": name, "layout": layout, "traffic": kind, "nodes": size}
+                    reason = stage.too_large(workload)
+                    if not reason and name in previous:
+                        last_size, last_time = previous[name]
+                        predicted = last_time * (size / last_size) ** stage.growth
+                        if predicted > time_budget:
+                            reason = f"прогноз {predicted:.0f} с > {time_budget:.0f} с"
+                    if reason:
+                        entry["skipped"] = reason
+                        log(f"{name:15} {layout:9} {kind:7} N={size:<7} пропущен: {reason}")
+                        results.append(entry)
+                        continue
+                    run = stage.prepare(workload)
+                    entry.update(edges=len(workload.edges), demands=len(workload.demands)
+                                 if "demands" in workload.__dict__ else None)
+                    entry.update(measure(run, repeat, memory))
+                    previous[name] = (size, entry["time_s"])
+                    peak = f"{entry['peak_mb']:.1f} МБ" if entry["peak_mb"] is not None else "-"
+                    log(f"{name:15} {layout:9} {kind:7} N={size:<7} {entry['time_s']:.4f} с  {peak}")
+                    results.append(entry)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры расчетных этапов на синтетических сетях")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--tiers", nargs="+", type=int, default=list(TIERS), help="числа узлов")
+    parser.add_argument("--layouts", nargs="+", choices=list(LAYOUTS), default=["geometric"])
+    parser.add_argument("--traffic", nargs="+", choices=list(TRAFFIC), default=["sparse"])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="не замерять пиковую память (быстрее)")
+    parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET,
+                        help="пропускать этапы, которые по прогнозу займут дольше, с")
+    parser.add_argument("--output", help="файл JSON с результатами")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.stages, args.tiers, args.layouts, args.traffic, args.seed, args.repeat,
+                            not args.no_memory, args.time_budget)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/stages.py
+
+from collections import deque
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+from graph_algorithms import prim_mst, dijkstra_all_pairs_hops, calculate_edge_delays, dijkstra_max_delay_path
+from stage3_logic import build_edge_index, accumulate_flows, select_capacity
+from tariffs import DEFAULT_CATALOGUE
+from benchmarks.generators import LAYOUTS, TRAFFIC, build_topology, traffic_size
+
+# Тарифы Этапа 3 (встроенный каталог)
+TARIFFS = DEFAULT_CATALOGUE.capacities
+AVG_PACKET_SIZE_BITS = 12000
+# Больше пар узлов (элементов размера N^2) не строим: не хватит памяти
+MAX_PAIRS = 4_000_000
+MAX_DEMANDS = 2_000_000
+
+
+@dataclass
+class Workload:
+    """Синтетическая сеть одного размера; части строятся по требованию и запоминаются."""
+    layout: str
+    traffic: str
+    size: int
+    seed: int
+
+    @cached_property
+    def nodes(self) -> Dict[int, Node]:
+        return LAYOUTS[self.layout](self.size, self.seed)
+
+    @cached_property
+    def edges(self) -> List[Edge]:
+        return build_topology(self.nodes, self.seed)
+
+    @cached_property
+    def demands(self) -> List[TrafficDemand]:
+        return TRAFFIC[self.traffic](self.nodes, self.seed + 1)
+
+    @cached_property
+    def demand_routes(self) -> Dict[Tuple[int, int], List[int]]:
+        """
+        Маршруты требований - пути по дереву обхода в ширину от первого узла.
+        Они не кратчайшие, зато строятся за O(N + суммарная длина путей) и для 100k узлов;
+        замеряется цикл прогона потоков Этапа 3, а не поиск маршрутов.
+        """
+        adj = {node_id: [] for node_id in self.nodes}
+        for edge in self.edges:
+            adj[edge.from_id].append(edge.to_id)
+            adj[edge.to_id].append(edge.from_id)
+        root = next(iter(self.nodes))
+        parent, depth = {root: None}, {root: 0}
+        queue = deque([root])
+        while queue:
+            u = queue.popleft()
+            for v in adj[u]:
+                if v not in parent:
+                    parent[v], depth[v] = u, depth[u] + 1
+                    queue.append(v)
+        routes = {}
+        for demand in self.demands:
+            a, b = demand.from_id, demand.to_id
+            head, tail = [a], [b]
+            while a != b:
+                if depth[a] >= depth[b]:
+                    a = parent[a]
+                    head.append(a)
+                else:
+                    b = parent[b]
+                    tail.append(b)
+            routes[(demand.from_id, demand.to_id)] = head + tail[-2::-1]
+        return routes
+
+    def load_edges(self):
+        """Потоки и пропускные способности для замеров задержек: загрузка каналов 10..95%."""
+        rng = np.random.default_rng(self.seed + 2)
+        capacities = rng.choice(TARIFFS[1:], size=len(self.edges)).tolist()
+        utilization = rng.uniform(0.1, 0.95, size=len(self.edges)).tolist()
+        for edge, capacity, load in zip(self.edges, capacities, utilization):
+            edge.capacity = float(capacity)
+            edge.flow = capacity * load
+
+
+@dataclass
+class Stage:
+    """Замеряемый этап: prepare готовит данные (не замеряется) и возвращает замеряемый вызов."""
+    name: str
+    prepare: Callable[[Workload], Callable[[], object]]
+    growth: float                          # ожидаемый показатель роста времени: T ~ N^growth
+    too_large: Callable[[Workload], str]   # причина не запускать этап на этом размере ("" - можно)
+
+
+def _pairs_limit(workload: Workload) -> str:
+    return f"N^2 > {MAX_PAIRS}" if workload.size ** 2 > MAX_PAIRS else ""
+
+
+def _demands_limit(workload: Workload) -> str:
+    count = traffic_size(workload.traffic, workload.size)
+    return f"{count} требований > {MAX_DEMANDS}" if count > MAX_DEMANDS else ""
+
+
+def _no_limit(workload: Workload) -> str:
+    return ""
+
+
+def _prepare_stage3(workload: Workload):
+    routes, demands, edges = workload.demand_routes, workload.demands, workload.edges
+    edge_index = build_edge_index(edges)
+
+    def run():
+        accumulate_flows(edges, routes, demands, edge_index)
+        for edge in edges:
+            edge.capacity = select_capacity(edge.flow, TARIFFS)
+
+    return run
+
+
+def _prepare_edge_delays(workload: Workload):
+    workload.load_edges()
+    return lambda: calculate_edge_delays(workload.edges, AVG_PACKET_SIZE_BITS)
+
+
+def _prepare_max_delay(workload: Workload):
+    workload.load_edges()
+    calculate_edge_delays(workload.edges, AVG_PACKET_SIZE_BITS)
+    return lambda: dijkstra_max_delay_path(workload.nodes, workload.edges)
+
+
+STAGES = {
+    "prim_mst": Stage("prim_mst", lambda w: (lambda: prim_mst(w.nodes)), 2.0, _pairs_limit),
+    "all_pairs_hops": Stage("all_pairs_hops", lambda w: (lambda: dijkstra_all_pairs_hops(w.nodes, w.edges)),
+                            2.0, _pairs_limit),
+    "stage3_flows": Stage("stage3_flows", _prepare_stage3, 1.0, _demands_limit),
+    "edge_delays": Stage("edge_delays", _prepare_edge_delays, 1.0, _no_limit),
+    "max_delay_path": Stage("max_delay_path", _prepare_max_delay, 2.0, _no_limit),
+}
@@ -0,0 +1,199 @@
+# capacity_optimizer.py
+
+import heapq
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+
+from network_arrays import DemandRoutes, mm1_delays, path_sums
+
+# Виды ограничения на задержку
+MAX_DELAY_BUDGET = "max"
+AVG_DELAY_BUDGET = "avg"
+
+
+@dataclass
+class CapacityPlan:
+    """Результат подбора пропускных способностей."""
+    capacities: List[float]   # новая пропускная способность каждого ребра
+    capacity_cost: float      # суммарная стоимость оборудования каналов
+    max_delay: float          # максимальная сквозная задержка по маршрутам, мс
+    avg_delay: float          # средняя задержка загруженных каналов, мс
+    feasible: bool            # удалось ли уложиться в бюджет задержки
+    upgrades: int             # шагов жадного наращивания
+    downgrades: int           # удачных понижений на этапе локального поиска
+
+
+class DelayEvaluator:
+    """
+    Инкрементальная оценка задержек: смена пропускной способности одного ребра
+    меняет задержку только этого ребра и сквозные задержки только тех
+    требований, чьи маршруты через него проходят.
+    """
+
+    def __init__(self, flow: np.ndarray, capacity: np.ndarray, demand_routes: DemandRoutes,
+                 avg_packet_size_bits: int):
+        self.flow = np.asarray(flow, dtype=np.float64)
+        self.capacity = np.array(capacity, dtype=np.float64)
+        self.avg_packet_size_bits = avg_packet_size_bits
+        self.path_ptr, self.path_edges = demand_routes.path_ptr, demand_routes.path_edges
+        self.delays = mm1_delays(self.flow, self.capacity, avg_packet_size_bits)
+        self.path_delays = path_sums(self.delays, demand_routes.path_ptr, demand_routes.path_edges)
+        self.edge_ptr, self.edge_demands = demand_routes.edge_demand_index()
+        # Средняя задержка считается как в _calculate_average_delay: по загруженным каналам
+        self.loaded = self.flow > 0
+        finite = self.loaded & np.isfinite(self.delays)
+        self.delay_sum = float(self.delays[finite].sum())
+        self.finite_count = int(np.count_nonzero(finite))
+
+    def demands_of(self, e: int) -> np.ndarray:
+        if e >= len(self.edge_ptr) - 1:
+            return np.empty(0, dtype=np.int32)
+        return self.edge_demands[self.edge_ptr[e]:self.edge_ptr[e + 1]]
+
+    def delay_at(self, e: int, capacity: float) -> float:
+        return float(mm1_delays(self.flow[e:e + 1], np.array([capacity]), self.avg_packet_size_bits)[0])
+
+    def set_capacity(self, e: int, capacity: float):
+        old_delay, new_delay = self.delays[e], self.delay_at(e, capacity)
+        self.capacity[e] = capacity
+        self.delays[e] = new_delay
+        if self.loaded[e]:
+            if np.isfinite(old_delay):
+                self.delay_sum -= old_delay
+                self.finite_count -= 1
+            if np.isfinite(new_delay):
+                self.delay_sum += new_delay
+                self.finite_count += 1
+        demands = self.demands_of(e)
+        if demands.size:
+            if np.isfinite(old_delay) and np.isfinite(new_delay):
+                self.path_delays[demands] += new_delay - old_delay
+            else:
+                # Через бесконечность разность не посчитать - пересуммируем эти маршруты
+                self.path_delays[demands] = [self.path_delay(d) for d in demands.tolist()]
+
+    def path_delay(self, d: int) -> float:
+        return float(self.delays[self.path_edges[self.path_ptr[d]:self.path_ptr[d + 1]]].sum())
+
+    def max_delay(self) -> float:
+        return float(self.path_delays.max()) if self.path_delays.size else 0.0
+
+    def avg_delay(self) -> float:
+        return self.delay_sum / self.finite_count if self.finite_count else 0.0
+
+
+def _levels(flow: float, available_capacities: List[float]) -> List[float]:
+    """Тарифы, при которых канал не перегружен (строго больше потока)."""
+    return [c for c in available_capacities if c > flow]
+
+
+def optimize_capacities(flow: np.ndarray, demand_routes: DemandRoutes, available_capacities: List[float],
+                        capacity_cost: Callable[[float], float], avg_packet_size_bits: int,
+                        budget_kind: str, budget: float) -> CapacityPlan:
+    """
+    Подбирает тарифы каналов минимальной стоимости, при которых задержка
+    укладывается в бюджет (максимальная сквозная или средняя по каналам).
+    1. Каждому загруженному каналу - самый дешевый тариф без перегрузки.
+    2. Жадно наращиваем тариф у канала с лучшим отношением выигрыша в задержке
+       к приросту стоимости (куча с ленивым пересчетом выигрыша).
+    3. Локальный поиск: понижаем тарифы, пока бюджет не нарушается.
+    """
+    flow = np.asarray(flow, dtype=np.float64)
+    edge_count = len(flow)
+    # Поток выше максимального тарифа: канал остается перегруженным на максимальном тарифе
+    levels = [(_levels(f, available_capacities) or [available_capacities[-1]]) if f > 0 else [0]
+              for f in flow.tolist()]
+    level = [0] * edge_count
+    evaluator = DelayEvaluator(flow, [lv[0] for lv in levels], demand_routes, avg_packet_size_bits)
+
+    # Для бюджета на максимальную задержку следим, сколько маршрутов его превышают
+    violated = evaluator.path_delays > budget
+    violation_count = int(np.count_nonzero(violated))
+
+    def is_feasible() -> bool:
+        if budget_kind == MAX_DELAY_BUDGET:
+            return violation_count == 0
+        return evaluator.avg_delay() <= budget
+
+    def gain(e: int) -> float:
+        """Выигрыш от перехода канала e на следующий тариф."""
+        new_delay = evaluator.delay_at(e, levels[e][level[e] + 1])
+        delta = evaluator.delays[e] - new_delay
+        if budget_kind == MAX_DELAY_BUDGET:
+            # Засчитываем сокращение только у маршрутов, еще не уложившихся в бюджет
+            excess = evaluator.path_delays[evaluator.demands_of(e)] - budget
+            excess = excess[excess > 0]
+            return float(np.minimum(excess, delta).sum()) if excess.size else 0.0
+        return delta / max(evaluator.finite_count, 1)
+
+    def ratio(e: int) -> float:
+        extra_cost = capacity_cost(levels[e][level[e] + 1]) - capacity_cost(levels[e][level[e]])
+        g = gain(e)
+        if g <= 0:
+            return 0.0
+        return g / extra_cost if extra_cost > 0 else float('inf')
+
+    def apply(e: int, new_level: int):
+        nonlocal violation_count
+        level[e] = new_level
+        evaluator.set_capacity(e, levels[e][new_level])
+        if budget_kind == MAX_DELAY_BUDGET:
+            demands = evaluator.demands_of(e)
+            now_violated = evaluator.path_delays[demands] > budget
+            violation_count += int(np.count_nonzero(now_violated)) - int(np.count_nonzero(violated[demands]))
+            violated[demands] = now_violated
+
+    # --- Жадное наращивание ---
+    upgrades = 0
+    heap = [(-ratio(e), e) for e in range(edge_count) if len(levels[e]) > 1]
+    heap = [item for item in heap if item[0] < 0]
+    heapq.heapify(heap)
+    while heap and not is_feasible():
+        neg_ratio, e = heapq.heappop(heap)
+        current = ratio(e)
+        # Выигрыш мог уменьшиться после предыдущих шагов - тогда возвращаем канал в кучу
+        if heap and current < -heap[0][0]:
+            if current > 0:
+                heapq.heappush(heap, (-current, e))
+            continue
+        if current <= 0:
+            continue
+        apply(e, level[e] + 1)
+        upgrades += 1
+        if level[e] + 1 < len(levels[e]):
+            next_ratio = ratio(e)
+            if next_ratio > 0:
+                heapq.heappush(heap, (-next_ratio, e))
+
+    # --- Локальный поиск: понижения, сохраняющие бюджет ---
+    downgrades = 0
+    if is_feasible():
+        improved = True
+        while improved:
+            improved = False
+            # Сначала пробуем каналы, понижение которых экономит больше всего
+            order = sorted((e for e in range(edge_count) if level[e] > 0),
+                           key=lambda e: capacity_cost(levels[e][level[e] - 1]) - capacity_cost(levels[e][level[e]]))
+            for e in order:
+                for new_level in range(level[e]):
+                    if capacity_cost(levels[e][new_level]) >= capacity_cost(levels[e][level[e]]):
+                        break
+                    old_level = level[e]
+                    apply(e, new_level)
+                    if is_feasible():
+                        downgrades += 1
+                        improved = True
+                        break
+                    apply(e, old_level)
+
+    capacities = evaluator.capacity.tolist()
+    capacities = [int(c) if float(c).is_integer() else c for c in capacities]
+    return CapacityPlan(capacities=capacities,
+                        capacity_cost=float(sum(capacity_cost(c) for c in capacities)),
+                        max_delay=evaluator.max_delay(),
+                        avg_delay=evaluator.avg_delay(),
+                        feasible=is_feasible(),
+                        upgrades=upgrades,
+                        downgrades=downgrades)
@@ -0,0 +1,158 @@
+# change_journal.py
+
+import json
+import os
+from typing import Dict, List
+
+from data_models import Node, Edge
+from project_io import save_project_json, load_project_json
+
+# Проекты, которые еще ни разу не сохранялись, журналируются сюда
+AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".network_topology_designer")
+UNTITLED_PROJECT = os.path.join(AUTOSAVE_DIR, "untitled.json")
+
+JOURNAL_SUFFIX = ".journal"
+SNAPSHOT_SUFFIX = ".autosave"
+
+
+def _find_edge(edges: List[Edge], from_id: int, to_id: int):
+    for edge in edges:
+        if (edge.from_id == from_id and edge.to_id == to_id) or \
+                (edge.from_id == to_id and edge.to_id == from_id):
+            return edge
+    return None
+
+
+def apply_operation(nodes: Dict[int, Node], edges: List[Edge], op: dict):
+    """Повторяет одну записанную операцию над моделью (используется при восстановлении)."""
+    kind = op["op"]
+    if kind == "add_node":
+        nodes[op["id"]] = Node(id=op["id"], name=op["name"], position=tuple(op["position"]), cost=op["cost"])
+    elif kind == "move_node":
+        if op["id"] in nodes:
+            nodes[op["id"]].position = tuple(op["position"])
+    elif kind == "update_node":
+        if op["id"] in nodes:
+            nodes[op["id"]].name = op["name"]
+            nodes[op["id"]].cost = op["cost"]
+    elif kind == "delete_node":
+        nodes.pop(op["id"], None)
+        edges[:] = [e for e in edges if e.from_id != op["id"] and e.to_id != op["id"]]
+    elif kind == "add_edge":
+        if _find_edge(edges, op["from_id"], op["to_id"]) is None:
+            edges.append(Edge(from_id=op["from_id"], to_id=op["to_id"], capacity=op["capacity"],
+                              length=op["length"], cost=op["cost"]))
+    elif kind == "delete_edge":
+        edge = _find_edge(edges, op["from_id"], op["to_id"])
+        if edge is not None:
+            edges.remove(edge)
+    elif kind == "set_capacity":
+        edge = _find_edge(edges, op["from_id"], op["to_id"])
+        if edge is not None:
+            edge.capacity = op["capacity"]
+            edge.cost = op["cost"]
+            if "flow" in op:
+                edge.flow = op["flow"]
+    else:
+        raise ValueError(f"Неизвестная операция журнала: {kind}")
+
+
+class ChangeJournal:
+    """
+    Журнал изменений проекта, который только дописывается.
+    Операции копятся в памяти и сбрасываются на диск небольшими пачками,
+    а после compact_every операций журнал сворачивается в снимок проекта.
+    Поэтому автосохранение стоит O(изменений), а не O(размера проекта).
+    """
+
+    def __init__(self, project_path: str, batch_size: int = 20, compact_every: int = 500):
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+        self.pending: List[dict] = []
+        self.ops_since_snapshot = 0
+        self.set_project_path(project_path)
+
+    def set_project_path(self, project_path: str):
+        self.project_path = project_path
+        self.journal_path = project_path + JOURNAL_SUFFIX
+        self.snapshot_path = project_path + SNAPSHOT_SUFFIX
+        self.pending.clear()
+        self.ops_since_snapshot = 0
+
+    # --- Запись ---
+
+    def record(self, op: str, **data) -> bool:
+        """Запоминает операцию. Возвращает True, если после сброса пачки пора делать снимок."""
+        self.pending.append({"op": op, **data})
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return False
+
+    def flush(self) -> bool:
+        """Дописывает накопленные операции в журнал. Возвращает True, если пора делать снимок."""
+        if not self.pending:
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for op in self.pending:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.ops_since_snapshot += len(self.pending)
+        self.pending.clear()
+        return self.ops_since_snapshot >= self.compact_every
+
+    def compact(self, nodes: Dict[int, Node], edges: List[Edge], tariff: dict | None = None):
+        """Сворачивает журнал: пишет снимок текущего состояния и обнуляет журнал."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        # Сначала пишем во временный файл, чтобы сбой не испортил прежний снимок
+        temp_path = self.snapshot_path + ".tmp"
+        save_project_json(temp_path, nodes.values(), edges, tariff)
+        os.replace(temp_path, self.snapshot_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.pending.clear()
+        self.ops_since_snapshot = 0
+
+    def discard(self):
+        """Удаляет журнал и снимок (после явного сохранения проекта или при закрытии)."""
+        for path in (self.journal_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.pending.clear()
+        self.ops_since_snapshot = 0
+
+    # --- Восстановление ---
+
+    def has_recovery_data(self) -> bool:
+        return any(os.path.exists(path) and os.path.getsize(path) > 0
+                   for path in (self.journal_path, self.snapshot_path))
+
+    def recover(self):
+        """
+        Восстанавливает состояние: последний снимок (или сам файл проекта)
+        плюс все операции журнала после него.
+        Возвращает (узлы, рёбра, каталог тарифов или None, число повторенных операций).
+        """
+        if os.path.exists(self.snapshot_path):
+            nodes, edges, tariff = load_project_json(self.snapshot_path)
+        elif os.path.exists(self.project_path):
+            nodes, edges, tariff = load_project_json(self.project_path)
+        else:
+            nodes, edges, tariff = {}, [], None
+
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Последняя строка могла быть дописана не до конца при сбое
+                    if op["op"] == "set_tariff":
+                        tariff = op["catalogue"]
+                    else:
+                        apply_operation(nodes, edges, op)
+                    replayed += 1
+        self.ops_since_snapshot = replayed
+        return nodes, edges, tariff, replayed
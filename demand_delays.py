@@ -0,0 +1,85 @@
+# demand_delays.py
+
+import heapq
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from data_models import TrafficDemand
+from dynamic_routes import DynamicHopRoutes, UNREACHABLE
+from instrumentation import timed, count
+from network_arrays import TopologyArrays, mm1_delays
+
+
+@dataclass
+class DemandDelayReport:
+    """Сквозные задержки требований по их маршрутам."""
+    from_ids: np.ndarray
+    to_ids: np.ndarray
+    volumes: np.ndarray
+    hops: np.ndarray           # -1 - маршрута нет
+    delays: np.ndarray         # мс; inf - маршрут через перегруженный канал; nan - маршрута нет
+    network_average: float     # средняя задержка пакета по Клейнроку (взвешенная по трафику), мс
+    max_delay: float           # максимальная сквозная задержка среди требований, мс
+
+    def worst(self, k: int) -> List[int]:
+        """Номера k требований с наибольшей задержкой (выбор кучей, без сортировки всех)."""
+        routed = np.nonzero(self.hops >= 0)[0]
+        return heapq.nlargest(k, routed.tolist(), key=lambda d: self.delays[d])
+
+
+@timed("demand_delays")
+def demand_delays(topology: TopologyArrays, route_trees: DynamicHopRoutes, demands: List[TrafficDemand],
+                  avg_packet_size_bits: int) -> DemandDelayReport:
+    """
+    Сквозная задержка каждого требования - сумма задержек M/M/1 рёбер его маршрута.
+    Пути не обходятся по одному: для каждого источника задержки до всех узлов
+    накапливаются по его дереву маршрутов уровень за уровнем (задержка до узла =
+    задержка до предка + задержка ребра), сразу для всех источников.
+    route_trees должны иметь ту же нумерацию узлов, что и topology.
+    """
+    edge_delay = mm1_delays(topology.flow, topology.capacity, avg_packet_size_bits)
+    index = topology.index
+    known = [d for d in demands if d.from_id in index and d.to_id in index]
+    from_ids = np.array([d.from_id for d in known], dtype=np.int64)
+    to_ids = np.array([d.to_id for d in known], dtype=np.int64)
+    volumes = np.array([d.volume for d in known], dtype=np.float64)
+    sources = np.array([index[d.from_id] for d in known], dtype=np.int64)
+    targets = np.array([index[d.to_id] for d in known], dtype=np.int64)
+
+    # Только источники, у которых есть требования
+    rows, demand_rows = np.unique(sources, return_inverse=True)
+    dist = route_trees.dist[rows]
+    parent = route_trees.parent[rows]
+    tree_delay = np.zeros(dist.shape)
+    find_edge = topology.edge_lookup()
+    row_ids, node_ids = np.nonzero((dist > 0) & (dist < UNREACHABLE))
+    levels = dist[row_ids, node_ids]
+    order = np.argsort(levels, kind='stable')
+    row_ids, node_ids, levels = row_ids[order], node_ids[order], levels[order]
+    parents = parent[row_ids, node_ids]
+    step_delay = edge_delay[find_edge(parents, node_ids)] if len(node_ids) else np.empty(0)
+    bounds = np.searchsorted(levels, np.arange(1, int(levels[-1]) + 2)) if len(levels) else [0]
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        part = slice(first, last)
+        tree_delay[row_ids[part], node_ids[part]] = (tree_delay[row_ids[part], parents[part]]
+                                                     + step_delay[part])
+
+    hops = dist[demand_rows, targets].astype(np.int64)
+    routed = (hops > 0) & (hops < UNREACHABLE)
+    hops[~routed] = -1
+    delays = np.where(routed, tree_delay[demand_rows, targets], np.nan)
+
+    # Клейнрок: T = sum(lambda_d * T_d) / sum(lambda_d) по маршрутизированному трафику
+    routed_volume = volumes[routed].sum()
+    if routed_volume > 0:
+        network_average = float(np.dot(volumes[routed], delays[routed]) / routed_volume) \
+            if np.all(np.isfinite(delays[routed])) else float('inf')
+    else:
+        network_average = 0.0
+    max_delay = float(delays[routed].max()) if routed.any() else 0.0
+    count("demands", len(known))
+    count("sources", len(rows))
+    return DemandDelayReport(from_ids=from_ids, to_ids=to_ids, volumes=volumes, hops=hops, delays=delays,
+                             network_average=network_average, max_delay=max_delay)
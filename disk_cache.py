@@ -0,0 +1,256 @@
+# disk_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".network_topology_designer", "cache")
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # 512 МБ
+
+
+# --- Ключи кэша ---
+
+def _hasher(kind: str):
+    h = hashlib.sha256()
+    h.update(kind.encode())
+    return h
+
+
+def _update_topology(h, nodes: Dict[int, Node], edges: List[Edge]):
+    h.update(np.array(sorted(nodes.keys()), dtype=np.int64).tobytes())
+    # Порядок рёбер влияет на выбор среди маршрутов с одинаковым числом хопов, поэтому сохраняем его
+    h.update(np.array([(e.from_id, e.to_id) for e in edges], dtype=np.int64).tobytes())
+
+
+def routes_key(nodes: Dict[int, Node], edges: List[Edge]) -> str:
+    h = _hasher("routes")
+    _update_topology(h, nodes, edges)
+    return h.hexdigest()
+
+
+def flows_key(nodes: Dict[int, Node], edges: List[Edge], demands: List[TrafficDemand],
+              capacities: List[float], routing_mode: str = "", tariff: str = "") -> str:
+    h = _hasher("flows")
+    _update_topology(h, nodes, edges)
+    h.update(np.array([e.length for e in edges], dtype=np.float64).tobytes())
+    h.update(np.array([(d.from_id, d.to_id) for d in demands], dtype=np.int64).tobytes())
+    h.update(np.array([d.volume for d in demands], dtype=np.float64).tobytes())
+    h.update(np.array(capacities, dtype=np.float64).tobytes())
+    # Ключи для обычной маршрутизации по одному пути не меняются
+    if routing_mode:
+        h.update(routing_mode.encode())
+    # Цены встроенного каталога в ключ не входят - прежние ключи остаются верными
+    if tariff:
+        h.update(tariff.encode())
+    return h.hexdigest()
+
+
+def evaluation_key(nodes: Dict[int, Node], edges: List[Edge], avg_packet_size_bits: int) -> str:
+    h = _hasher("evaluation")
+    _update_topology(h, nodes, edges)
+    h.update(np.array([(e.flow, e.capacity) for e in edges], dtype=np.float64).tobytes())
+    h.update(str(avg_packet_size_bits).encode())
+    return h.hexdigest()
+
+
+# --- Маршруты, читаемые прямо из файлов ---
+
+class StoredRoutes(Mapping):
+    """
+    Таблица маршрутов поверх отображенных в память массивов.
+    Пути собираются только при обращении, поэтому открытие мгновенное.
+    """
+
+    def __init__(self, keys, offsets, path_nodes, base_id: int, span: int):
+        self.pair_codes = keys      # отсортированные коды пар (from, to)
+        self.offsets = offsets      # начало пути каждой пары в path_nodes
+        self.path_nodes = path_nodes
+        self.base_id = base_id
+        self.span = span
+
+    def _encode(self, key) -> int:
+        from_id, to_id = key
+        return (from_id - self.base_id) * self.span + (to_id - self.base_id)
+
+    def _index(self, key) -> int:
+        try:
+            code = self._encode(key)
+        except (TypeError, ValueError):
+            return -1
+        i = int(np.searchsorted(self.pair_codes, code))
+        if i < len(self.pair_codes) and self.pair_codes[i] == code:
+            return i
+        return -1
+
+    def __getitem__(self, key):
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.path_nodes[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __len__(self):
+        return len(self.pair_codes)
+
+    def __iter__(self):
+        for code in self.pair_codes:
+            code = int(code)
+            yield (code // self.span + self.base_id, code % self.span + self.base_id)
+
+
+# --- Сам кэш ---
+
+class DiskCache:
+    """
+    Кэш результатов на диске, адресуемый хешем содержимого проекта.
+    Каждая запись - отдельная папка с .npy массивами; при переполнении
+    удаляются записи, к которым дольше всего не обращались (LRU).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _open(self, key: str) -> Optional[str]:
+        path = self._entry_dir(key)
+        if not os.path.isdir(path):
+            return None
+        os.utime(path)  # Отмечаем обращение для LRU
+        return path
+
+    def _store(self, key: str, arrays: Dict[str, np.ndarray], meta: dict):
+        final_path = self._entry_dir(key)
+        if os.path.isdir(final_path):
+            return
+        # Пишем во временную папку и переименовываем, чтобы не оставить половину записи
+        temp_path = f"{final_path}.tmp{os.getpid()}"
+        os.makedirs(temp_path, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_path, name + ".npy"), array)
+        with open(os.path.join(temp_path, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        try:
+            os.replace(temp_path, final_path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)  # Запись уже создана параллельно
+        self.evict()
+
+    @staticmethod
+    def _load_array(path: str, name: str):
+        return np.load(os.path.join(path, name + ".npy"), mmap_mode='r')
+
+    @staticmethod
+    def _load_meta(path: str) -> dict:
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    # --- Маршруты (Этап 2) ---
+
+    def store_routes(self, key: str, routes: Dict):
+        if not routes:
+            return
+        ids = [node_id for pair in routes for node_id in pair]
+        base_id = min(ids)
+        span = max(ids) - base_id + 1
+        items = sorted(routes.items())
+        keys = np.array([(f - base_id) * span + (t - base_id) for (f, t), _ in items], dtype=np.int64)
+        lengths = np.array([len(path) for _, path in items], dtype=np.int64)
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        path_nodes = np.fromiter((n for _, path in items for n in path), dtype=np.int64, count=int(offsets[-1]))
+        self._store(key, {"route_keys": keys, "route_offsets": offsets, "route_nodes": path_nodes},
+                    {"base_id": base_id, "span": span})
+
+    def load_routes(self, key: str) -> Optional[StoredRoutes]:
+        path = self._open(key)
+        if path is None:
+            return None
+        meta = self._load_meta(path)
+        return StoredRoutes(self._load_array(path, "route_keys"), self._load_array(path, "route_offsets"),
+                            self._load_array(path, "route_nodes"), meta["base_id"], meta["span"])
+
+    # --- Потоки (Этап 3) ---
+
+    def store_flows(self, key: str, edges: List[Edge]):
+        self._store(key, {"flows": np.array([e.flow for e in edges], dtype=np.float64),
+                          "capacities": np.array([e.capacity for e in edges], dtype=np.float64),
+                          "costs": np.array([e.cost for e in edges], dtype=np.float64)}, {})
+
+    def load_flows(self, key: str, edges: List[Edge]) -> bool:
+        """Переносит сохраненные потоки, пропускные способности и стоимости на рёбра."""
+        path = self._open(key)
+        if path is None:
+            return False
+        flows = self._load_array(path, "flows")
+        capacities = self._load_array(path, "capacities")
+        costs = self._load_array(path, "costs")
+        for i, edge in enumerate(edges):
+            edge.flow = float(flows[i])
+            capacity = float(capacities[i])
+            # Тарифы целочисленные: храним их как int, как это делает Этап 3
+            edge.capacity = int(capacity) if capacity.is_integer() else capacity
+            edge.cost = float(costs[i])
+        return True
+
+    # --- Оценка (Этап 4) ---
+
+    def store_evaluation(self, key: str, edges: List[Edge], max_delay: float, avg_delay: float):
+        self._store(key, {"delays": np.array([e.delay for e in edges], dtype=np.float64)},
+                    {"max_delay": max_delay, "avg_delay": avg_delay})
+
+    def load_evaluation(self, key: str, edges: List[Edge]):
+        """Переносит задержки на рёбра. Возвращает (max_delay, avg_delay) или None."""
+        path = self._open(key)
+        if path is None:
+            return None
+        delays = self._load_array(path, "delays")
+        for i, edge in enumerate(edges):
+            edge.delay = float(delays[i])
+        meta = self._load_meta(path)
+        return meta["max_delay"], meta["avg_delay"]
+
+    # --- Обслуживание ---
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or ".tmp" in name:
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            entries.append((os.stat(path).st_mtime, size, path))
+        return entries
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Удаляет самые давно использованные записи, пока кэш не уложится в лимит."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def purge(self) -> int:
+        """Полностью очищает кэш. Возвращает число освобожденных байт."""
+        freed = self.size_bytes()
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return freed
@@ -21,6 +21,7 @@ class DrawingCanvas(QWidget):
         # --- Переменные для отслеживания действий мышью ---
         self.dragging_node_id = None
         self.drag_offset = QPoint(0, 0)
+        self.drag_start_position = None  # позиция узла в начале перетаскивания
 
         # Новые переменные для создания ребра
         self.is_drawing_edge = False
@@ -66,7 +67,8 @@ class DrawingCanvas(QWidget):
             if self.main_window.is_move_mode:
                 # РЕЖИМ ПЕРЕМЕЩЕНИЯ
                 self.dragging_node_id = clicked_node_id
-                node_pos = QPoint(*self.main_window.nodes[clicked_node_id].position)
+                self.drag_start_position = self.main_window.nodes[clicked_node_id].position
+                node_pos = QPoint(*self.drag_start_position)
                 self.drag_offset = node_pos - event.pos()
             else:
                 # РЕЖИМ СОЗДАНИЯ РЕБРА
@@ -109,6 +111,11 @@ class DrawingCanvas(QWidget):
 
             self.update()  # Убрать временную линию
 
+        if self.dragging_node_id is not None and \
+                self.main_window.nodes[self.dragging_node_id].position != self.drag_start_position:
+            # Сообщаем главному окну итоговую позицию узла (для журнала изменений);
+            # простой щелчок без сдвига ничего не меняет
+            self.main_window.node_moved(self.dragging_node_id)
         self.dragging_node_id = None  # В любом случае сбрасываем перетаскивание
 
     # --- Метод рисования ---
@@ -138,11 +145,19 @@ class DrawingCanvas(QWidget):
             painter.setPen(pen)
             painter.drawLine(self.edge_start_pos, self.edge_current_pos)
 
+        # Срез суточного профиля: загрузки и задержки уже посчитаны, берем готовые значения
+        slice_view = self.main_window.current_slice_view()
+        if slice_view is not None:
+            slice_utilization = slice_view[1].tolist()
+            slice_delays = slice_view[2].tolist()
+
         # --- 2. Рисуем постоянные рёбра (ИСПРАВЛЕННАЯ ЛОГИКА) ---
-        for edge in edges:
+        for i, edge in enumerate(edges):
             # Сначала вычисляем все параметры для текущего ребра
             utilization = 0.0
-            if edge.capacity > 0:
+            if slice_view is not None:
+                utilization = slice_utilization[i]
+            elif edge.capacity > 0:
                 utilization = edge.flow / edge.capacity
 
             edge_key = tuple(sorted((edge.from_id, edge.to_id)))
@@ -174,7 +189,12 @@ class DrawingCanvas(QWidget):
                 # Рисуем текст (всегда черным цветом для читаемости)
                 mid_point = QPoint(int((p1.x() + p2.x()) / 2), int((p1.y() + p2.y()) / 2))
                 painter.setPen(QPen(Qt.GlobalColor.black))
-                painter.drawText(mid_point, f"{edge.capacity:.0f}")
+                if slice_view is not None:
+                    delay = slice_delays[i]
+                    delay_text = f"{delay:.2f} мс" if delay != float('inf') else "∞"
+                    painter.drawText(mid_point, f"{edge.capacity:.0f} ({utilization * 100:.0f} %, {delay_text})")
+                else:
+                    painter.drawText(mid_point, f"{edge.capacity:.0f}")
             except KeyError:
                 continue
 
@@ -0,0 +1,263 @@
+# dynamic_routes.py
+
+import heapq
+from collections import deque
+from collections.abc import Mapping
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from data_models import Node, Edge
+
+# "Бесконечное" число хопов для недостижимых пар
+UNREACHABLE = np.iinfo(np.int32).max // 2
+
+
+class DynamicHopRoutes:
+    """
+    Динамическая таблица кратчайших по числу хопов маршрутов между всеми парами.
+    Хранит для каждого источника дерево кратчайших путей (матрицы расстояний и
+    предков) и при добавлении или удалении ребра перестраивает только те
+    деревья и только те их части, которые это ребро затрагивает.
+    """
+
+    def __init__(self, node_ids: List[int]):
+        self.ids: List[int | None] = list(node_ids)
+        self.index: Dict[int, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+        self.adj: List[List[int]] = [[] for _ in self.ids]
+        n = len(self.ids)
+        self.dist = np.full((n, n), UNREACHABLE, dtype=np.int32)
+        self.parent = np.full((n, n), -1, dtype=np.int32)
+        np.fill_diagonal(self.dist, 0)
+
+    # --- Построение ---
+
+    @classmethod
+    def from_graph(cls, nodes: Dict[int, Node], edges: List[Edge]) -> "DynamicHopRoutes":
+        """Строит таблицу с нуля обходом в ширину из каждого узла."""
+        table = cls(list(nodes.keys()))
+        for edge in edges:
+            table._link(table.index[edge.from_id], table.index[edge.to_id])
+        for s in range(len(table.ids)):
+            table._bfs_from(s)
+        return table
+
+    @classmethod
+    def from_routes(cls, nodes: Dict[int, Node], edges: List[Edge], routes) -> "DynamicHopRoutes":
+        """Строит таблицу по уже рассчитанным маршрутам, сохраняя именно эти деревья путей."""
+        table = cls(list(nodes.keys()))
+        for edge in edges:
+            table._link(table.index[edge.from_id], table.index[edge.to_id])
+        index = table.index
+        for (from_id, to_id), path in routes.items():
+            s, t = index[from_id], index[to_id]
+            table.dist[s, t] = len(path) - 1
+            table.parent[s, t] = index[path[-2]]
+        return table
+
+    def _link(self, a: int, b: int):
+        self.adj[a].append(b)
+        self.adj[b].append(a)
+
+    def _bfs_from(self, s: int):
+        dist, parent = self.dist[s], self.parent[s]
+        queue = deque([s])
+        while queue:
+            x = queue.popleft()
+            next_dist = dist[x] + 1
+            for y in self.adj[x]:
+                if next_dist < dist[y]:
+                    dist[y] = next_dist
+                    parent[y] = x
+                    queue.append(y)
+
+    # --- Изменения топологии ---
+
+    def add_node(self, node_id: int):
+        """Добавляет изолированный узел. Маршруты от этого не меняются."""
+        n = len(self.ids)
+        self.ids.append(node_id)
+        self.index[node_id] = n
+        self.adj.append([])
+        self.dist = np.pad(self.dist, ((0, 1), (0, 1)), constant_values=UNREACHABLE)
+        self.parent = np.pad(self.parent, ((0, 1), (0, 1)), constant_values=-1)
+        self.dist[n, n] = 0
+
+    def insert_edge(self, from_id: int, to_id: int) -> List[Tuple[int, int]]:
+        """
+        Добавляет ребро и возвращает пары (from, to), маршрут которых изменился.
+        Затронуты только источники, для которых расстояния до концов ребра
+        различаются больше чем на один хоп.
+        """
+        a, b = self.index[from_id], self.index[to_id]
+        self._link(a, b)
+        gap = np.abs(self.dist[:, a].astype(np.int64) - self.dist[:, b])
+        changed = []
+        for s in np.nonzero(gap > 1)[0]:
+            s = int(s)
+            near, far = (a, b) if self.dist[s, a] < self.dist[s, b] else (b, a)
+            dist, parent = self.dist[s], self.parent[s]
+            dist[far] = dist[near] + 1
+            parent[far] = near
+            # Улучшение расходится волной от дальнего конца нового ребра
+            queue = deque([far])
+            while queue:
+                x = queue.popleft()
+                changed.append((self.ids[s], self.ids[x]))
+                next_dist = dist[x] + 1
+                for y in self.adj[x]:
+                    if next_dist < dist[y]:
+                        dist[y] = next_dist
+                        parent[y] = x
+                        queue.append(y)
+        return changed
+
+    def delete_edge(self, from_id: int, to_id: int) -> List[Tuple[int, int]]:
+        """
+        Удаляет ребро и возвращает пары (from, to), маршрут которых изменился.
+        Перестраиваются только деревья, в которые это ребро входило, и только
+        поддерево под ним.
+        """
+        a, b = self.index[from_id], self.index[to_id]
+        self.adj[a].remove(b)
+        self.adj[b].remove(a)
+        affected = np.nonzero((self.parent[:, b] == a) | (self.parent[:, a] == b))[0]
+        changed = []
+        for s in affected:
+            s = int(s)
+            child = b if self.parent[s, b] == a else a
+            subtree = self._repair_subtree(s, child)
+            changed.extend((self.ids[s], self.ids[x]) for x in subtree)
+        return changed
+
+    def remove_node(self, node_id: int) -> List[Tuple[int, int]]:
+        """Удаляет узел вместе с инцидентными рёбрами. Возвращает изменившиеся пары."""
+        k = self.index[node_id]
+        changed = []
+        for neighbor in list(self.adj[k]):
+            changed.extend(self.delete_edge(node_id, self.ids[neighbor]))
+        # После удаления рёбер узел изолирован, и все пары с ним уже попали в changed.
+        # Индекс узла не переиспользуем: строка и столбец просто остаются пустыми
+        self.dist[k, :] = UNREACHABLE
+        self.dist[:, k] = UNREACHABLE
+        self.parent[k, :] = -1
+        self.parent[:, k] = -1
+        self.ids[k] = None
+        del self.index[node_id]
+        return changed
+
+    def _repair_subtree(self, s: int, root: int) -> List[int]:
+        """Заново подвешивает поддерево root в дереве источника s, не трогая остальное дерево."""
+        dist, parent = self.dist[s], self.parent[s]
+        # Собираем поддерево: потомки - соседи, у которых предок текущий узел
+        subtree = [root]
+        in_subtree = {root}
+        i = 0
+        while i < len(subtree):
+            x = subtree[i]
+            i += 1
+            for y in self.adj[x]:
+                if parent[y] == x and y not in in_subtree:
+                    in_subtree.add(y)
+                    subtree.append(y)
+        for x in subtree:
+            dist[x] = UNREACHABLE
+            parent[x] = -1
+        # Стартовые расстояния - через соседей вне поддерева, дальше Дейкстра внутри него
+        pq = []
+        for x in subtree:
+            for y in self.adj[x]:
+                if y not in in_subtree and dist[y] + 1 < dist[x]:
+                    dist[x] = dist[y] + 1
+                    parent[x] = y
+            if dist[x] < UNREACHABLE:
+                heapq.heappush(pq, (int(dist[x]), x))
+        while pq:
+            d, x = heapq.heappop(pq)
+            if d > dist[x]:
+                continue
+            for y in self.adj[x]:
+                if y in in_subtree and d + 1 < dist[y]:
+                    dist[y] = d + 1
+                    parent[y] = x
+                    heapq.heappush(pq, (d + 1, y))
+        return subtree
+
+    # --- Чтение маршрутов ---
+
+    def path(self, from_id: int, to_id: int) -> List[int] | None:
+        s, t = self.index[from_id], self.index[to_id]
+        if s == t or self.dist[s, t] >= UNREACHABLE:
+            return None
+        parent = self.parent[s]
+        path = []
+        current = t
+        while current != -1:
+            path.append(self.ids[current])
+            current = parent[current]
+        path.reverse()
+        return path
+
+    def routes(self) -> Dict[Tuple[int, int], List[int]]:
+        """Все маршруты в том же виде, что возвращает dijkstra_all_pairs_hops."""
+        all_routes = {}
+        for from_id in self.index:
+            for to_id in self.index:
+                path = self.path(from_id, to_id)
+                if path is not None:
+                    all_routes[(from_id, to_id)] = path
+        return all_routes
+
+    def apply_changes(self, routes: Dict, changed: List[Tuple[int, int]]):
+        """Переносит изменившиеся маршруты в обычный словарь маршрутов."""
+        for from_id, to_id in changed:
+            if from_id in self.index and to_id in self.index:
+                path = self.path(from_id, to_id)
+            else:
+                path = None
+            if path is None:
+                routes.pop((from_id, to_id), None)
+            else:
+                routes[(from_id, to_id)] = path
+
+
+class HopRouteView(Mapping):
+    """
+    Маршруты всех пар, читаемые прямо из деревьев путей DynamicHopRoutes (компактный режим).
+    Вместо словаря путей (сотни байт на пару) в памяти только матрицы расстояний
+    и предков - 8 байт на пару; путь собирается при обращении. Правки топологии,
+    внесенные в таблицу, сразу видны через представление.
+    """
+
+    def __init__(self, table: DynamicHopRoutes):
+        self.table = table
+
+    def _pair(self, key) -> Tuple[int, int] | None:
+        try:
+            from_id, to_id = key
+            s, t = self.table.index[from_id], self.table.index[to_id]
+        except (KeyError, TypeError, ValueError):
+            return None
+        if s == t or self.table.dist[s, t] >= UNREACHABLE:
+            return None
+        return s, t
+
+    def __getitem__(self, key):
+        if self._pair(key) is None:
+            raise KeyError(key)
+        return self.table.path(*key)
+
+    def __contains__(self, key):
+        return self._pair(key) is not None
+
+    def _reachable(self):
+        dist = self.table.dist
+        return (dist > 0) & (dist < UNREACHABLE)
+
+    def __len__(self):
+        return int(np.count_nonzero(self._reachable()))
+
+    def __iter__(self):
+        ids = self.table.ids
+        for s, t in zip(*np.nonzero(self._reachable())):
+            yield ids[s], ids[t]
@@ -0,0 +1,116 @@
+# ecmp_routing.py
+
+from typing import List, Tuple
+
+import numpy as np
+
+from data_models import TrafficDemand
+from instrumentation import timed, count
+from network_arrays import TopologyArrays, source_demand_rows
+
+# Как делить трафик между равноценными (по числу хопов) предшественниками
+SPLIT_EVEN = "even"       # поровну между предшественниками узла
+SPLIT_BY_PATHS = "paths"  # пропорционально числу кратчайших путей через предшественника
+# Сколько элементов (узлы или дуги x источники) обрабатываем за раз
+BLOCK_ELEMENTS = 4_000_000
+
+
+def _hop_levels(topology: TopologyArrays, heads: np.ndarray, slots: List[np.ndarray],
+                block_sources: np.ndarray) -> np.ndarray:
+    """Число хопов от каждого источника блока до каждого узла (узлы x источники); -1 - недостижим."""
+    rows = np.arange(len(block_sources))
+    dist = np.full((topology.node_count, len(rows)), -1, dtype=np.int32)
+    dist[block_sources, rows] = 0
+    frontier = np.zeros(dist.shape, dtype=bool)
+    frontier[block_sources, rows] = True
+    level = 0
+    while frontier.any():
+        level += 1
+        reached = np.zeros((len(heads), len(rows)), dtype=bool)
+        for arcs in slots:
+            reached[:len(arcs)] |= frontier[topology.adj_node[arcs]]
+        head_dist = dist[heads]
+        new = reached & (head_dist < 0)
+        frontier[:] = False
+        frontier[heads] = new
+        head_dist[new] = level
+        dist[heads] = head_dist
+    return dist
+
+
+@timed("ecmp_edge_flows")
+def ecmp_edge_flows(topology: TopologyArrays, demands: List[TrafficDemand],
+                    split: str = SPLIT_EVEN) -> Tuple[np.ndarray, List[TrafficDemand]]:
+    """
+    Потоки рёбер при маршрутизации по всем путям с минимальным числом хопов (ECMP).
+    Для каждого источника строится DAG: предшественники узла - все соседи,
+    которые на хоп ближе к источнику. Затем один проход от дальних уровней
+    к ближним: трафик, накопленный в узле (его требования плюс транзит),
+    делится между его предшественниками. Пути явно не перебираются.
+    Источники обрабатываются блоками, векторизованно по всем источникам блока.
+    Возвращает потоки рёбер и требования, для которых пути нет.
+    """
+    sources, demand_rows = source_demand_rows(topology, demands)
+    heads, slots = topology.in_arc_slots()
+    arc_count = len(topology.adj_node)
+    flow = np.zeros(topology.edge_count)
+    unreachable = set()
+    block = max(1, BLOCK_ELEMENTS // max(arc_count, topology.node_count, 1))
+
+    for first in range(0, len(sources), block):
+        block_sources = sources[first:first + block]
+        rows = np.arange(len(block_sources))
+        dist = _hop_levels(topology, heads, slots, block_sources)
+        carried = demand_rows[first:first + len(rows)].T.copy()
+        lost_nodes, lost_rows = np.nonzero((dist < 0) & (carried > 0))
+        unreachable.update(zip(block_sources[lost_rows].tolist(), lost_nodes.tolist()))
+        carried[dist < 0] = 0.0
+
+        # Дуги DAG: сосед на хоп ближе к источнику (пары дуга CSR x источник)
+        arc_parts, head_parts, row_parts = [], [], []
+        for arcs in slots:
+            slot_size = len(arcs)
+            from_dist = dist[topology.adj_node[arcs]]
+            in_dag = (from_dist >= 0) & (from_dist + 1 == dist[heads[:slot_size]])
+            slot_ids, dag_rows = np.nonzero(in_dag)
+            arc_parts.append(arcs[slot_ids])
+            head_parts.append(heads[slot_ids])
+            row_parts.append(dag_rows)
+        if not arc_parts:
+            continue
+        dag_arc = np.concatenate(arc_parts)
+        dag_head = np.concatenate(head_parts)
+        dag_row = np.concatenate(row_parts)
+        dag_from = topology.adj_node[dag_arc]
+        dag_level = dist[dag_head, dag_row]
+        order = np.argsort(dag_level, kind='stable')
+        dag_arc, dag_head, dag_row, dag_from, dag_level = (
+            dag_arc[order], dag_head[order], dag_row[order], dag_from[order], dag_level[order])
+        max_level = int(dag_level[-1]) if len(dag_level) else 0
+        bounds = np.searchsorted(dag_level, np.arange(max_level + 2))
+
+        if split == SPLIT_BY_PATHS:
+            # Число кратчайших путей до узла - проход по уровням от источника
+            path_count = np.zeros(dist.shape)
+            path_count[block_sources, rows] = 1.0
+            for level in range(1, max_level + 1):
+                part = slice(bounds[level], bounds[level + 1])
+                np.add.at(path_count, (dag_head[part], dag_row[part]), path_count[dag_from[part], dag_row[part]])
+            share = path_count[dag_from, dag_row] / path_count[dag_head, dag_row]
+        else:
+            in_degree = np.zeros(dist.shape)
+            np.add.at(in_degree, (dag_head, dag_row), 1.0)
+            share = 1.0 / in_degree[dag_head, dag_row]
+
+        # Обратный топологический проход: узлы уровня отдают накопленное предшественникам
+        for level in range(max_level, 0, -1):
+            part = slice(bounds[level], bounds[level + 1])
+            passed = carried[dag_head[part], dag_row[part]] * share[part]
+            np.add.at(carried, (dag_from[part], dag_row[part]), passed)
+            flow += np.bincount(topology.adj_edge[dag_arc[part]], weights=passed, minlength=topology.edge_count)
+
+    count("sources", len(sources))
+    unrouted = [d for d in demands
+                if d.from_id not in topology.index or d.to_id not in topology.index
+                or (topology.index[d.from_id], topology.index[d.to_id]) in unreachable]
+    return flow, unrouted
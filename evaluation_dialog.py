@@ -1,11 +1,27 @@
 # evaluation_dialog.py
 
-from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout,
+import math
+
+from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout, QTabWidget,
                              QTableWidgetItem, QLabel, QHeaderView, QAbstractItemView)
 
+from instrumentation import timed, count
+
+# Больше строк в таблице требований не выводим - таблица Qt на сотнях тысяч строк тормозит
+MAX_DEMAND_ROWS = 5000
+# Сколько худших требований показывать
+WORST_DEMANDS = 20
+
+
+def _delay_text(delay):
+    if math.isnan(delay):
+        return "нет маршрута"
+    return f"{delay:.4f}" if delay != float('inf') else "∞ (Перегрузка)"
+
+
 class EvaluationDialog(QDialog):
     def __init__(self, edges, total_cost, node_cost, base_edge_cost, capacity_edge_cost,
-                 max_delay, avg_delay, parent=None):
+                 max_delay, avg_delay, demand_report=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Итоговая оценка проекта")
         self.setMinimumSize(800, 500)
@@ -45,8 +61,40 @@ class EvaluationDialog(QDialog):
         layout.addWidget(total_cost_label)
         layout.addWidget(max_delay_label)
         layout.addWidget(avg_delay_label)  # <-- ВОТ ОН
-        layout.addWidget(self.table)
+        if demand_report is None:
+            layout.addWidget(self.table)
+            return
 
+        # Задержки требований по маршрутам, которыми действительно идет трафик
+        route_max_text = _delay_text(demand_report.max_delay) + " мс"
+        kleinrock_text = _delay_text(demand_report.network_average) + " мс"
+        layout.addWidget(QLabel(f"<b>Максимальная задержка по маршрутам требований:</b> {route_max_text}"))
+        layout.addWidget(QLabel(f"<b>Средняя задержка пакета (Клейнрок, по трафику):</b> {kleinrock_text}"))
+
+        self.demands_table = self._demand_table()
+        shown = range(min(len(demand_report.delays), MAX_DEMAND_ROWS))
+        self.populate_demands(self.demands_table, demand_report, shown)
+        self.worst_table = self._demand_table()
+        self.populate_demands(self.worst_table, demand_report, demand_report.worst(WORST_DEMANDS))
+
+        tabs = QTabWidget()
+        tabs.addTab(self.table, "Каналы")
+        demands_title = "Требования"
+        if len(demand_report.delays) > MAX_DEMAND_ROWS:
+            demands_title += f" (первые {MAX_DEMAND_ROWS} из {len(demand_report.delays)})"
+        tabs.addTab(self.demands_table, demands_title)
+        tabs.addTab(self.worst_table, f"Худшие {WORST_DEMANDS}")
+        layout.addWidget(tabs)
+
+    def _demand_table(self):
+        table = QTableWidget()
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(["Откуда", "Куда", "Объем (Мбит/с)", "Хопов", "Задержка (мс)"])
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        return table
+
+    @timed("edges_table_fill")
     def populate_table(self, edges):
         # Сортируем ребра, чтобы вывод был всегда одинаковым
         sorted_edges = sorted(edges, key=lambda e: (e.from_id, e.to_id))
@@ -63,3 +111,16 @@ class EvaluationDialog(QDialog):
             self.table.setItem(row, 4, QTableWidgetItem(f"{utilization:.2f} %"))
             self.table.setItem(row, 5, QTableWidgetItem(delay_text))
             self.table.setItem(row, 6, QTableWidgetItem(f"{edge.cost:.2f}"))
+
+    @timed("demands_table_fill")
+    def populate_demands(self, table, report, rows):
+        rows = list(rows)
+        count("rows", len(rows))
+        table.setRowCount(len(rows))
+        for row, d in enumerate(rows):
+            hops = int(report.hops[d])
+            table.setItem(row, 0, QTableWidgetItem(str(report.from_ids[d])))
+            table.setItem(row, 1, QTableWidgetItem(str(report.to_ids[d])))
+            table.setItem(row, 2, QTableWidgetItem(f"{report.volumes[d]:.2f}"))
+            table.setItem(row, 3, QTableWidgetItem(str(hops) if hops >= 0 else "-"))
+            table.setItem(row, 4, QTableWidgetItem(_delay_text(float(report.delays[d]))))
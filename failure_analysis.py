@@ -0,0 +1,350 @@
+# failure_analysis.py
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dynamic_routes import DynamicHopRoutes, UNREACHABLE
+from network_arrays import TopologyArrays, DemandRoutes, mm1_delays, path_sums
+
+# Меньше этого числа сценариев выгоднее считать в текущем процессе, без пула
+MIN_SCENARIOS_FOR_POOL = 64
+
+
+@dataclass
+class FailureResult:
+    """Итог одного сценария отказа."""
+    element: Tuple[int, ...]   # (from_id, to_id) отказавшего канала или (node_id,) узла
+    lost_volume: float         # трафик, для которого не осталось пути, Мбит/с
+    rerouted_demands: int      # сколько требований пришлось перемаршрутизировать
+    overloaded_edges: int      # каналы с загрузкой не ниже порога перегрузки
+    max_utilization: float     # максимальная загрузка канала (доля)
+    max_delay: float           # максимальная сквозная задержка по маршрутам, мс
+
+
+def rank_results(results: List[FailureResult]) -> List[FailureResult]:
+    """Самые тяжелые отказы - первыми: потеря трафика, перегрузки, задержка."""
+    return sorted(results, key=lambda r: (-r.lost_volume, -r.overloaded_edges,
+                                          -r.max_delay, -r.max_utilization))
+
+
+# --- Состояние дочернего процесса ---
+# Крупные массивы (таблицы dist/parent N×N, маршруты требований, индекс рёбер)
+# лежат в общей памяти: процессы пула подключаются к ним, а не получают
+# собственную копию. Каждому процессу передаются только описания массивов
+# и небольшие TopologyArrays. Всё используется сценариями только для чтения.
+
+_shared: Dict = {}
+
+_ROUTE_ARRAYS = ("source", "target", "volume", "path_ptr", "path_edges")
+
+
+@dataclass(frozen=True)
+class _SharedArray:
+    """Описание массива в общей памяти, которое передается процессу пула."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+    def attach(self, blocks: List[shared_memory.SharedMemory]) -> np.ndarray:
+        block = shared_memory.SharedMemory(name=self.name)
+        blocks.append(block)
+        array = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+        array.flags.writeable = False
+        return array
+
+
+def _share_arrays(state: Dict, blocks: List[shared_memory.SharedMemory]) -> Dict:
+    """
+    Копирует массивы состояния в общую память и заменяет их описаниями.
+    Созданные блоки добавляются в blocks - их освобождает вызывающий.
+    """
+    def share(array: np.ndarray) -> _SharedArray:
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return _SharedArray(block.name, array.shape, array.dtype.str)
+
+    packed = {key: share(value) if isinstance(value, np.ndarray) else value for key, value in state.items()}
+    routes = state["demand_routes"]
+    packed["demand_routes"] = {name: share(getattr(routes, name)) for name in _ROUTE_ARRAYS}
+    return packed
+
+
+def _init_worker(state: Dict):
+    _shared.clear()
+    _shared.update(state)
+    if isinstance(state["demand_routes"], dict):
+        # Процесс пула: подключаемся к общей памяти и держим блоки открытыми до его завершения
+        blocks = []
+        for key, value in state.items():
+            if isinstance(value, _SharedArray):
+                _shared[key] = value.attach(blocks)
+        _shared["demand_routes"] = DemandRoutes(**{name: state["demand_routes"][name].attach(blocks)
+                                                   for name in _ROUTE_ARRAYS})
+        _shared["blocks"] = blocks
+    topology = state["topology"]
+    _shared["adj"] = topology.adjacency_lists()
+    edge_lookup = {}
+    for e, (u, v) in enumerate(zip(topology.edge_u.tolist(), topology.edge_v.tolist())):
+        edge_lookup[(u, v)] = e
+        edge_lookup[(v, u)] = e
+    _shared["edge_lookup"] = edge_lookup
+
+
+def _repaired_paths(source: int, targets, removed_edges, removed_nodes) -> Dict[int, List[int]]:
+    """
+    Чинит дерево кратчайших путей источника после отказа: заново подвешивает
+    только поддеревья, оторванные от корня, остальное дерево не трогается.
+    Возвращает рёбра новых путей до указанных целей (недостижимые цели отсутствуют).
+    """
+    adj, edge_lookup = _shared["adj"], _shared["edge_lookup"]
+    topology = _shared["topology"]
+    parent = _shared["parent"][source]
+    dist = _shared["dist"][source]
+
+    # Корни оторванных поддеревьев: узлы, чье ребро к предку отказало или чей предок отказал
+    roots = []
+    for e in removed_edges:
+        u, v = int(topology.edge_u[e]), int(topology.edge_v[e])
+        if parent[v] == u:
+            roots.append(v)
+        elif parent[u] == v:
+            roots.append(u)
+    for k in removed_nodes:
+        roots.extend(y for y, _ in adj[k] if parent[y] == k and y not in removed_nodes)
+
+    subtree = list(roots)
+    in_subtree = set(roots)
+    i = 0
+    while i < len(subtree):
+        x = subtree[i]
+        i += 1
+        for y, _ in adj[x]:
+            if parent[y] == x and y not in in_subtree and y not in removed_nodes:
+                in_subtree.add(y)
+                subtree.append(y)
+
+    # Дейкстра по числу хопов внутри поддерева, стартуя от соседей из уцелевшей части дерева
+    new_dist: Dict[int, int] = {}
+    new_parent: Dict[int, Tuple[int, int]] = {}
+    pq = []
+    for x in subtree:
+        for y, e in adj[x]:
+            if y in in_subtree or y in removed_nodes or e in removed_edges or parent[y] < 0 and y != source:
+                continue
+            candidate = int(dist[y]) + 1
+            if candidate < new_dist.get(x, UNREACHABLE):
+                new_dist[x] = candidate
+                new_parent[x] = (y, e)
+        if x in new_dist:
+            heapq.heappush(pq, (new_dist[x], x))
+    while pq:
+        d, x = heapq.heappop(pq)
+        if d > new_dist[x]:
+            continue
+        for y, e in adj[x]:
+            if y in in_subtree and e not in removed_edges and d + 1 < new_dist.get(y, UNREACHABLE):
+                new_dist[y] = d + 1
+                new_parent[y] = (x, e)
+                heapq.heappush(pq, (d + 1, y))
+
+    paths = {}
+    for t in targets:
+        if t in in_subtree and t not in new_parent:
+            continue  # Поддерево так и не удалось подвесить - цель отрезана
+        path = []
+        current = t
+        while current != source:
+            if current in new_parent:
+                previous, e = new_parent[current]
+            else:
+                previous = int(parent[current])
+                e = edge_lookup[(previous, current)]
+            path.append(e)
+            current = previous
+        paths[t] = path
+    return paths
+
+
+def _evaluate_scenario(element, affected: np.ndarray, removed_edges, removed_nodes) -> FailureResult:
+    """
+    Переводит затронутые требования на новые пути и оценивает сеть:
+    потоки меняются только на старых и новых путях этих требований.
+    """
+    routes: DemandRoutes = _shared["demand_routes"]
+    edge_count = _shared["topology"].edge_count
+    flow = _shared["base_flow"].copy()
+    lost_volume = 0.0
+    rerouted = 0
+    new_paths: Dict[int, List[int]] = {}
+
+    if affected.size:
+        old_ptr, old_edges = routes.subset_paths(affected)
+        old_volume = np.repeat(routes.volume[affected], np.diff(old_ptr))
+        flow -= np.bincount(old_edges, weights=old_volume, minlength=edge_count)
+
+        # Источники и получатели на отказавшем узле просто теряют трафик
+        by_source: Dict[int, List[int]] = {}
+        for d in affected.tolist():
+            s, t = int(routes.source[d]), int(routes.target[d])
+            if s in removed_nodes or t in removed_nodes:
+                lost_volume += routes.volume[d]
+                continue
+            by_source.setdefault(s, []).append(d)
+        for s, demand_ids in by_source.items():
+            paths = _repaired_paths(s, {int(routes.target[d]) for d in demand_ids},
+                                    removed_edges, removed_nodes)
+            for d in demand_ids:
+                path = paths.get(int(routes.target[d]))
+                if path is None:
+                    lost_volume += routes.volume[d]
+                else:
+                    new_paths[d] = path
+                    rerouted += 1
+        if new_paths:
+            new_edges = np.fromiter((e for p in new_paths.values() for e in p), dtype=np.int64)
+            new_volume = np.repeat([routes.volume[d] for d in new_paths], [len(p) for p in new_paths.values()])
+            flow += np.bincount(new_edges, weights=new_volume, minlength=edge_count)
+        flow[np.abs(flow) < 1e-9] = 0.0
+
+    capacity = _shared["capacity"]
+    delays = mm1_delays(flow, capacity, _shared["avg_packet_size_bits"])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(capacity > 0, flow / capacity, np.where(flow > 0, np.inf, 0.0))
+    if removed_edges:
+        utilization[list(removed_edges)] = 0.0
+    overloaded = int(np.count_nonzero(utilization >= _shared["overload_threshold"]))
+    max_utilization = float(utilization.max()) if utilization.size else 0.0
+
+    # Задержки пересчитываем только у требований, чьи пути прошли через изменившиеся рёбра
+    changed_edges = np.nonzero(flow != _shared["base_flow"])[0]
+    edge_ptr, edge_demands = _shared["edge_ptr"], _shared["edge_demands"]
+    changed_edges = changed_edges[changed_edges < len(edge_ptr) - 1]
+    touched = np.zeros(routes.demand_count, dtype=bool)
+    for e in changed_edges.tolist():
+        touched[edge_demands[edge_ptr[e]:edge_ptr[e + 1]]] = True
+    touched[affected] = False
+
+    max_delay = 0.0
+    base_sums = _shared["base_sums"]
+    untouched = ~touched
+    untouched[affected] = False
+    if untouched.any():
+        max_delay = float(base_sums[untouched].max())
+    touched_ids = np.nonzero(touched)[0]
+    if touched_ids.size:
+        ptr, edges = routes.subset_paths(touched_ids)
+        max_delay = max(max_delay, float(path_sums(delays, ptr, edges).max()))
+    for path in new_paths.values():
+        max_delay = max(max_delay, float(delays[path].sum()))
+
+    return FailureResult(element=element, lost_volume=float(lost_volume), rerouted_demands=rerouted,
+                         overloaded_edges=overloaded, max_utilization=max_utilization, max_delay=max_delay)
+
+
+def _link_failure_chunk(edge_ids: List[int]) -> List[FailureResult]:
+    topology: TopologyArrays = _shared["topology"]
+    edge_ptr, edge_demands = _shared["edge_ptr"], _shared["edge_demands"]
+    results = []
+    for k in edge_ids:
+        if k < len(edge_ptr) - 1:
+            affected = edge_demands[edge_ptr[k]:edge_ptr[k + 1]]
+        else:
+            affected = np.empty(0, dtype=np.int32)
+        element = (int(topology.node_ids[topology.edge_u[k]]), int(topology.node_ids[topology.edge_v[k]]))
+        results.append(_evaluate_scenario(element, affected, {k}, set()))
+    return results
+
+
+def _node_failure_chunk(node_indices: List[int]) -> List[FailureResult]:
+    topology: TopologyArrays = _shared["topology"]
+    edge_ptr, edge_demands = _shared["edge_ptr"], _shared["edge_demands"]
+    results = []
+    for k in node_indices:
+        incident = topology.adj_edge[topology.adj_ptr[k]:topology.adj_ptr[k + 1]].tolist()
+        # Через узел проходят или в нем начинаются/заканчиваются ровно те требования,
+        # чьи маршруты используют хотя бы одно из его рёбер
+        affected = [edge_demands[edge_ptr[e]:edge_ptr[e + 1]] for e in incident if e < len(edge_ptr) - 1]
+        affected = np.unique(np.concatenate(affected)) if affected else np.empty(0, dtype=np.int32)
+        element = (int(topology.node_ids[k]),)
+        results.append(_evaluate_scenario(element, affected, set(incident), {k}))
+    return results
+
+
+# --- Запуск ---
+
+def _shared_state(topology: TopologyArrays, demand_routes: DemandRoutes, route_trees,
+                  avg_packet_size_bits: int, overload_threshold: float) -> Dict:
+    base_flow = demand_routes.edge_flows(topology.edge_count)
+    base_delays = mm1_delays(base_flow, topology.capacity, avg_packet_size_bits)
+    edge_ptr, edge_demands = demand_routes.edge_demand_index()
+    return {
+        "topology": topology,
+        "demand_routes": demand_routes,
+        "dist": route_trees.dist,
+        "parent": route_trees.parent,
+        "base_flow": base_flow,
+        "capacity": topology.capacity,
+        "avg_packet_size_bits": avg_packet_size_bits,
+        "overload_threshold": overload_threshold,
+        "edge_ptr": edge_ptr,
+        "edge_demands": edge_demands,
+        "base_sums": path_sums(base_delays, demand_routes.path_ptr, demand_routes.path_edges),
+    }
+
+
+def _run_chunks(chunk_function, scenarios: List, state: Dict, workers: int | None) -> List[FailureResult]:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(scenarios) < MIN_SCENARIOS_FOR_POOL:
+        _init_worker(state)
+        return chunk_function(scenarios)
+    # Несколько кусков на процесс, чтобы выровнять нагрузку
+    chunk_size = max(1, len(scenarios) // (workers * 4))
+    chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+    results = []
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        packed = _share_arrays(state, blocks)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(packed,)) as pool:
+            for chunk_results in pool.map(chunk_function, chunks):
+                results.extend(chunk_results)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return results
+
+
+def link_failure_sweep(topology: TopologyArrays, demand_routes: DemandRoutes, route_trees: DynamicHopRoutes,
+                       avg_packet_size_bits: int, overload_threshold: float,
+                       workers: int | None = None) -> List[FailureResult]:
+    """
+    Анализ N-1 по каналам: по очереди "отключает" каждое ребро, перемаршрутизирует
+    только проходившие через него требования (починкой деревьев путей route_trees)
+    и оценивает загрузку и задержки.
+    Пропускные способности остаются такими, как их выбрал Этап 3.
+    Возвращает сценарии, отсортированные от самого тяжелого.
+    """
+    state = _shared_state(topology, demand_routes, route_trees, avg_packet_size_bits, overload_threshold)
+    results = _run_chunks(_link_failure_chunk, list(range(topology.edge_count)), state, workers)
+    return rank_results(results)
+
+
+def node_failure_sweep(topology: TopologyArrays, demand_routes: DemandRoutes, route_trees: DynamicHopRoutes,
+                       avg_packet_size_bits: int, overload_threshold: float,
+                       workers: int | None = None) -> List[FailureResult]:
+    """
+    Анализ N-1 по узлам: по очереди "отключает" каждый узел вместе с его рёбрами.
+    Трафик, который начинался или заканчивался в узле, считается потерянным,
+    транзитный - перемаршрутизируется починкой только затронутых деревьев путей.
+    Возвращает сценарии, отсортированные от самого тяжелого.
+    """
+    state = _shared_state(topology, demand_routes, route_trees, avg_packet_size_bits, overload_threshold)
+    results = _run_chunks(_node_failure_chunk, list(range(topology.node_count)), state, workers)
+    return rank_results(results)
@@ -0,0 +1,86 @@
+# failure_dialog.py
+
+import csv
+
+from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QTableWidgetItem, QLabel, QAbstractItemView, QFileDialog, QMessageBox)
+
+
+def _delay_text(delay: float) -> str:
+    return f"{delay:.4f}" if delay != float('inf') else "∞ (Перегрузка)"
+
+
+class FailureAnalysisDialog(QDialog):
+    """Таблица сценариев отказа, отсортированная от самого тяжелого."""
+
+    def __init__(self, results, title, element_header, nodes, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setMinimumSize(900, 500)
+        self.results = results
+        self.nodes = nodes
+        self.element_header = element_header
+
+        worst = results[0] if results else None
+        if worst:
+            summary = (f"<b>Сценариев:</b> {len(results)}<br>"
+                       f"<b>Худший отказ:</b> {self._element_text(worst.element, nodes)} "
+                       f"(потеряно {worst.lost_volume:.2f} Мбит/с, "
+                       f"перегружено каналов: {worst.overloaded_edges})")
+        else:
+            summary = "<b>Нет сценариев для анализа.</b>"
+        summary_label = QLabel(summary)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels([
+            element_header, "Потеряно (Мбит/с)", "Перемаршрутизировано",
+            "Перегружено каналов", "Макс. загрузка (%)", "Макс. задержка (мс)"
+        ])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.populate_table(results, nodes)
+
+        export_button = QPushButton("Экспорт в CSV...")
+        export_button.clicked.connect(self.export_csv)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(export_button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(summary_label)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons_layout)
+
+    @staticmethod
+    def _element_text(element, nodes) -> str:
+        return " - ".join(nodes[node_id].name if node_id in nodes else str(node_id) for node_id in element)
+
+    def populate_table(self, results, nodes):
+        self.table.setRowCount(len(results))
+        for row, result in enumerate(results):
+            utilization = result.max_utilization * 100
+            utilization_text = f"{utilization:.2f} %" if utilization != float('inf') else "∞"
+            self.table.setItem(row, 0, QTableWidgetItem(self._element_text(result.element, nodes)))
+            self.table.setItem(row, 1, QTableWidgetItem(f"{result.lost_volume:.2f}"))
+            self.table.setItem(row, 2, QTableWidgetItem(str(result.rerouted_demands)))
+            self.table.setItem(row, 3, QTableWidgetItem(str(result.overloaded_edges)))
+            self.table.setItem(row, 4, QTableWidgetItem(utilization_text))
+            self.table.setItem(row, 5, QTableWidgetItem(_delay_text(result.max_delay)))
+
+    def export_csv(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Экспорт результатов", "", "CSV Files (*.csv)")
+        if not file_name: return
+        try:
+            # utf-8-sig и ';' - чтобы Excel сразу открыл файл с кириллицей по столбцам
+            with open(file_name, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow([self.element_header, "Потеряно (Мбит/с)", "Перемаршрутизировано",
+                                 "Перегружено каналов", "Макс. загрузка", "Макс. задержка (мс)"])
+                for result in self.results:
+                    writer.writerow([self._element_text(result.element, self.nodes), result.lost_volume,
+                                     result.rerouted_demands, result.overloaded_edges,
+                                     result.max_utilization, result.max_delay])
+            QMessageBox.information(self, "Экспорт", "Результаты сохранены.")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка экспорта", f"Произошла ошибка:\n{e}")
@@ -0,0 +1,243 @@
+# flow_deviation.py
+
+from dataclasses import dataclass
+from typing import Callable, List
+
+import numpy as np
+
+from data_models import TrafficDemand
+from instrumentation import timed, count
+from network_arrays import TopologyArrays, source_demand_rows
+
+# Выше этой загрузки функция задержки продолжается квадратичной параболой:
+# так стартовые перегруженные потоки (f >= C) тоже имеют конечную "цену"
+MAX_SMOOTH_UTILIZATION = 0.99
+# Цена потока по каналу без пропускной способности - им пользуемся только от безысходности
+ZERO_CAPACITY_PENALTY = 1e9
+# Сколько элементов (источники x дуги) обрабатываем за раз в поиске путей
+BLOCK_ELEMENTS = 4_000_000
+# Сколько итераций без роста доли трафика терпим, прежде чем признать нагрузку недопустимой
+FEASIBILITY_PATIENCE = 20
+# Метка потоков, распределенных по нескольким путям отклонением потока (рядом с режимами ECMP)
+LOAD_AWARE = "load"
+
+
+@dataclass
+class FlowDeviationResult:
+    """Итог маршрутизации с учетом нагрузки."""
+    flow: np.ndarray          # поток каждого ребра, Мбит/с
+    iterations: int
+    initial_avg_delay: float  # средняя задержка пакета (Клейнрок) до и после, мс
+    avg_delay: float
+    relative_gap: float       # относительный разрыв двойственности на последней итерации
+    converged: bool
+    feasible: bool            # удалось ли разместить весь трафик без перегрузки каналов
+
+
+def kleinrock_delay(flow: np.ndarray, capacity: np.ndarray, total_traffic: float,
+                    avg_packet_size_bits: int) -> float:
+    """
+    Средняя задержка пакета в сети по Клейнроку, мс:
+    T = 1/gamma * sum(f / (C - f)), где gamma - суммарный трафик в пакетах/с.
+    """
+    if total_traffic <= 0:
+        return 0.0
+    flow = np.asarray(flow, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    loaded = flow > 0
+    if np.any(flow[loaded] >= capacity[loaded]):
+        return float('inf')
+    ratio = flow[loaded] / (capacity[loaded] - flow[loaded])
+    gamma_pps = total_traffic * 1_000_000 / avg_packet_size_bits
+    return float(ratio.sum() / gamma_pps * 1000)
+
+
+# --- Функция цены и ее производные ---
+
+def _max_utilization(flow: np.ndarray, capacity: np.ndarray) -> float:
+    usable = capacity > 0
+    return float((flow[usable] / capacity[usable]).max()) if usable.any() else 0.0
+
+
+def _cost_terms(flow: np.ndarray, capacity: np.ndarray):
+    """
+    Значение D(f) = f / (C - f), производная D'(f) = C / (C - f)^2 и вторая производная
+    для каждого ребра. Выше MAX_SMOOTH_UTILIZATION - квадратичное продолжение.
+    """
+    usable = capacity > 0
+    cap = np.where(usable, capacity, 1.0)
+    edge = MAX_SMOOTH_UTILIZATION * cap
+    f = np.minimum(flow, edge)
+    slack = cap - f
+    value = f / slack
+    first = cap / slack ** 2
+    second = 2 * cap / slack ** 3
+    over = flow - f
+    value = value + first * over + 0.5 * second * over ** 2
+    first = first + second * over
+    value = np.where(usable, value, ZERO_CAPACITY_PENALTY * flow)
+    first = np.where(usable, first, ZERO_CAPACITY_PENALTY)
+    return value, first
+
+
+# --- Кратчайшие пути по маргинальной длине и назначение "всё или ничего" ---
+
+class _ShortestPathTrees:
+    """
+    Деревья кратчайших путей от всех источников, пересчитываемые на каждой итерации.
+    Расстояния ищутся векторизованным Беллманом-Фордом сразу для блока источников.
+    """
+
+    def __init__(self, topology: TopologyArrays, sources: np.ndarray, demand_rows: np.ndarray):
+        self.node_count, self.edge_count = topology.node_count, topology.edge_count
+        # Дуги берем из CSR-смежности: дуга j входит в узел своей группы из соседа adj_node[j]
+        self.arc_from = topology.adj_node.astype(np.int64)
+        self.arc_edge = topology.adj_edge
+        self.heads, self.slot_arcs = topology.in_arc_slots()
+        self.sources, self.demand_rows = sources, demand_rows
+        self.block = max(1, BLOCK_ELEMENTS // max(len(self.arc_from), self.node_count, 1))
+
+    def _distances(self, first: int, rows: np.ndarray, arc_length: np.ndarray) -> np.ndarray:
+        """Расстояния от источников блока: матрица (узлы x источники), строка узла непрерывна в памяти."""
+        dist = np.full((self.node_count, len(rows)), np.inf)
+        dist[self.sources[first:first + len(rows)], rows] = 0.0
+        slot_lengths = [arc_length[arcs][:, None] for arcs in self.slot_arcs]
+        slot_from = [self.arc_from[arcs] for arcs in self.slot_arcs]
+        while True:
+            current = dist[self.heads]
+            best = current.copy()
+            for from_nodes, lengths in zip(slot_from, slot_lengths):
+                width = len(from_nodes)
+                np.minimum(best[:width], dist[from_nodes] + lengths, out=best[:width])
+            if not (best < current).any():
+                return dist
+            dist[self.heads] = best
+
+    def assign(self, lengths: np.ndarray) -> np.ndarray:
+        """Потоки рёбер, если весь трафик пустить по кратчайшим путям при длинах lengths."""
+        arc_length = lengths[self.arc_edge]
+        result = np.zeros(self.edge_count)
+        for first in range(0, len(self.sources), self.block):
+            rows = np.arange(min(self.block, len(self.sources) - first))
+            block_sources = self.sources[first:first + len(rows)]
+            dist = self._distances(first, rows, arc_length)
+
+            # Предок узла - любая дуга, на которой достигается его расстояние
+            pred = np.full(dist.shape, -1, dtype=np.int32)
+            head_dist = dist[self.heads]
+            head_pred = np.full(head_dist.shape, -1, dtype=np.int32)
+            for arcs in self.slot_arcs:
+                width = len(arcs)
+                tight = dist[self.arc_from[arcs]] + arc_length[arcs][:, None] == head_dist[:width]
+                head_pred[:width][tight] = np.broadcast_to(arcs[:, None], tight.shape)[tight]
+            pred[self.heads] = head_pred
+            pred[block_sources, rows] = -1
+            reachable = np.isfinite(dist)
+            pred[~reachable] = -1
+            order = np.argsort(dist, axis=0, kind='stable')
+
+            # Суммы поддеревьев: узлы от дальних к ближним, каждый передает накопленное предку
+            carried = self.demand_rows[first:first + len(rows)].T.copy()
+            carried[~reachable] = 0.0
+            for nodes in order[::-1]:
+                arcs = pred[nodes, rows]
+                has_parent = arcs >= 0
+                parents = self.arc_from[arcs[has_parent]]
+                carried[parents, rows[has_parent]] += carried[nodes[has_parent], rows[has_parent]]
+            valid = pred >= 0
+            result += np.bincount(self.arc_edge[pred[valid]], weights=carried[valid],
+                                  minlength=self.edge_count)
+        return result
+
+
+def _line_search(flow: np.ndarray, target: np.ndarray, capacity: np.ndarray, steps: int = 40) -> float:
+    """Шаг alpha в [0, 1], минимизирующий цену на отрезке flow -> target (бисекция по производной)."""
+    direction = target - flow
+    low, high = 0.0, 1.0
+    _, first = _cost_terms(flow + direction, capacity)
+    if np.dot(first, direction) <= 0:
+        return 1.0
+    for _ in range(steps):
+        middle = (low + high) / 2
+        _, first = _cost_terms(flow + middle * direction, capacity)
+        if np.dot(first, direction) > 0:
+            high = middle
+        else:
+            low = middle
+    return (low + high) / 2
+
+
+@timed("flow_deviation")
+def flow_deviation(topology: TopologyArrays, demands: List[TrafficDemand], initial_flow: np.ndarray,
+                   avg_packet_size_bits: int, capacity: np.ndarray | None = None,
+                   tolerance: float = 1e-2, max_iterations: int = 200,
+                   progress: Callable[[int, float], None] | None = None) -> FlowDeviationResult:
+    """
+    Оптимальная маршрутизация методом отклонения потока (Герла, Франк-Вульф):
+    на каждой итерации трафик направляется по кратчайшим путям относительно
+    маргинальной задержки C / (C - f)^2 и смешивается с текущими потоками
+    с оптимальным шагом. Трафик пары узлов может делиться между несколькими путями.
+    Пропускные способности рёбер (по умолчанию - из topology) не меняются. Старт - с переданных потоков
+    (обычно это потоки маршрутов по числу хопов). Расчет останавливается, когда
+    относительный разрыв двойственности (оценка удаленности от оптимума) не больше tolerance.
+    """
+    if avg_packet_size_bits <= 0:
+        avg_packet_size_bits = 12000
+    capacity = topology.capacity if capacity is None else np.asarray(capacity, dtype=np.float64)
+    flow = np.asarray(initial_flow, dtype=np.float64).copy()
+
+    sources, demand_rows = source_demand_rows(topology, demands)
+    total_traffic = float(demand_rows.sum())
+
+    initial_delay = kleinrock_delay(flow, capacity, total_traffic, avg_packet_size_bits)
+    relative_gap = float('inf')
+    iterations = 0
+    converged = False
+    trees = _ShortestPathTrees(topology, sources, demand_rows)
+
+    # Перегруженный старт: сначала маршрутизируем долю scale трафика, при которой каналы
+    # не перегружены, и наращиваем ее после каждой итерации (первая фаза метода Герлы)
+    scale = 1.0
+    utilization = _max_utilization(flow, capacity)
+    if utilization > MAX_SMOOTH_UTILIZATION:
+        scale = MAX_SMOOTH_UTILIZATION / utilization
+        flow *= scale
+    stalled = 0
+
+    while iterations < max_iterations and len(sources):
+        iterations += 1
+        value, lengths = _cost_terms(flow, capacity)
+        target = trees.assign(lengths) * scale
+        # Разрыв двойственности: насколько линейная модель обещает уменьшить цену
+        gap = float(np.dot(lengths, flow - target))
+        objective = float(value.sum())
+        relative_gap = gap / objective if objective > 0 else 0.0
+        if progress is not None:
+            progress(iterations, relative_gap)
+        if scale == 1.0 and relative_gap <= tolerance:
+            converged = True
+            break
+        alpha = _line_search(flow, target, capacity)
+        flow += alpha * (target - flow)
+        if scale < 1.0:
+            utilization = _max_utilization(flow, capacity)
+            new_scale = min(1.0, scale * MAX_SMOOTH_UTILIZATION / utilization) if utilization > 0 else 1.0
+            stalled = stalled + 1 if new_scale <= scale * (1 + 1e-3) else 0
+            if new_scale > scale:
+                flow *= new_scale / scale
+                scale = new_scale
+            if stalled >= FEASIBILITY_PATIENCE:
+                # Весь трафик без перегрузки не помещается - дальше минимизируем штрафную цену
+                flow /= scale
+                scale = 1.0
+    if scale < 1.0:
+        flow /= scale
+    flow[np.abs(flow) < 1e-9] = 0.0
+
+    count("sources", len(sources))
+    count("iterations", iterations)
+    loaded = flow > 0
+    return FlowDeviationResult(flow=flow, iterations=iterations, initial_avg_delay=initial_delay,
+                               avg_delay=kleinrock_delay(flow, capacity, total_traffic, avg_packet_size_bits),
+                               relative_gap=relative_gap, converged=converged,
+                               feasible=bool(np.all(flow[loaded] < capacity[loaded])))
@@ -0,0 +1,209 @@
+# force_layout.py
+
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from instrumentation import count
+
+# Глубина квадродерева: ячейка последнего уровня - 1/2^16 стороны области
+TREE_DEPTH = 16
+# Критерий Барнса-Хата: ячейка размера s на расстоянии d заменяется центром масс, если s / d < THETA
+THETA = 0.8
+# Слабая пружина к центру, чтобы несвязные части графа не разлетались
+GRAVITY = 0.005
+# Начальная "температура" (наибольший шаг узла) - в размерах начальной области: горячий старт
+# дает сложенному графу развернуться; за всю раскладку температура падает в COOLING_RANGE раз
+START_TEMPERATURE = 3.0
+COOLING_RANGE = 1000.0
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Раздвигает 16 младших бит через один: abcd -> 0a0b0c0d (для кода Мортона)."""
+    v = values.astype(np.uint64) & np.uint64(0xFFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+
+@dataclass
+class QuadLevel:
+    """Непустые ячейки одного уровня квадродерева в порядке кода Мортона."""
+    mass: np.ndarray             # число узлов в ячейке
+    center: np.ndarray           # центр масс, (ячейки, 2)
+    child_start: np.ndarray      # дети - ячейки следующего уровня child_start..child_end-1
+    child_end: np.ndarray
+    size: float                  # сторона ячейки
+
+
+def build_quadtree(pos: np.ndarray) -> List[QuadLevel]:
+    """
+    Квадродерево без указателей: узлы сортируются по коду Мортона, тогда ячейка любого
+    уровня - отрезок отсортированного массива с общим префиксом кода, а ее дети -
+    отрезок ячеек следующего уровня. Все уровни строятся векторно, O(N log N).
+    """
+    low = pos.min(axis=0)
+    span = float((pos.max(axis=0) - low).max()) or 1.0
+    cells = 1 << TREE_DEPTH
+    grid = np.minimum(((pos - low) / span * cells).astype(np.int64), cells - 1)
+    codes = _spread_bits(grid[:, 0]) | (_spread_bits(grid[:, 1]) << np.uint64(1))
+    order = np.argsort(codes, kind='stable')
+    codes, ordered = codes[order], pos[order]
+
+    levels, prefixes = [], []
+    for level in range(1, TREE_DEPTH + 1):
+        prefix = codes >> np.uint64(2 * (TREE_DEPTH - level))
+        starts = np.flatnonzero(np.concatenate(([True], prefix[1:] != prefix[:-1])))
+        mass = np.diff(np.append(starts, len(codes))).astype(np.float64)
+        center = np.add.reduceat(ordered, starts, axis=0) / mass[:, None]
+        levels.append(QuadLevel(mass=mass, center=center, child_start=np.empty(0, dtype=np.int64),
+                                child_end=np.empty(0, dtype=np.int64), size=span / (1 << level)))
+        prefixes.append(prefix[starts])
+        # Все узлы уже в отдельных ячейках - глубже спускаться незачем
+        if len(starts) == len(codes):
+            break
+    for parent, child, parent_prefix, child_prefix in zip(levels, levels[1:], prefixes, prefixes[1:]):
+        up = child_prefix >> np.uint64(2)
+        parent.child_start = np.searchsorted(up, parent_prefix, side='left')
+        parent.child_end = np.searchsorted(up, parent_prefix, side='right')
+    return levels
+
+
+def repulsive_forces(pos: np.ndarray, levels: List[QuadLevel], k: float) -> np.ndarray:
+    """
+    Отталкивание k^2 / d от всех узлов по Барнсу-Хату: обход дерева идет сразу для всех
+    узлов, уровень за уровнем. Пара (узел, ячейка) либо принимается целиком (далекая
+    ячейка, ячейка из одного узла или последний уровень), либо заменяется парами с детьми.
+    """
+    n = len(pos)
+    force = np.zeros((n, 2))
+    # Корень (уровень 0) раскрываем сразу: каждый узел против всех ячеек первого уровня
+    first = levels[0]
+    bodies = np.repeat(np.arange(n), len(first.mass))
+    cells = np.tile(np.arange(len(first.mass)), n)
+    pairs = 0
+    for depth, level in enumerate(levels):
+        if not len(bodies):
+            break
+        pairs += len(bodies)
+        delta = pos[bodies] - level.center[cells]
+        distance2 = np.einsum('ij,ij->i', delta, delta)
+        last = depth == len(levels) - 1
+        accept = (level.mass[cells] == 1) | (level.size * level.size < THETA * THETA * distance2)
+        if last:
+            accept[:] = True
+        near = accept & (distance2 > 0)
+        scale = k * k * level.mass[cells[near]] / distance2[near]
+        force[:, 0] += np.bincount(bodies[near], weights=delta[near, 0] * scale, minlength=n)
+        force[:, 1] += np.bincount(bodies[near], weights=delta[near, 1] * scale, minlength=n)
+
+        open_bodies, open_cells = bodies[~accept], cells[~accept]
+        starts, ends = level.child_start[open_cells], level.child_end[open_cells]
+        counts = ends - starts
+        bodies = np.repeat(open_bodies, counts)
+        offsets = np.arange(len(bodies)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = np.repeat(starts, counts) + offsets
+    count("bh_pairs", pairs)
+    return force
+
+
+def attractive_forces(pos: np.ndarray, edge_u: np.ndarray, edge_v: np.ndarray, k: float) -> np.ndarray:
+    """Притяжение d^2 / k вдоль рёбер."""
+    n = len(pos)
+    delta = pos[edge_v] - pos[edge_u]
+    pull = delta * (np.sqrt(np.einsum('ij,ij->i', delta, delta)) / k)[:, None]
+    force = np.zeros((n, 2))
+    for axis in (0, 1):
+        force[:, axis] = (np.bincount(edge_u, weights=pull[:, axis], minlength=n)
+                          - np.bincount(edge_v, weights=pull[:, axis], minlength=n))
+    return force
+
+
+class ForceLayout:
+    """
+    Силовая раскладка Фрухтермана-Рейнгольда с отталкиванием по Барнсу-Хату:
+    шаг - O(N log N) вместо O(N^2). Длина ребра в идеале k = 1; перевод
+    в координаты холста - canvas_positions.
+    """
+
+    def __init__(self, positions: np.ndarray, edge_u: np.ndarray, edge_v: np.ndarray, iterations: int,
+                 seed: int = 0):
+        n = len(positions)
+        self.edge_u, self.edge_v = edge_u, edge_v
+        self.iterations = iterations
+        self.iteration = 0
+        self.k = 1.0
+        side = max(1.0, np.sqrt(n))
+        rng = np.random.default_rng(seed)
+        positions = np.asarray(positions, dtype=np.float64)
+        span = float((positions.max(axis=0) - positions.min(axis=0)).max()) if n else 0.0
+        if span > 0:
+            self.pos = (positions - positions.mean(axis=0)) / span * side
+        else:
+            # Все узлы в одной точке - координаты ничего не говорят, начинаем со случайных
+            self.pos = rng.uniform(-side / 2, side / 2, (n, 2))
+        # Совпадающие узлы разводим, иначе сила между ними не определена
+        self.pos += rng.uniform(-1e-3, 1e-3, self.pos.shape)
+        self.temperature = side * START_TEMPERATURE
+        self.cooling = COOLING_RANGE ** (-1 / max(1, iterations))
+
+    @property
+    def finished(self) -> bool:
+        return self.iteration >= self.iterations
+
+    def step(self):
+        pos = self.pos
+        if len(pos) > 1:
+            force = repulsive_forces(pos, build_quadtree(pos), self.k)
+            force += attractive_forces(pos, self.edge_u, self.edge_v, self.k)
+            offset = pos - pos.mean(axis=0)
+            force -= GRAVITY * offset * np.sqrt(np.einsum('ij,ij->i', offset, offset))[:, None] / self.k
+            length = np.sqrt(np.einsum('ij,ij->i', force, force))
+            step = np.minimum(length, self.temperature) / np.where(length > 0, length, 1.0)
+            pos += force * step[:, None]
+        self.temperature *= self.cooling
+        self.iteration += 1
+
+    def canvas_positions(self, width: int, height: int, margin: int) -> np.ndarray:
+        """Раскладка, вписанная в холст с сохранением пропорций, целые пиксели."""
+        pos = self.pos
+        if not len(pos):
+            return np.empty((0, 2), dtype=np.int64)
+        low, high = pos.min(axis=0), pos.max(axis=0)
+        span = np.maximum(high - low, 1e-9)
+        box = np.array([max(1, width - 2 * margin), max(1, height - 2 * margin)], dtype=np.float64)
+        scale = float((box / span).min())
+        fitted = (pos - low) * scale + margin + (box - span * scale) / 2
+        return np.rint(fitted).astype(np.int64)
+
+
+def free_position(occupied: np.ndarray, center, min_distance: float) -> tuple:
+    """
+    Ближайшая к center точка, удаленная от всех занятых не меньше чем на min_distance:
+    перебор точек спирали Ферма вокруг center (шаг - min_distance). Спираль доходит
+    до самого дальнего занятого места плюс min_distance, поэтому точка находится всегда.
+    """
+    center = np.asarray(center, dtype=np.float64)
+    if not len(occupied):
+        return int(center[0]), int(center[1])
+    occupied = np.asarray(occupied, dtype=np.float64)
+    farthest = float(np.sqrt(((occupied - center) ** 2).sum(axis=1).max()))
+    candidates = int(np.ceil((farthest / min_distance + 1) ** 2)) + 1
+    index = np.arange(candidates)
+    radius = min_distance * np.sqrt(index)
+    angle = index * np.pi * (3 - np.sqrt(5))
+    points = center + np.column_stack([radius * np.cos(angle), radius * np.sin(angle)])
+    # Кандидаты округляются до пикселей заранее, чтобы проверялась именно возвращаемая точка
+    points = np.rint(points)
+    block = max(1, 1_000_000 // len(occupied))
+    for first in range(0, candidates, block):
+        part = points[first:first + block]
+        delta = part[:, None, :] - occupied[None, :, :]
+        free = (np.einsum('ijk,ijk->ij', delta, delta) >= min_distance ** 2).all(axis=1)
+        if free.any():
+            x, y = part[int(np.argmax(free))]
+            return int(x), int(y)
+    return int(center[0]), int(center[1])
@@ -3,11 +3,14 @@
 import heapq
 import math
 
+from instrumentation import timed, count
+
 
 def _calculate_distance(p1, p2):
     return math.sqrt((p2[0] - p1[0]) ** 2 + (p2[1] - p1[1]) ** 2)
 
 
+@timed("prim_mst")
 def prim_mst(nodes: dict) -> list:
     if not nodes: return []
     mst_edges = []
@@ -19,18 +22,23 @@ def prim_mst(nodes: dict) -> list:
         if other_id != start_node_id:
             distance = _calculate_distance(nodes[start_node_id].position, other_node.position)
             heapq.heappush(edges_heap, (distance, start_node_id, other_id))
+    heap_pushes = len(edges_heap)
     while edges_heap and len(visited) < len(nodes):
         weight, u, v = heapq.heappop(edges_heap)
         if v in visited: continue
         visited.add(v)
         mst_edges.append((u, v))
+        heap_pushes += len(nodes) - len(visited)
         for next_id, next_node in nodes.items():
             if next_id not in visited:
                 distance = _calculate_distance(nodes[v].position, next_node.position)
                 heapq.heappush(edges_heap, (distance, v, next_id))
+    count("nodes", len(nodes))
+    count("heap_pushes", heap_pushes)
     return mst_edges
 
 
+@timed("dijkstra_all_pairs_hops")
 def dijkstra_all_pairs_hops(nodes: dict, edges: list) -> dict:
     if not nodes: return {}
     adj = {node_id: [] for node_id in nodes}
@@ -39,6 +47,7 @@ def dijkstra_all_pairs_hops(nodes: dict, edges: list) -> dict:
         adj[edge.to_id].append(edge.from_id)
     all_routes = {}
     node_ids = list(nodes.keys())
+    heap_pushes = 0
     for start_node in node_ids:
         distances = {node_id: float('inf') for node_id in node_ids}
         previous_nodes = {node_id: None for node_id in node_ids}
@@ -52,6 +61,7 @@ def dijkstra_all_pairs_hops(nodes: dict, edges: list) -> dict:
                     distances[neighbor] = distances[current_node] + 1
                     previous_nodes[neighbor] = current_node
                     heapq.heappush(pq, (distances[neighbor], neighbor))
+                    heap_pushes += 1
         for end_node in node_ids:
             if start_node == end_node or distances[end_node] == float('inf'): continue
             path = []
@@ -61,10 +71,15 @@ def dijkstra_all_pairs_hops(nodes: dict, edges: list) -> dict:
                 current = previous_nodes[current]
             path.reverse()
             all_routes[(start_node, end_node)] = path
+    count("nodes", len(nodes))
+    count("edges", len(edges))
+    count("heap_pushes", heap_pushes)
+    count("routes", len(all_routes))
     return all_routes
 
 
 # --- ВОЗВРАЩАЕМ СТАРУЮ, ПРОСТУЮ ФУНКЦИЮ РАСЧЕТА ЗАДЕРЖЕК ---
+@timed("calculate_edge_delays")
 def calculate_edge_delays(edges: list, avg_packet_size_bits: int):
     """Рассчитывает и обновляет задержку (delay) ТОЛЬКО для каждого ребра в мс."""
     if avg_packet_size_bits <= 0:
@@ -85,9 +100,11 @@ def calculate_edge_delays(edges: list, avg_packet_size_bits: int):
         # Формула для времени в системе
         delay_seconds = 1 / (capacity_pps - flow_pps)
         edge.delay = delay_seconds * 1000
+    count("edges", len(edges))
 
 
 # --- ВОЗВРАЩАЕМ СТАРЫЙ, ПРОСТОЙ ПОИСК МАКСИМАЛЬНОЙ ЗАДЕРЖКИ ---
+@timed("dijkstra_max_delay_path")
 def dijkstra_max_delay_path(nodes: dict, edges: list) -> float:
     """Находит путь с максимальной суммарной задержкой (только по ребрам)."""
     adj = {node_id: [] for node_id in nodes}
@@ -97,6 +114,7 @@ def dijkstra_max_delay_path(nodes: dict, edges: list) -> float:
             adj[edge.to_id].append((edge.from_id, edge.delay))
 
     max_delay_found = 0.0
+    heap_pushes = 0
     for start_node_id in nodes.keys():
         distances = {node_id: float('inf') for node_id in nodes.keys()}
         distances[start_node_id] = 0
@@ -109,6 +127,7 @@ def dijkstra_max_delay_path(nodes: dict, edges: list) -> float:
                 if distances[u] + weight < distances[v]:
                     distances[v] = distances[u] + weight
                     heapq.heappush(pq, (distances[v], v))
+                    heap_pushes += 1
 
         valid_distances = [d for d in distances.values() if d != float('inf')]
         if not valid_distances: continue
@@ -117,4 +136,6 @@ def dijkstra_max_delay_path(nodes: dict, edges: list) -> float:
         if current_max > max_delay_found:
             max_delay_found = current_max
 
+    count("nodes", len(nodes))
+    count("heap_pushes", heap_pushes)
     return max_delay_found
\ No newline at end of file
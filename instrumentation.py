@@ -0,0 +1,195 @@
+# instrumentation.py
+
+import cProfile
+import html
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from functools import wraps
+from typing import Dict, List
+
+# Сколько самых дорогих функций профилировщика сохраняем в замере
+PROFILE_TOP = 25
+# Сколько последних замеров верхнего уровня храним
+MAX_RECORDS = 200
+# Сколько мест программы с наибольшим приростом памяти сохраняем в замере
+MEMORY_TOP = 10
+
+
+@dataclass
+class Span:
+    """Замер одного этапа или шага: время, счетчики и вложенные шаги."""
+    name: str
+    started: float                        # время начала (time.time())
+    duration_s: float = 0.0
+    waiting_s: float = 0.0                # сколько шаг ждал пользователя в модальных окнах (не входит в duration_s)
+    counters: Dict[str, float] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    peak_memory_mb: float | None = None   # только для верхнего уровня при включенном tracemalloc
+    profile: List[dict] | None = None     # только для верхнего уровня при включенном cProfile
+    memory_top: List[dict] | None = None  # места с наибольшим приростом памяти (снимки tracemalloc)
+
+
+def _memory_rows(before: tracemalloc.Snapshot) -> List[dict]:
+    """Прирост памяти по строкам программы между снимком before и текущим моментом."""
+    after = tracemalloc.take_snapshot()
+    rows = []
+    for stat in after.compare_to(before, "lineno")[:MEMORY_TOP]:
+        frame = stat.traceback[0]
+        rows.append({"location": f"{frame.filename}:{frame.lineno}", "size_diff_mb": stat.size_diff / 2 ** 20,
+                     "blocks": stat.count_diff})
+    return rows
+
+
+def _profile_rows(profiler: cProfile.Profile) -> List[dict]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{function} ({filename}:{line})", "calls": calls,
+                     "tottime_s": tottime, "cumtime_s": cumtime})
+    rows.sort(key=lambda row: row["cumtime_s"], reverse=True)
+    return rows[:PROFILE_TOP]
+
+
+class Instrumentation:
+    """
+    Сборщик замеров. Шаги вкладываются друг в друга по стеку (свой стек у каждого потока);
+    счетчики добавляются к текущему шагу. Профилировщик и tracemalloc включаются
+    только вокруг шагов верхнего уровня и только по флагам - без них накладные
+    расходы сводятся к двум вызовам perf_counter на шаг.
+    """
+
+    def __init__(self):
+        self.records: List[Span] = []
+        self.profile_enabled = False
+        self.memory_enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+            self._local.paused_at = None
+        return self._local.stack
+
+    def pause(self):
+        """Начало ожидания пользователя (модальное окно): время до resume() не входит в открытые шаги."""
+        if self._stack() and self._local.paused_at is None:
+            self._local.paused_at = time.perf_counter()
+
+    def resume(self):
+        stack = self._stack()
+        if self._local.paused_at is not None:
+            waited = time.perf_counter() - self._local.paused_at
+            self._local.paused_at = None
+            for record in stack:
+                record.waiting_s += waited
+
+    @contextmanager
+    def span(self, name: str):
+        stack = self._stack()
+        record = Span(name, time.time())
+        parent = stack[-1] if stack else None
+        profiler, started_tracing, snapshot = None, False, None
+        if parent is None and self.memory_enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        if parent is None and self.profile_enabled:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None  # уже работает другой профилировщик
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            if parent is None:
+                self.resume()
+            record.duration_s = time.perf_counter() - start - record.waiting_s
+            stack.pop()
+            if profiler is not None:
+                profiler.disable()
+                record.profile = _profile_rows(profiler)
+            if snapshot is not None and tracemalloc.is_tracing():
+                record.peak_memory_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                record.memory_top = _memory_rows(snapshot)
+                if started_tracing:
+                    tracemalloc.stop()
+            if parent is not None:
+                parent.children.append(record)
+            else:
+                with self._lock:
+                    self.records.append(record)
+                    del self.records[:-MAX_RECORDS]
+
+    def count(self, name: str, value: float = 1):
+        """Добавляет value к счетчику текущего шага (вне шагов ничего не делает)."""
+        stack = self._stack()
+        if stack:
+            counters = stack[-1].counters
+            counters[name] = counters.get(name, 0) + value
+
+    def timed(self, name: str):
+        """Декоратор: весь вызов функции - отдельный шаг."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def last(self) -> Span | None:
+        return self.records[-1] if self.records else None
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def export_json(self, file_name: str):
+        with self._lock:
+            records = [asdict(record) for record in self.records]
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump({"profile_enabled": self.profile_enabled, "memory_enabled": self.memory_enabled,
+                       "records": records}, f, ensure_ascii=False, indent=2)
+
+
+def format_span_html(record: Span, profile_rows: int = 10) -> str:
+    """Дерево шагов замера для текстовой панели."""
+    lines = []
+
+    def walk(span: Span, depth: int):
+        counters = ", ".join(f"{key}={value:g}" for key, value in span.counters.items())
+        text = f"{'&nbsp;' * 4 * depth}{html.escape(span.name)}: <b>{span.duration_s * 1000:.1f} мс</b>"
+        if counters:
+            text += f" <i>({html.escape(counters)})</i>"
+        lines.append(text)
+        for child in span.children:
+            walk(child, depth + 1)
+
+    walk(record, 0)
+    if record.peak_memory_mb is not None:
+        lines.append(f"Пик памяти: {record.peak_memory_mb:.1f} МБ")
+        for row in (record.memory_top or [])[:profile_rows // 2]:
+            lines.append(f"{row['size_diff_mb']:+.1f} МБ - {html.escape(row['location'])}")
+    if record.profile:
+        lines.append("<b>Профиль (по суммарному времени):</b>")
+        for row in record.profile[:profile_rows]:
+            lines.append(f"{row['cumtime_s'] * 1000:.1f} мс, {row['calls']} выз. - {html.escape(row['function'])}")
+    return "<br>".join(lines)
+
+
+# Общий сборщик программы: алгоритмы пишут в него без передачи через параметры
+instrument = Instrumentation()
+span = instrument.span
+count = instrument.count
+timed = instrument.timed
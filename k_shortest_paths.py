@@ -0,0 +1,179 @@
+# k_shortest_paths.py
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from network_arrays import TopologyArrays
+
+# Больше путей на пару не ищем: дальше идут почти одинаковые обходы
+MAX_K = 10
+# Метрика длины пути
+HOP_WEIGHT = "hops"
+LENGTH_WEIGHT = "length"
+# Меньше пар выгоднее посчитать в текущем процессе
+MIN_PAIRS_FOR_POOL = 64
+
+
+@dataclass
+class KPath:
+    """Один из k кратчайших путей пары."""
+    nodes: List[int]          # id узлов пути
+    edges: List[int]          # индексы рёбер в списке рёбер проекта
+    cost: float               # длина пути в выбранной метрике
+    shared_with_primary: int  # сколько рёбер пути совпадает с первым (основным) путем
+
+
+class KShortestPaths:
+    """
+    k кратчайших простых путей по алгоритму Йена.
+    Повторное использование между поисками ответвлений:
+    - расстояния до цели в полном графе считаются один раз на цель и служат
+      эвристикой A* для каждого поиска ответвления (удаление рёбер расстояния
+      только увеличивает, поэтому эвристика допустима);
+    - ответвления пути ищутся только начиная с узла, где он сам отошел от
+      родительского пути (улучшение Лоулера) - более ранние уже перебраны.
+    """
+
+    def __init__(self, topology: TopologyArrays, weight: str = HOP_WEIGHT):
+        self.topology = topology
+        self.adj = topology.adjacency_lists()
+        if weight == LENGTH_WEIGHT:
+            self.weights = topology.length.tolist()
+        else:
+            self.weights = [1.0] * topology.edge_count
+        self._target = None
+        self._to_target: List[float] = []
+
+    def _distances_to(self, target: int) -> List[float]:
+        """Дейкстра от цели по полному графу (граф неориентированный); запоминается последняя цель."""
+        if self._target != target:
+            dist = [float('inf')] * self.topology.node_count
+            dist[target] = 0.0
+            heap = [(0.0, target)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for v, e in self.adj[u]:
+                    nd = d + self.weights[e]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+            self._target, self._to_target = target, dist
+        return self._to_target
+
+    def _search(self, source: int, target: int, blocked_nodes, blocked_edges):
+        """A* от source к target в обход запрещенных узлов и рёбер. Возвращает (стоимость, узлы, рёбра)."""
+        h = self._to_target
+        if h[source] == float('inf'):
+            return None
+        best = {source: 0.0}
+        parent = {source: (-1, -1)}
+        heap = [(h[source], 0.0, source)]
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if g > best[u]:
+                continue
+            if u == target:
+                nodes, edges = [u], []
+                while parent[u][0] != -1:
+                    u, e = parent[u]
+                    nodes.append(u)
+                    edges.append(e)
+                return g, nodes[::-1], edges[::-1]
+            for v, e in self.adj[u]:
+                if v in blocked_nodes or e in blocked_edges:
+                    continue
+                ng = g + self.weights[e]
+                if ng < best.get(v, float('inf')):
+                    best[v] = ng
+                    parent[v] = (u, e)
+                    heapq.heappush(heap, (ng + h[v], ng, v))
+        return None
+
+    def paths(self, source_id: int, target_id: int, k: int) -> List[KPath]:
+        """До k кратчайших простых путей между узлами с данными id (не больше MAX_K)."""
+        k = max(1, min(k, MAX_K))
+        index = self.topology.index
+        if source_id not in index or target_id not in index or source_id == target_id:
+            return []
+        source, target = index[source_id], index[target_id]
+        self._distances_to(target)
+        first = self._search(source, target, set(), set())
+        if first is None:
+            return []
+
+        # Найденные пути: (стоимость, узлы, рёбра, индекс узла ответвления)
+        found = [(first[0], first[1], first[2], 0)]
+        candidates = []
+        seen = {tuple(first[1])}
+        while len(found) < k:
+            cost, nodes, edges, deviation = found[-1]
+            root_cost = sum(self.weights[e] for e in edges[:deviation])
+            for i in range(deviation, len(nodes) - 1):
+                spur = nodes[i]
+                root = nodes[:i + 1]
+                # Рёбра, которыми уже найденные пути с тем же корнем уходят из узла ответвления
+                blocked_edges = {p_edges[i] for _, p_nodes, p_edges, _ in found
+                                 if len(p_nodes) > i + 1 and p_nodes[:i + 1] == root}
+                blocked_nodes = set(root[:-1])
+                spur_path = self._search(spur, target, blocked_nodes, blocked_edges)
+                if i > deviation:
+                    root_cost += self.weights[edges[i - 1]]
+                if spur_path is not None:
+                    total_nodes = root[:-1] + spur_path[1]
+                    key = tuple(total_nodes)
+                    if key not in seen:
+                        seen.add(key)
+                        heapq.heappush(candidates, (root_cost + spur_path[0], len(total_nodes), key,
+                                                    edges[:i] + spur_path[2], i))
+            if not candidates:
+                break
+            cost, _, key, path_edges, deviation = heapq.heappop(candidates)
+            found.append((cost, list(key), path_edges, deviation))
+
+        node_ids = self.topology.node_ids
+        primary = set(found[0][2])
+        return [KPath(nodes=[int(node_ids[u]) for u in p_nodes], edges=list(p_edges), cost=float(cost),
+                      shared_with_primary=len(primary.intersection(p_edges)))
+                for cost, p_nodes, p_edges, _ in found]
+
+
+# --- Массовый расчет в пуле процессов ---
+
+_shared: Dict = {}
+
+
+def _init_worker(topology: TopologyArrays, weight: str):
+    _shared.clear()
+    _shared["engine"] = KShortestPaths(topology, weight)
+
+
+def _pairs_chunk(pairs: List[Tuple[int, int]], k: int) -> List[Tuple[Tuple[int, int], List[KPath]]]:
+    engine: KShortestPaths = _shared["engine"]
+    return [(pair, engine.paths(pair[0], pair[1], k)) for pair in pairs]
+
+
+def bulk_k_shortest_paths(topology: TopologyArrays, pairs: List[Tuple[int, int]], k: int,
+                          weight: str = HOP_WEIGHT,
+                          workers: int | None = None) -> Dict[Tuple[int, int], List[KPath]]:
+    """
+    k кратчайших путей для многих пар (id узлов). Пары сортируются по цели,
+    чтобы расстояния до цели считались один раз на цель в каждом куске;
+    куски раздаются пулу процессов.
+    """
+    pairs = sorted(set(pairs), key=lambda pair: (pair[1], pair[0]))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) < MIN_PAIRS_FOR_POOL:
+        _init_worker(topology, weight)
+        return dict(_pairs_chunk(pairs, k))
+    chunk_size = max(1, len(pairs) // (workers * 4))
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    result = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(topology, weight)) as pool:
+        for chunk_result in pool.map(_pairs_chunk, chunks, [k] * len(chunks)):
+            result.update(chunk_result)
+    return result
@@ -0,0 +1,67 @@
+# layout_dialog.py
+
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QProgressBar
+
+from force_layout import ForceLayout
+
+# Промежуточные координаты отправляем на холст не чаще, чем раз в столько секунд
+FRAME_INTERVAL = 0.05
+
+
+class LayoutWorker(QThread):
+    """Итерации раскладки в фоновом потоке; холст получает промежуточные координаты."""
+    # (координаты холста (N, 2), номер итерации)
+    positionsReady = pyqtSignal(object, int)
+
+    def __init__(self, layout: ForceLayout, width: int, height: int, margin: int, parent=None):
+        super().__init__(parent)
+        self.layout = layout
+        self.width, self.height, self.margin = width, height, margin
+
+    def run(self):
+        shown = 0.0
+        while not self.layout.finished and not self.isInterruptionRequested():
+            self.layout.step()
+            now = time.perf_counter()
+            if now - shown >= FRAME_INTERVAL or self.layout.finished:
+                shown = now
+                self.positionsReady.emit(self.canvas_positions(), self.layout.iteration)
+
+    def canvas_positions(self):
+        return self.layout.canvas_positions(self.width, self.height, self.margin)
+
+
+class AutoLayoutDialog(QDialog):
+    """Ход авто-раскладки: применить текущие координаты можно в любой момент."""
+
+    def __init__(self, iterations: int, node_count: int, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Авто-раскладка узлов")
+        self.setMinimumWidth(420)
+        self.started = time.perf_counter()
+
+        self.status_label = QLabel(f"Узлов: {node_count}. Раскладка идет, холст обновляется по ходу расчета.")
+        self.progress = QProgressBar()
+        self.progress.setRange(0, iterations)
+        self.apply_button = QPushButton("Применить")
+        self.apply_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Отменить")
+        cancel_button.clicked.connect(self.reject)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.apply_button)
+        buttons_layout.addWidget(cancel_button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.progress)
+        layout.addLayout(buttons_layout)
+
+    def set_progress(self, iteration: int):
+        self.progress.setValue(iteration)
+        if iteration >= self.progress.maximum():
+            self.status_label.setText(f"Раскладка завершена за {time.perf_counter() - self.started:.1f} с. "
+                                      f"Применить новые координаты?")
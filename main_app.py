@@ -1,16 +1,17 @@
 # main_app.py
 
 import sys
-import json
+import multiprocessing
 import math
 import random
-from dataclasses import asdict, is_dataclass
 from typing import Dict, List
 
+import numpy as np
 import openpyxl
-from PyQt6.QtGui import QAction, QKeySequence
-from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QFileDialog, QInputDialog
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QAction, QActionGroup, QKeySequence
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QMessageBox, QFileDialog, QInputDialog, QMenu,
+                             QToolBar, QSlider, QLabel)
+from PyQt6.QtCore import Qt, QTimer, QEvent
 
 # Наши модули
 from ui_main_window import Ui_MainWindow
@@ -20,15 +21,51 @@ from graph_algorithms import (prim_mst, dijkstra_all_pairs_hops,
 from routes_dialog import RoutesDialog
 from evaluation_dialog import EvaluationDialog
 from load_settings_dialog import LoadSettingsDialog
-
-class EnhancedJSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if is_dataclass(o):
-            return asdict(o)
-        return super().default(o)
+from project_io import save_project_json, load_project_json
+from change_journal import ChangeJournal, UNTITLED_PROJECT
+import topology_versions as tv
+import disk_cache
+from dynamic_routes import DynamicHopRoutes, HopRouteView
+from stage3_logic import build_edge_index, accumulate_flows, select_capacity, apply_demand_delta
+from network_arrays import TopologyArrays, DemandRoutes
+from failure_analysis import link_failure_sweep, node_failure_sweep
+from failure_dialog import FailureAnalysisDialog
+from reliability import estimate_reliability
+from capacity_optimizer import optimize_capacities, MAX_DELAY_BUDGET, AVG_DELAY_BUDGET
+from topology_optimizer import CutSaturationOptimizer
+from flow_deviation import flow_deviation, kleinrock_delay, LOAD_AWARE
+from ecmp_routing import ecmp_edge_flows, SPLIT_EVEN, SPLIT_BY_PATHS
+from k_shortest_paths import KShortestPaths, bulk_k_shortest_paths, MAX_K
+from demand_delays import demand_delays
+from parameter_sweep import unit_delays, sweep
+from sweep_dialog import SweepDialog
+from tariffs import (TariffCatalogue, DEFAULT_CATALOGUE, load_catalogues, compare_catalogues, catalogue_to_dict,
+                     catalogue_from_dict)
+from tariff_dialog import TariffComparisonDialog
+from packet_simulator import simulate_packets, expected_packet_hops
+from simulation_dialog import SimulationDialog
+from traffic_profiles import load_traffic_profile, slice_edge_flows, slice_edge_flows_ecmp
+from traffic_generator import TrafficModel, generate_traffic
+from traffic_generator_dialog import TrafficGeneratorDialog
+from force_layout import ForceLayout, free_position
+from layout_dialog import LayoutWorker, AutoLayoutDialog
+from instrumentation import instrument, span, count, format_span_html
+from memory_accounting import (available_memory, collection_bytes, routes_bytes, table_bytes, format_bytes,
+                               predict_routes_stage, predict_flows_stage, predict_generated_demands,
+                               MEMORY_WARNING_SHARE, COMPACT_ROUTE_ROWS)
+
+# Новый узел ставится не ближе этого расстояния к существующим (узел - круг радиуса 20 плюс подпись)
+NODE_SPACING = 60
+# Отступ раскладки от краев холста
+LAYOUT_MARGIN = 40
+# Как распределены текущие потоки, если не одним путем по числу хопов
+FLOW_ROUTING_TITLES = {
+    SPLIT_EVEN: "ECMP: поровну между равноценными путями",
+    SPLIT_BY_PATHS: "ECMP: пропорционально числу путей",
+    LOAD_AWARE: "с учетом нагрузки (отклонение потока)",
+}
 
 class MainWindow(QMainWindow, Ui_MainWindow):
-    AVAILABLE_CAPACITIES = [0, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
 
     def __init__(self):
         super().__init__()
@@ -39,6 +76,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.nodes: Dict[int, Node] = {}
         self.edges: List[Edge] = []
         self.routes: Dict = {}
+        self.demands: List[TrafficDemand] = []
         self.selected_node: Node | None = None
         self.selected_edge: Edge | None = None
         self.is_move_mode = False
@@ -47,37 +85,163 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.avg_packet_size_bits = 1500 * 8
         self.high_load_threshold = 0.6  # 60%
         self.overload_threshold = 0.9  # 90%
-
-        self.edgeCapacityComboBox.addItems([str(c) for c in self.AVAILABLE_CAPACITIES])
+        # Готовность элементов для оценки надежности
+        self.node_availability = 0.9999
+        self.link_availability = 0.999  # на каждые 100 единиц длины канала
+        # Деление трафика между равноценными путями (None - один путь по числу хопов)
+        self.ecmp_split: str | None = None
+        # Как распределены текущие потоки: None - один путь по числу хопов, режим ECMP или LOAD_AWARE
+        self.flow_routing: str | None = None
+        # Компактный режим: маршруты - деревья путей вместо словаря, потоковое чтение Excel
+        self.compact_memory = False
+        # Тарифы: по текущему каталогу Этап 3 подбирает пропускные способности и цены каналов
+        self.tariff = DEFAULT_CATALOGUE
+        self.tariff_catalogues = [DEFAULT_CATALOGUE]
+        # Параметры последней синтетической матрицы нагрузки
+        self.traffic_model = TrafficModel()
+        # Фоновая авто-раскладка: поток и его окно, пока раскладка идет
+        self.layout_worker: LayoutWorker | None = None
+        self.layout_dialog: AutoLayoutDialog | None = None
+        # Срез суточного профиля нагрузки, показанный на холсте (None - итоговые потоки)
+        self.active_slice: int | None = None
+
+        # Версии разделов проекта и кэш результатов, привязанный к ним
+        self.versions = tv.TopologyVersions()
+        self.result_cache = tv.ResultCache(self.versions)
+        self.routes_dialog_versions = None
+        # Кэш на диске переживает перезапуск программы
+        self.disk_cache = disk_cache.DiskCache()
+
+        # Журнал изменений для автосохранения и восстановления после сбоя
+        self.project_path: str | None = None
+        self.journal = ChangeJournal(UNTITLED_PROJECT)
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setInterval(2000)  # Сбрасываем пачку операций раз в 2 секунды
+        self.journal_timer.timeout.connect(self.flush_journal)
+        self.journal_timer.start()
+
+        self.edgeCapacityComboBox.addItems([str(c) for c in self.tariff.capacities])
         # Создаем новое действие (action)
+        self.actionAutoLayout = QAction("Авто-раскладка узлов", self)
+        self.menu_3.insertAction(self.actionCalculateRoutes, self.actionAutoLayout)
+        self.menu_3.insertSeparator(self.actionCalculateRoutes)
         self.actionSetPacketSize = QAction("Задать размер пакета", self)
         # Добавляем его в меню "Этапы"
         self.menu_3.insertAction(self.actionEvaluateProject, self.actionSetPacketSize)
 
+        self.actionChangeDemand = QAction("Изменить требование нагрузки", self)
+        self.menu_3.insertAction(self.actionSetPacketSize, self.actionChangeDemand)
+        self.actionLoadTrafficProfile = QAction("Загрузить суточный профиль нагрузки", self)
+        self.menu_3.insertAction(self.actionChangeDemand, self.actionLoadTrafficProfile)
+        self.actionGenerateTraffic = QAction("Сгенерировать нагрузку (модель)", self)
+        self.menu_3.insertAction(self.actionLoadTrafficProfile, self.actionGenerateTraffic)
+
         # Добавляем разделитель для красоты
         self.menu_3.insertSeparator(self.actionEvaluateProject)
         self.actionLoadSettings = QAction("Настроить уровни загрузки", self)
         self.menu_3.insertAction(self.actionEvaluateProject, self.actionLoadSettings)
+        self.actionParameterSweep = QAction("Сравнить размеры пакета и пороги", self)
+        self.menu_3.addAction(self.actionParameterSweep)
+
+        # Режим маршрутизации потоков для Этапа 3
+        self.menuRoutingMode = QMenu("Маршрутизация потоков", self)
+        self.menu_3.insertMenu(self.actionCalculateFlows, self.menuRoutingMode)
+        self.routingModeGroup = QActionGroup(self)
+        for title, split in (("Один путь по числу хопов", None),
+                             ("ECMP: поровну между равноценными путями", SPLIT_EVEN),
+                             ("ECMP: пропорционально числу путей", SPLIT_BY_PATHS)):
+            action = QAction(title, self, checkable=True)
+            action.setData(split)
+            action.setChecked(split == self.ecmp_split)
+            self.routingModeGroup.addAction(action)
+            self.menuRoutingMode.addAction(action)
+
+        # Меню анализа готового проекта
+        self.menuAnalysis = self.menubar.addMenu("Анализ")
+        self.actionLinkFailures = QAction("Отказы каналов (N-1)", self)
+        self.menuAnalysis.addAction(self.actionLinkFailures)
+        self.actionNodeFailures = QAction("Отказы узлов (N-1)", self)
+        self.menuAnalysis.addAction(self.actionNodeFailures)
+        self.actionReliability = QAction("Надежность сети (Монте-Карло)", self)
+        self.menuAnalysis.addAction(self.actionReliability)
+        self.actionBackupRoutes = QAction("Резервные маршруты требований (k кратчайших)", self)
+        self.menuAnalysis.addAction(self.actionBackupRoutes)
+        self.menuAnalysis.addSeparator()
+        self.actionOptimizeCapacities = QAction("Оптимизация пропускных способностей", self)
+        self.menuAnalysis.addAction(self.actionOptimizeCapacities)
+        self.actionOptimizeTopology = QAction("Оптимизация топологии (насыщенные разрезы)", self)
+        self.menuAnalysis.addAction(self.actionOptimizeTopology)
+        self.actionLoadAwareRouting = QAction("Маршрутизация с учетом нагрузки (отклонение потока)", self)
+        self.menuAnalysis.addAction(self.actionLoadAwareRouting)
+        self.actionPacketSimulation = QAction("Имитационное моделирование пакетов", self)
+        self.menuAnalysis.addAction(self.actionPacketSimulation)
+        self.menuAnalysis.addSeparator()
+        self.actionLoadTariffs = QAction("Загрузить тарифные каталоги...", self)
+        self.menuAnalysis.addAction(self.actionLoadTariffs)
+        self.actionCompareTariffs = QAction("Сравнить тарифные каталоги", self)
+        self.menuAnalysis.addAction(self.actionCompareTariffs)
+
+        # Замеры времени этапов и профилирование
+        self.menuDiagnostics = self.menubar.addMenu("Диагностика")
+        self.actionProfileCapture = QAction("Профилировать этапы (cProfile)", self, checkable=True)
+        self.menuDiagnostics.addAction(self.actionProfileCapture)
+        self.actionMemoryCapture = QAction("Замерять пик памяти (tracemalloc)", self, checkable=True)
+        self.menuDiagnostics.addAction(self.actionMemoryCapture)
+        self.menuDiagnostics.addSeparator()
+        self.actionExportMetrics = QAction("Экспорт замеров в JSON...", self)
+        self.menuDiagnostics.addAction(self.actionExportMetrics)
+        self.actionClearMetrics = QAction("Очистить замеры", self)
+        self.menuDiagnostics.addAction(self.actionClearMetrics)
+        self.menuDiagnostics.addSeparator()
+        self.actionMemoryReport = QAction("Оценка памяти проекта", self)
+        self.menuDiagnostics.addAction(self.actionMemoryReport)
+        self.actionCompactMemory = QAction("Компактный режим (экономия памяти)", self, checkable=True)
+        self.menuDiagnostics.addAction(self.actionCompactMemory)
+
+        self.menu.addSeparator()
+        self.actionPurgeCache = QAction("Очистить кэш результатов", self)
+        self.menu.addAction(self.actionPurgeCache)
+
+        # Ползунок срезов времени: появляется после загрузки суточного профиля
+        self.sliceToolBar = QToolBar("Срезы нагрузки", self)
+        self.sliceSlider = QSlider(Qt.Orientation.Horizontal, self.sliceToolBar)
+        self.sliceSlider.setMinimumWidth(300)
+        self.sliceLabel = QLabel(self.sliceToolBar)
+        self.sliceToolBar.addWidget(QLabel("Срез времени: ", self.sliceToolBar))
+        self.sliceToolBar.addWidget(self.sliceSlider)
+        self.sliceToolBar.addWidget(self.sliceLabel)
+        self.addToolBar(Qt.ToolBarArea.BottomToolBarArea, self.sliceToolBar)
+        self.sliceToolBar.hide()
+        self.menu_3.insertAction(self.actionChangeDemand, self.sliceToolBar.toggleViewAction())
 
         self.connect_signals()
         self.update_info_panels()
         self.edgeCostEdit.setReadOnly(True)
         self.update_legend()
 
-
+        # Проверяем, не осталось ли несохраненной работы после аварийного завершения
+        QTimer.singleShot(0, self.offer_recovery)
 
     def connect_signals(self):
         # Меню
-        self.actionLoadFromExcel.triggered.connect(self.load_from_excel)
-        self.actionLoadFromJson.triggered.connect(self.load_from_json)
-        self.actionSaveAsJson.triggered.connect(self.save_as_json)
-        self.actionCalculateRoutes.triggered.connect(self.calculate_routes)
-        self.actionCalculateFlows.triggered.connect(self.load_traffic_and_calculate_flows)
-        self.actionEvaluateProject.triggered.connect(self.evaluate_project)
+        self.actionLoadFromExcel.triggered.connect(self.measured("Этап 1: узлы и топология из Excel", self.load_from_excel))
+        self.actionLoadFromJson.triggered.connect(self.measured("Загрузка проекта (JSON)", self.load_from_json))
+        self.actionSaveAsJson.triggered.connect(self.measured("Сохранение проекта (JSON)", self.save_as_json))
+        self.actionCalculateRoutes.triggered.connect(self.measured("Этап 2: маршруты", self.calculate_routes))
+        self.actionCalculateFlows.triggered.connect(self.measured("Этап 3: нагрузка и потоки", self.load_traffic_and_calculate_flows))
+        self.actionLoadTrafficProfile.triggered.connect(
+            self.measured("Этап 3: суточный профиль нагрузки", self.load_traffic_profile_and_calculate_flows))
+        self.actionAutoLayout.triggered.connect(self.auto_layout)
+        self.actionGenerateTraffic.triggered.connect(self.measured("Этап 3: синтетическая нагрузка", self.generate_traffic_and_calculate_flows))
+        self.sliceSlider.valueChanged.connect(self.show_traffic_slice)
+        self.sliceToolBar.visibilityChanged.connect(self.set_slice_display)
+        self.actionChangeDemand.triggered.connect(self.measured("Изменение требования", self.change_demand))
+        self.actionEvaluateProject.triggered.connect(self.measured("Этап 4: оценка проекта", self.evaluate_project))
+        self.actionParameterSweep.triggered.connect(self.compare_scenarios)
 
         # Кнопки и чекбоксы
         self.addNodeButton.clicked.connect(self.add_node)
-        self.addNodeButton.setToolTip("Добавить новый узел в центр экрана")
+        self.addNodeButton.setToolTip("Добавить новый узел на свободное место у центра экрана")
         self.moveModeCheckBox.stateChanged.connect(self.move_mode_changed)
 
         # Панели свойств
@@ -99,6 +263,147 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # для ввода размера пакета
         self.actionSetPacketSize.triggered.connect(self.set_packet_size)
         self.actionLoadSettings.triggered.connect(self.open_load_settings)
+        self.actionPurgeCache.triggered.connect(self.purge_result_cache)
+        self.actionLinkFailures.triggered.connect(self.measured("Отказы каналов", self.analyze_link_failures))
+        self.actionNodeFailures.triggered.connect(self.measured("Отказы узлов", self.analyze_node_failures))
+        self.actionReliability.triggered.connect(self.measured("Надежность сети", self.estimate_network_reliability))
+        self.actionBackupRoutes.triggered.connect(self.measured("Резервные маршруты", self.plan_backup_routes))
+        self.actionOptimizeCapacities.triggered.connect(self.measured("Оптимизация пропускных способностей", self.optimize_capacities))
+        self.actionOptimizeTopology.triggered.connect(self.measured("Оптимизация топологии", self.optimize_topology))
+        self.actionLoadAwareRouting.triggered.connect(self.measured("Маршрутизация с учетом нагрузки", self.route_by_load))
+        self.actionPacketSimulation.triggered.connect(self.simulate_packet_delays)
+        self.actionLoadTariffs.triggered.connect(self.load_tariff_catalogues)
+        self.actionCompareTariffs.triggered.connect(self.measured("Сравнение тарифов", self.compare_tariffs))
+        self.routingModeGroup.triggered.connect(self.set_routing_mode)
+        self.actionProfileCapture.toggled.connect(self.set_profile_capture)
+        self.actionMemoryCapture.toggled.connect(self.set_memory_capture)
+        self.actionExportMetrics.triggered.connect(self.export_metrics)
+        self.actionClearMetrics.triggered.connect(self.clear_metrics)
+        self.actionMemoryReport.triggered.connect(self.show_memory_report)
+        self.actionCompactMemory.toggled.connect(self.set_compact_memory)
+
+    # --- Замеры этапов ---
+
+    def measured(self, name: str, method):
+        """Слот действия меню, выполняемый как замеряемый этап; итог показывается в панели."""
+        def run():
+            with span(name) as record:
+                method()
+            if record.peak_memory_mb is not None:
+                predicted = record.counters.get("predicted_peak_mb")
+                text = f"{name}: пик памяти {record.peak_memory_mb:.1f} МБ"
+                if predicted is not None:
+                    text += f" (прогноз {predicted:.1f} МБ)"
+                self.statusBar().showMessage(text, 10000)
+            self.refresh_debug_panel()
+        return run
+
+    def event(self, event):
+        # Пока открыто модальное окно, ожидание пользователя не входит во время этапа
+        if event.type() == QEvent.Type.WindowBlocked:
+            instrument.pause()
+        elif event.type() == QEvent.Type.WindowUnblocked:
+            instrument.resume()
+        return super().event(event)
+
+    def set_profile_capture(self, enabled: bool):
+        instrument.profile_enabled = enabled
+
+    def set_memory_capture(self, enabled: bool):
+        instrument.memory_enabled = enabled
+
+    def export_metrics(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Экспорт замеров", "", "JSON Files (*.json)")
+        if not file_name: return
+        try:
+            instrument.export_json(file_name)
+            self.statusBar().showMessage(f"Замеры сохранены: {len(instrument.records)}.", 5000)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка сохранения", f"Не удалось сохранить замеры:\n{e}")
+
+    def clear_metrics(self):
+        instrument.clear()
+        self.refresh_debug_panel()
+
+    # --- Учет памяти ---
+
+    def set_compact_memory(self, enabled: bool):
+        # Действует со следующего расчета: уже построенные маршруты остаются как есть
+        self.compact_memory = enabled
+
+    def confirm_memory(self, stage_name: str, predict) -> bool:
+        """
+        Перед тяжелым этапом: прогноз пика памяти predict(compact) сравнивается со свободной памятью.
+        Если не хватает - предлагает компактный режим. False - пользователь отменил этап.
+        """
+        predicted = sum(predict(self.compact_memory).values())
+        count("predicted_peak_mb", round(predicted / 2 ** 20, 1))
+        available = available_memory()
+        if available is None or predicted <= available * MEMORY_WARNING_SHARE:
+            return True
+        text = f"{stage_name}: прогноз пика памяти {format_bytes(predicted)}, свободно {format_bytes(available)}."
+        if self.compact_memory:
+            answer = QMessageBox.question(self, "Нехватка памяти", text + "\nПродолжить?")
+            return answer == QMessageBox.StandardButton.Yes
+        compact = sum(predict(True).values())
+        answer = QMessageBox.question(
+            self, "Нехватка памяти",
+            text + f"\nВ компактном режиме - около {format_bytes(compact)}. Включить компактный режим?\n"
+                   "(Нет - считать как обычно)",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel)
+        if answer == QMessageBox.StandardButton.Cancel:
+            return False
+        if answer == QMessageBox.StandardButton.Yes:
+            self.actionCompactMemory.setChecked(True)
+        return True
+
+    def show_memory_report(self):
+        """Занимаемая память по частям проекта и прогноз для Этапов 2 и 3."""
+        parts = {
+            "Узлы": collection_bytes(self.nodes),
+            "Рёбра": collection_bytes(self.edges),
+            "Требования": collection_bytes(self.demands),
+            "Маршруты": routes_bytes(self.routes),
+        }
+        if self.routes_dialog is not None:
+            parts["Таблица маршрутов (Qt)"] = table_bytes(self.routes_dialog.table)
+        lines = [f"{name}: {format_bytes(size)}" for name, size in parts.items()]
+        lines.append(f"Итого: {format_bytes(sum(parts.values()))}")
+        if self.nodes:
+            for title, predict in (("Этап 2", lambda compact: predict_routes_stage(self.nodes, self.edges, compact)),
+                                   ("Этап 3", lambda compact: predict_flows_stage(self.nodes, compact))):
+                lines.append("")
+                lines.append(f"Прогноз пика, {title} (N={len(self.nodes)}, E={len(self.edges)}):")
+                for compact in (False, True):
+                    prediction = predict(compact)
+                    mode = "компактный режим" if compact else "обычный режим"
+                    details = ", ".join(f"{name} {format_bytes(size)}" for name, size in prediction.items())
+                    lines.append(f"  {mode}: {format_bytes(sum(prediction.values()))} ({details})")
+        available = available_memory()
+        if available is not None:
+            lines.append("")
+            lines.append(f"Свободно памяти: {format_bytes(available)}")
+        QMessageBox.information(self, "Оценка памяти проекта", "\n".join(lines))
+
+    def refresh_debug_panel(self):
+        """Легенда и дерево шагов последнего замера."""
+        text = self.legend_html
+        record = instrument.last()
+        if record is not None:
+            text += "<hr><b>Последний замер:</b><br>" + format_span_html(record)
+        self.debugOutputTextEdit.setHtml(text)
+
+    def set_routing_mode(self, action: QAction):
+        split = action.data()
+        if split == self.ecmp_split:
+            return
+        self.ecmp_split = split
+        self.versions.bump(tv.ROUTING_MODE)
+        self.statusBar().showMessage("Режим маршрутизации изменен - загрузите нагрузку заново (Этап 3).", 5000)
+
+    def purge_result_cache(self):
+        freed = self.disk_cache.purge()
+        self.statusBar().showMessage(f"Кэш результатов очищен ({freed / (1024 * 1024):.1f} МБ).", 5000)
 
     def open_load_settings(self):
         dialog = LoadSettingsDialog(self.high_load_threshold, self.overload_threshold, self)
@@ -108,6 +413,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             new_values = dialog.get_values()
             self.high_load_threshold = new_values["high"]
             self.overload_threshold = new_values["overload"]
+            self.versions.bump(tv.THRESHOLDS)
 
             # Обновляем легенду и холст
             self.update_legend()
@@ -128,10 +434,55 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         <font color='#FFA500'>■</font> - Высокая нагрузка (&ge; {high_perc}%)<br>
         <font color='black'>■</font> - Нормальная нагрузка (&lt; {high_perc}%)
         """
-        self.debugOutputTextEdit.setHtml(legend_html)
+        self.legend_html = legend_html
+        self.refresh_debug_panel()
 
         self.debugOutputTextEdit.setReadOnly(True)
 
+    # --- Журнал изменений ---
+
+    def record_change(self, op: str, **data):
+        """Записывает изменение модели в журнал автосохранения."""
+        if self.journal.record(op, **data):
+            self.journal.compact(self.nodes, self.edges, self.project_tariff())
+
+    def flush_journal(self):
+        if self.journal.flush():
+            self.journal.compact(self.nodes, self.edges, self.project_tariff())
+
+    def snapshot_journal(self):
+        """После массовых изменений (загрузка, Этап 3) дешевле сразу сделать снимок."""
+        self.journal.compact(self.nodes, self.edges, self.project_tariff())
+
+    def offer_recovery(self):
+        if not self.journal.has_recovery_data():
+            return
+        answer = QMessageBox.question(self, "Восстановление",
+                                      "Найдены несохраненные изменения после аварийного завершения.\n"
+                                      "Восстановить их?")
+        if answer != QMessageBox.StandardButton.Yes:
+            self.journal.discard()
+            return
+        try:
+            recovered_nodes, recovered_edges, recovered_tariff, replayed = self.journal.recover()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка восстановления", f"Не удалось прочитать журнал:\n{e}")
+            return
+        self.nodes.clear(); self.edges.clear()
+        self.on_selection_cleared()
+        self.nodes.update(recovered_nodes)
+        self.edges.extend(recovered_edges)
+        self.set_tariff(catalogue_from_dict(recovered_tariff) if recovered_tariff else DEFAULT_CATALOGUE)
+        self.versions.bump_all()
+        self.drawingCanvas.update()
+        self.statusBar().showMessage(f"Восстановлено изменений из журнала: {replayed}.", 5000)
+
+    def closeEvent(self, event):
+        # Обычное закрытие - журнал больше не нужен, он нужен только на случай сбоя
+        self.journal_timer.stop()
+        self.journal.discard()
+        super().closeEvent(event)
+
 
     def _calculate_average_delay(self, edges: List[Edge]) -> float:
         """Рассчитывает среднюю задержку по всем загруженным каналам."""
@@ -152,18 +503,43 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
             return
 
-        calculate_edge_delays(self.edges, avg_packet_size_bits=self.avg_packet_size_bits)
-
-        # --- ИЗМЕНЯЕМ РАСЧЕТ СТОИМОСТИ ---
-        total_node_cost = sum(node.cost for node in self.nodes.values())
-        # Рассчитываем компоненты стоимости ребер отдельно
-        total_base_edge_cost = sum(self._calculate_cost_from_length(e.length) for e in self.edges)
-        total_capacity_edge_cost = sum(self._calculate_cost_from_capacity(e.capacity) for e in self.edges)
+        # Задержки и стоимость кэшируются отдельно: например, смена размера пакета
+        # требует пересчета задержек, но не стоимости
+        delays = self.result_cache.get("delays", tv.DELAYS_DEPENDS_ON)
+        if delays is None:
+            eval_key = disk_cache.evaluation_key(self.nodes, self.edges, self.avg_packet_size_bits)
+            delays = self.disk_cache.load_evaluation(eval_key, self.edges)
+            if delays is None:
+                calculate_edge_delays(self.edges, avg_packet_size_bits=self.avg_packet_size_bits)
+                max_delay = dijkstra_max_delay_path(self.nodes, self.edges)
+                avg_delay = self._calculate_average_delay(self.edges)
+                delays = (max_delay, avg_delay)
+                self.disk_cache.store_evaluation(eval_key, self.edges, max_delay, avg_delay)
+            self.result_cache.put("delays", tv.DELAYS_DEPENDS_ON, delays)
+        max_delay, avg_delay = delays
+
+        costs = self.result_cache.get("costs", tv.COSTS_DEPENDS_ON)
+        if costs is None:
+            # --- ИЗМЕНЯЕМ РАСЧЕТ СТОИМОСТИ ---
+            total_node_cost = sum(node.cost for node in self.nodes.values())
+            # Рассчитываем компоненты стоимости ребер отдельно
+            total_base_edge_cost = sum(self._calculate_cost_from_length(e.length) for e in self.edges)
+            total_capacity_edge_cost = sum(self._calculate_cost_from_capacity(e.capacity) for e in self.edges)
+            costs = (total_node_cost, total_base_edge_cost, total_capacity_edge_cost)
+            self.result_cache.put("costs", tv.COSTS_DEPENDS_ON, costs)
+        total_node_cost, total_base_edge_cost, total_capacity_edge_cost = costs
 
         total_project_cost = total_node_cost + total_base_edge_cost + total_capacity_edge_cost
 
-        max_delay = dijkstra_max_delay_path(self.nodes, self.edges)
-        avg_delay = self._calculate_average_delay(self.edges)
+        # Сквозные задержки требований по их маршрутам - если потоки рассчитаны для текущей сети
+        demand_report = None
+        # (у потоков ECMP и с учетом нагрузки у требования нет единственного маршрута - таблицы требований нет)
+        if self.demands and self.flow_routing is None and self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON):
+            demand_report = self.result_cache.get("demand_delays", tv.DEMAND_DELAYS_DEPENDS_ON)
+            if demand_report is None:
+                topology, _, route_trees = self.get_analysis_arrays()
+                demand_report = demand_delays(topology, route_trees, self.demands, self.avg_packet_size_bits)
+                self.result_cache.put("demand_delays", tv.DEMAND_DELAYS_DEPENDS_ON, demand_report)
 
         # Передаем все компоненты в диалог
         dialog = EvaluationDialog(
@@ -174,18 +550,45 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             capacity_edge_cost=total_capacity_edge_cost,
             max_delay=max_delay,
             avg_delay=avg_delay,
+            demand_report=demand_report,
             parent=self
         )
         dialog.exec()
 
+    def compare_scenarios(self):
+        if not self.edges or not any(edge.flow > 0 for edge in self.edges):
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
+            return
+        dialog = SweepDialog(self.avg_packet_size_bits // 8, self.high_load_threshold, self.overload_threshold, self)
+        dialog.sweepRequested.connect(lambda sizes, pairs: self.run_sweep(dialog, sizes, pairs))
+        dialog.exec()
+
+    def run_sweep(self, dialog: SweepDialog, packet_sizes: list, threshold_pairs: list):
+        with span("Сравнение сценариев"):
+            # Один расчет задержек на все сценарии; смена размера пакета его не сбрасывает
+            unit = self.result_cache.get("sweep_unit_delays", tv.SWEEP_DEPENDS_ON)
+            if unit is None:
+                demand_report = None
+                if (self.demands and self.flow_routing is None
+                        and self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON)):
+                    topology, _, route_trees = self.get_analysis_arrays()
+                    demand_report = demand_delays(topology, route_trees, self.demands, 1)
+                unit = unit_delays(self.nodes, self.edges, demand_report)
+                self.result_cache.put("sweep_unit_delays", tv.SWEEP_DEPENDS_ON, unit)
+            dialog.set_result(sweep(unit, packet_sizes, threshold_pairs))
+        self.refresh_debug_panel()
+
     def save_as_json(self):
         file_name, _ = QFileDialog.getSaveFileName(self, "Сохранить проект", "", "JSON Files (*.json)")
         if not file_name: return
 
         try:
-            data_to_save = {"nodes": list(self.nodes.values()), "edges": self.edges}
-            with open(file_name, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, cls=EnhancedJSONEncoder, indent=4, ensure_ascii=False)
+            # Пишем узлы и рёбра потоково, не собирая весь документ в памяти
+            save_project_json(file_name, self.nodes.values(), self.edges, self.project_tariff())
+            # Сохраненный файл становится новой точкой отсчета для журнала
+            self.journal.discard()
+            self.project_path = file_name
+            self.journal.set_project_path(file_name)
             QMessageBox.information(self, "Сохранение", "Проект успешно сохранен!")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка сохранения", f"Произошла ошибка:\n{e}")
@@ -195,52 +598,103 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         if not file_name: return
 
         try:
-            with open(file_name, 'r', encoding='utf-8') as f:
-                loaded_data = json.load(f)
+            # Узлы и рёбра создаются по мере разбора файла
+            loaded_nodes, loaded_edges, loaded_tariff = load_project_json(file_name)
 
             self.nodes.clear(); self.edges.clear()
             self.on_selection_cleared()
-
-            for node_data in loaded_data["nodes"]:
-                node_data['position'] = tuple(node_data['position'])
-                node = Node(**node_data)
-                self.nodes[node.id] = node
-
-            for edge_data in loaded_data["edges"]:
-                edge = Edge(**edge_data)
-                self.edges.append(edge)
+            self.nodes.update(loaded_nodes)
+            self.edges.extend(loaded_edges)
+            # Цены каналов проекта посчитаны по его каталогу - по нему же считаются и дальнейшие правки
+            self.set_tariff(catalogue_from_dict(loaded_tariff) if loaded_tariff else DEFAULT_CATALOGUE)
+            self.versions.bump_all()
+            self.journal.discard()
+            self.project_path = file_name
+            self.journal.set_project_path(file_name)
 
             self.drawingCanvas.update()
             QMessageBox.information(self, "Загрузка", "Проект успешно загружен!")
+            self.offer_recovery()
         except Exception as e:
             QMessageBox.critical(self, "Ошибка загрузки", f"Произошла ошибка:\n{e}")
 
     def _calculate_cost_from_capacity(self, capacity: float) -> float:
-        """
-        Вычисляет стоимость канала на основе его пропускной способности.
-        Реализует ступенчатую функцию, как в твоих заметках.
-        """
-        # Эти "пороги" и "цены" можно вынести в настройки, если нужно
-        if 0 < capacity <= 64:
-            return 100.0
-        elif 64 < capacity <= 128:
-            return 250.0
-        elif 128 < capacity <= 500:
-            return 600.0
-        elif capacity > 500:
-            return 1000.0
-        else:  # Для каналов с нулевым потоком
-            return 10.0  # Минимальная стоимость за "аренду линии"
+        """Стоимость оборудования канала по ступеням текущего каталога тарифов."""
+        return self.tariff.capacity_cost(capacity)
 
     def _calculate_cost_from_length(self, length: float) -> float:
-        if 0 < length <= 100:  # По вашему графику
-            return 50.0  # Условная цена
-        elif 100 < length <= 300:
-            return 150.0
-        elif length > 300:
-            return 400.0
-        else:
-            return 0.0
+        """Стоимость аренды линии по ступеням длины текущего каталога тарифов."""
+        return self.tariff.length_cost(length)
+
+    # --- Тарифные каталоги ---
+
+    def load_tariff_catalogues(self):
+        file_names, _ = QFileDialog.getOpenFileNames(self, "Загрузить тарифные каталоги", "", "JSON Files (*.json)")
+        if not file_names: return
+        loaded = []
+        try:
+            for file_name in file_names:
+                loaded.extend(load_catalogues(file_name))
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка загрузки", f"Не удалось прочитать каталог:\n{e}")
+            return
+        # Повторная загрузка файла заменяет его каталоги
+        sources = set(file_names)
+        self.tariff_catalogues = [c for c in self.tariff_catalogues if c.source not in sources] + loaded
+        self.statusBar().showMessage(f"Загружено каталогов: {len(loaded)} (всего {len(self.tariff_catalogues)}).",
+                                     5000)
+
+    def compare_tariffs(self):
+        if not self.edges or not any(edge.flow > 0 for edge in self.edges):
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
+            return
+        quotes = compare_catalogues([e.flow for e in self.edges], [e.length for e in self.edges],
+                                    self.tariff_catalogues)
+        current_cost = sum(edge.cost for edge in self.edges)
+        dialog = TariffComparisonDialog(quotes, self.tariff.name, current_cost, self)
+        if not dialog.exec():
+            return
+        quote = dialog.selected_quote()
+        if quote is not None:
+            self.apply_tariff(quote)
+
+    def project_tariff(self) -> dict | None:
+        """Каталог тарифов для файла проекта и журнала; встроенный не сохраняется."""
+        return None if self.tariff is DEFAULT_CATALOGUE else catalogue_to_dict(self.tariff)
+
+    def set_tariff(self, catalogue: TariffCatalogue):
+        """Делает каталог текущим без переоценки каналов: загрузка проекта, восстановление, применение."""
+        # Тот же каталог мог быть уже загружен из файла - берем его, чтобы не дублировать в сравнении
+        catalogue = next((c for c in self.tariff_catalogues if c == catalogue), catalogue)
+        if catalogue not in self.tariff_catalogues:
+            self.tariff_catalogues.append(catalogue)
+        self.tariff = catalogue
+        self.edgeCapacityComboBox.blockSignals(True)
+        self.edgeCapacityComboBox.clear()
+        self.edgeCapacityComboBox.addItems([str(c) for c in self.tariff.capacities])
+        self.edgeCapacityComboBox.blockSignals(False)
+
+    def apply_tariff(self, quote):
+        """Делает каталог текущим и переоценивает каналы по уже рассчитанным потокам."""
+        flows_valid = self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON)
+        self.set_tariff(quote.catalogue)
+        self.record_change("set_tariff", catalogue=self.project_tariff())
+        for edge, capacity in zip(self.edges, quote.capacities.tolist()):
+            # Тарифы целочисленные: храним их как int, как это делает Этап 3
+            capacity = int(capacity) if capacity.is_integer() else capacity
+            cost = self._calculate_cost_from_length(edge.length) + self._calculate_cost_from_capacity(capacity)
+            if edge.capacity == capacity and edge.cost == cost:
+                continue
+            edge.capacity, edge.cost = capacity, cost
+            self.record_change("set_capacity", from_id=edge.from_id, to_id=edge.to_id,
+                               capacity=capacity, cost=cost)
+        # Потоки не менялись - фиксируем их актуальность под новой версией тарифов
+        self.versions.bump(tv.CAPACITIES)
+        if flows_valid:
+            self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.drawingCanvas.update()
+        self.update_info_panels()
+        self.statusBar().showMessage(f"Применен каталог тарифов: {self.tariff.name}.", 5000)
 
 
     def load_traffic_and_calculate_flows(self):
@@ -258,113 +712,820 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         file_name, _ = QFileDialog.getOpenFileName(self, "Выберите файл с МАТРИЦЕЙ нагрузки", "",
                                                    "Excel Files (*.xlsx)")
         if not file_name: return
+        if not self.confirm_memory("Этап 3", lambda compact: predict_flows_stage(self.nodes, compact)):
+            return
 
         # --- Шаг 3.1: Умное чтение БЕЗЗАГОЛОВОЧНОЙ матрицы ---
         demands: List[TrafficDemand] = []
         try:
-            workbook = openpyxl.load_workbook(file_name)
-            sheet = workbook.active
-
-            # --- "Умная подстановка" ---
-            # Получаем отсортированный список ID узлов из нашей топологии
-            sorted_node_ids = sorted(self.nodes.keys())
-
-            # Проходим по каждой строке в Excel
-            for row_index, row_cells in enumerate(sheet.iter_rows()):
-                # Проверяем, что для этой строки есть соответствующий узел
-                if row_index >= len(sorted_node_ids):
-                    break  # Строк в Excel больше, чем у нас узлов
-
-                from_id = sorted_node_ids[row_index]
-
-                # Проходим по каждой ячейке в строке
-                for col_index, cell in enumerate(row_cells):
-                    if col_index >= len(sorted_node_ids):
-                        break  # Столбцов больше, чем узлов
-
-                    to_id = sorted_node_ids[col_index]
-
-                    # Пропускаем диагональ (трафик от узла к самому себе)
-                    if from_id == to_id:
-                        continue
-
-                    volume = cell.value
-                    # Создаем требование, только если в ячейке есть число > 0
-                    if volume is not None and isinstance(volume, (int, float)) and volume > 0:
-                        demand = TrafficDemand(
-                            from_id=from_id,
-                            to_id=to_id,
-                            volume=float(volume)
-                        )
-                        demands.append(demand)
+            with span("excel_read"):
+                # В компактном режиме лист читается потоково, без хранения всех ячеек
+                workbook = openpyxl.load_workbook(file_name, read_only=self.compact_memory)
+                sheet = workbook.active
+
+                # --- "Умная подстановка" ---
+                # Получаем отсортированный список ID узлов из нашей топологии
+                sorted_node_ids = sorted(self.nodes.keys())
+
+                # Проходим по каждой строке в Excel
+                for row_index, row_cells in enumerate(sheet.iter_rows()):
+                    # Проверяем, что для этой строки есть соответствующий узел
+                    if row_index >= len(sorted_node_ids):
+                        break  # Строк в Excel больше, чем у нас узлов
+
+                    from_id = sorted_node_ids[row_index]
+
+                    # Проходим по каждой ячейке в строке
+                    for col_index, cell in enumerate(row_cells):
+                        if col_index >= len(sorted_node_ids):
+                            break  # Столбцов больше, чем узлов
+
+                        to_id = sorted_node_ids[col_index]
+
+                        # Пропускаем диагональ (трафик от узла к самому себе)
+                        if from_id == to_id:
+                            continue
+
+                        volume = cell.value
+                        # Создаем требование, только если в ячейке есть число > 0
+                        if volume is not None and isinstance(volume, (int, float)) and volume > 0:
+                            demand = TrafficDemand(
+                                from_id=from_id,
+                                to_id=to_id,
+                                volume=float(volume)
+                            )
+                            demands.append(demand)
+                workbook.close()
 
         except Exception as e:
             QMessageBox.critical(self, "Ошибка чтения файла", f"Не удалось прочитать матрицу нагрузки:\n{e}")
             return
 
         print(f"Загружено и распознано {len(demands)} требований по трафику из матрицы.")
+        self.calculate_flows_for_demands(demands)
+
+    def calculate_flows_for_demands(self, demands: List[TrafficDemand]):
+        """Этап 3 после получения матрицы: потоки, пропускные способности и стоимости рёбер."""
+        if demands != self.demands:
+            self.demands = demands
+            self.versions.bump(tv.DEMANDS)
+
+        # Если ни топология, ни нагрузка, ни пропускные способности не менялись,
+        # потоки на рёбрах уже актуальны (если только их не перераспределили с учетом нагрузки)
+        if self.flow_routing == self.ecmp_split and self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON):
+            self.statusBar().showMessage("Потоки актуальны, пересчет не требуется.", 5000)
+            QMessageBox.information(self, "Расчет завершен", "Потоки и пропускные способности успешно рассчитаны.")
+            return
+
+        # Маршруты могли устареть после правки топологии
+        routes = self.get_routes()
+
+        # Этот же проект с этой же нагрузкой мог уже считаться раньше. Ключ не содержит
+        # маршрутов, поэтому кэш на диске годится только для маршрутов, заданных самой топологией
+        flows_key = None
+        if self.ecmp_split or self.result_cache.is_valid("canonical_routes", tv.ROUTES_DEPENDS_ON):
+            flows_key = disk_cache.flows_key(self.nodes, self.edges, demands, self.tariff.capacities,
+                                             self.ecmp_split or "",
+                                             "" if self.tariff is DEFAULT_CATALOGUE else self.tariff.fingerprint())
+        if flows_key and self.disk_cache.load_flows(flows_key, self.edges):
+            print("Потоки взяты из кэша на диске.")
+            self.flow_routing = self.ecmp_split
+            self.versions.bump(tv.CAPACITIES)
+            self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+            self.snapshot_journal()
+            self.drawingCanvas.update()
+            self.update_info_panels()
+            QMessageBox.information(self, "Расчет завершен", "Потоки и пропускные способности успешно рассчитаны.")
+            return
 
         # --- Шаги 3.2 и 3.3 ОСТАЮТСЯ АБСОЛЮТНО БЕЗ ИЗМЕНЕНИЙ! ---
         # Вся остальная логика работает с `demands` и ей неважно, как мы их получили.
 
-        for edge in self.edges:
-            edge.flow = 0.0
-
-        for demand in demands:
-            route_key = (demand.from_id, demand.to_id)
-            if route_key in self.routes:
-                path = self.routes[route_key]
-                for i in range(len(path) - 1):
-                    u, v = path[i], path[i + 1]
-                    for edge in self.edges:
-                        if (edge.from_id == u and edge.to_id == v) or (edge.from_id == v and edge.to_id == u):
-                            edge.flow += demand.volume
-                            break
-            else:
-                print(f"Внимание: Маршрут для {demand.from_id}->{demand.to_id} не найден.")
+        if self.ecmp_split:
+            flows, unrouted = ecmp_edge_flows(TopologyArrays.from_model(self.nodes, self.edges), demands,
+                                              self.ecmp_split)
+            for edge, flow in zip(self.edges, flows.tolist()):
+                edge.flow = flow
+        else:
+            unrouted = accumulate_flows(self.edges, routes, demands, self.get_edge_index())
+        for demand in unrouted:
+            print(f"Внимание: Маршрут для {demand.from_id}->{demand.to_id} не найден.")
 
-        for edge in self.edges:
-            required_flow = edge.flow
-            selected_capacity = next((c for c in self.AVAILABLE_CAPACITIES if c >= required_flow),
-                                     self.AVAILABLE_CAPACITIES[-1])
-            if required_flow == 0:
-                selected_capacity = 0
-            edge.capacity = selected_capacity
-
-            # Стало: Считаем обе части стоимости и складываем их
-            base_cost = self._calculate_cost_from_length(edge.length)
-            capacity_cost = self._calculate_cost_from_capacity(edge.capacity)
-            edge.cost = base_cost + capacity_cost
+        with span("assign_capacities"):
+            for edge in self.edges:
+                self._assign_capacity(edge)
 
         print("Расчет потоков, подбор пропускных способностей и пересчет стоимостей завершен.")
+        if flows_key:
+            self.disk_cache.store_flows(flows_key, self.edges)
+        self.flow_routing = self.ecmp_split
+        self.versions.bump(tv.CAPACITIES)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.snapshot_journal()
         self.drawingCanvas.update()
         self.update_info_panels()
         QMessageBox.information(self, "Расчет завершен", "Потоки и пропускные способности успешно рассчитаны.")
 
+    def generate_traffic_and_calculate_flows(self):
+        """Этап 3 без файла: матрица нагрузки по модели из координат и стоимостей узлов."""
+        if not self.nodes or not self.edges:
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо построить топологию.")
+            return
+        if not self.routes:
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать маршруты (Этап 2).")
+            return
+        dialog = TrafficGeneratorDialog(self.traffic_model, self)
+        if not dialog.exec():
+            return
+        self.traffic_model = dialog.get_model()
+        try:
+            generated = generate_traffic(self.nodes, self.traffic_model)
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+        if generated.demand_count == 0:
+            QMessageBox.warning(self, "Ошибка", "Все требования меньше минимального объема.")
+            return
+        if not self.confirm_memory("Этап 3", lambda compact: predict_generated_demands(generated.demand_count)):
+            return
+        print(f"Сгенерировано {generated.demand_count} требований, {generated.total_volume:.2f} Мбит/с "
+              f"(отброшено мелких: {generated.dropped_volume:.2f} Мбит/с).")
+        self.calculate_flows_for_demands(generated.demands())
+
+    def load_traffic_profile_and_calculate_flows(self):
+        """
+        Этап 3 по суточному профилю: книга Excel, каждый лист - матрица нагрузки одного
+        среза времени. Потоки всех срезов считаются одним проходом по деревьям маршрутов;
+        пропускная способность канала подбирается по его наибольшему потоку за сутки,
+        а требованиями и потоками проекта становится час наибольшей нагрузки.
+        """
+        if not self.nodes or not self.edges:
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо построить топологию.")
+            return
+        if not self.routes:
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать маршруты (Этап 2).")
+            return
+
+        file_name, _ = QFileDialog.getOpenFileName(self, "Выберите книгу с матрицами нагрузки по срезам", "",
+                                                   "Excel Files (*.xlsx)")
+        if not file_name: return
+        try:
+            with span("excel_read"):
+                profile = load_traffic_profile(file_name, list(self.nodes.keys()))
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка чтения файла", f"Не удалось прочитать профиль нагрузки:\n{e}")
+            return
+        if not profile.volumes.any():
+            QMessageBox.warning(self, "Ошибка", "В профиле нет ни одного требования.")
+            return
+
+        peak = profile.peak_slice()
+        demands = profile.demands(peak)
+        print(f"Загружено срезов: {profile.slice_count}, в часе наибольшей нагрузки "
+              f"({profile.slice_names[peak]}) {len(demands)} требований.")
+        if demands != self.demands:
+            self.demands = demands
+            self.versions.bump(tv.DEMANDS)
+
+        routes = self.get_routes()
+        topology = TopologyArrays.from_model(self.nodes, self.edges)
+        if self.ecmp_split:
+            slice_flows = slice_edge_flows_ecmp(topology, profile, self.ecmp_split)
+        else:
+            route_trees = self.result_cache.get("route_index", tv.ROUTES_DEPENDS_ON)
+            if route_trees is None or route_trees.ids != list(self.nodes.keys()):
+                route_trees = DynamicHopRoutes.from_routes(self.nodes, self.edges, routes)
+            slice_flows = slice_edge_flows(topology, route_trees, profile)
+
+        with span("assign_capacities"):
+            for edge, flow, peak_flow in zip(self.edges, slice_flows.flows[peak].tolist(),
+                                             slice_flows.peak_flows.tolist()):
+                edge.flow = flow
+                self._assign_capacity(edge, peak_flow)
+
+        self.flow_routing = self.ecmp_split
+        self.versions.bump(tv.CAPACITIES)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.result_cache.put("traffic_slices", tv.FLOWS_DEPENDS_ON, slice_flows)
+        self.result_cache.put("traffic_peak_slice", tv.FLOWS_DEPENDS_ON, peak)
+        self.snapshot_journal()
+        self.sliceSlider.blockSignals(True)
+        self.sliceSlider.setRange(0, profile.slice_count - 1)
+        self.sliceSlider.setValue(peak)
+        self.sliceSlider.blockSignals(False)
+        self.sliceToolBar.show()
+        self.show_traffic_slice(peak)
+        self.update_info_panels()
+        QMessageBox.information(self, "Расчет завершен",
+                                f"Потоки рассчитаны для {profile.slice_count} срезов, пропускные способности "
+                                f"подобраны по наибольшему потоку каждого канала.")
+
+    def current_slice_view(self):
+        """(загрузки, задержки) рёбер показанного среза или None - тогда холст рисует итоговые потоки."""
+        if self.active_slice is None:
+            return None
+        view = self.result_cache.get("traffic_slice_view", tv.DEMAND_DELAYS_DEPENDS_ON)
+        if view is None:
+            slice_flows = self.result_cache.get("traffic_slices", tv.FLOWS_DEPENDS_ON)
+            if slice_flows is None or self.active_slice >= len(slice_flows.slice_names):
+                return None
+            # Один расчет на все срезы; смена среза только выбирает строку
+            capacity = np.array([edge.capacity for edge in self.edges], dtype=np.float64)
+            view = slice_flows.view(capacity, self.avg_packet_size_bits)
+            self.result_cache.put("traffic_slice_view", tv.DEMAND_DELAYS_DEPENDS_ON, view)
+        return view.slice_names[self.active_slice], view.utilization[self.active_slice], view.delays[self.active_slice]
+
+    def show_traffic_slice(self, slice_index: int):
+        self.active_slice = slice_index
+        current = self.current_slice_view()
+        if current is None:
+            self.sliceLabel.setText(" профиль устарел - загрузите его снова")
+        else:
+            name, utilization, _ = current
+            overloaded = int(np.count_nonzero(utilization >= self.overload_threshold))
+            self.sliceLabel.setText(f" {name}: макс. загрузка {utilization.max(initial=0) * 100:.1f} %, "
+                                    f"перегружено каналов: {overloaded}")
+        self.drawingCanvas.update()
+
+    def set_slice_display(self, visible: bool):
+        """Скрытый ползунок - холст снова показывает итоговые потоки проекта."""
+        if visible:
+            self.show_traffic_slice(self.sliceSlider.value())
+        else:
+            self.active_slice = None
+            self.drawingCanvas.update()
+
+    def get_edge_index(self):
+        """Поиск ребра по паре узлов; индекс перестраивается только после правки рёбер."""
+        edge_index = self.result_cache.get("edge_index", (tv.EDGES,))
+        if edge_index is None:
+            edge_index = build_edge_index(self.edges)
+            self.result_cache.put("edge_index", (tv.EDGES,), edge_index)
+        return edge_index
+
+    def _assign_capacity(self, edge: Edge, required_flow: float | None = None):
+        """Подбирает тариф под поток ребра (или под required_flow) и пересчитывает его стоимость."""
+        edge.capacity = select_capacity(edge.flow if required_flow is None else required_flow,
+                                        self.tariff.capacities)
+        # Стало: Считаем обе части стоимости и складываем их
+        base_cost = self._calculate_cost_from_length(edge.length)
+        capacity_cost = self._calculate_cost_from_capacity(edge.capacity)
+        edge.cost = base_cost + capacity_cost
+
+    def change_demand(self):
+        """Меняет одно требование матрицы нагрузки без повторной загрузки файла."""
+        if not self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON):
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
+            return
+        if self.flow_routing == LOAD_AWARE:
+            # Оптимальное распределение зависит от всей матрицы - приращение одной пары некуда "положить"
+            QMessageBox.warning(self, "Ошибка", "Потоки перераспределены с учетом нагрузки - после изменения "
+                                                "требования пересчитайте Этап 3.")
+            return
+        from_id, ok = QInputDialog.getInt(self, "Изменение нагрузки", "ID узла-источника:")
+        if not ok: return
+        to_id, ok = QInputDialog.getInt(self, "Изменение нагрузки", "ID узла-получателя:")
+        if not ok: return
+        if from_id not in self.nodes or to_id not in self.nodes or from_id == to_id:
+            QMessageBox.warning(self, "Ошибка", "Укажите два разных существующих узла.")
+            return
+        old_volume = self.get_demand_lookup().get((from_id, to_id))
+        old_volume = old_volume.volume if old_volume else 0.0
+        new_volume, ok = QInputDialog.getDouble(self, "Изменение нагрузки",
+                                                f"Новый объем {from_id} -> {to_id} (Мбит/с):",
+                                                value=old_volume, min=0.0, max=1e12, decimals=3)
+        if not ok: return
+        touched = self.apply_demand_change(from_id, to_id, new_volume)
+        self.statusBar().showMessage(f"Нагрузка изменена, пересчитано рёбер: {len(touched)}.", 5000)
+
+    def get_demand_lookup(self) -> Dict:
+        demand_lookup = self.result_cache.get("demand_lookup", (tv.DEMANDS,))
+        if demand_lookup is None:
+            demand_lookup = {(d.from_id, d.to_id): d for d in self.demands}
+            self.result_cache.put("demand_lookup", (tv.DEMANDS,), demand_lookup)
+        return demand_lookup
+
+    def apply_demand_change(self, from_id: int, to_id: int, new_volume: float) -> List[Edge]:
+        """
+        Применяет изменение одного требования: поток меняется только вдоль его маршрута,
+        а тариф и стоимость пересчитываются только для этих рёбер.
+        После загрузки профиля требования проекта - час наибольшей нагрузки: меняется
+        этот срез, а тариф по-прежнему подбирается по наибольшему потоку за сутки.
+        """
+        slice_flows = self.result_cache.get("traffic_slices", tv.FLOWS_DEPENDS_ON)
+        peak = self.result_cache.get("traffic_peak_slice", tv.FLOWS_DEPENDS_ON)
+        demand_lookup = self.get_demand_lookup()
+        demand = demand_lookup.get((from_id, to_id))
+        old_volume = demand.volume if demand else 0.0
+        if new_volume == old_volume:
+            return []
+
+        if demand is None:
+            demand = TrafficDemand(from_id=from_id, to_id=to_id, volume=new_volume)
+            self.demands.append(demand)
+            demand_lookup[(from_id, to_id)] = demand
+        elif new_volume == 0:
+            self.demands.remove(demand)
+            del demand_lookup[(from_id, to_id)]
+        else:
+            demand.volume = new_volume
+
+        delta = new_volume - old_volume
+        if self.flow_routing:
+            # Приращение раскладывается по всем равноценным путям пары так же, как на Этапе 3
+            flows, _ = ecmp_edge_flows(TopologyArrays.from_model(self.nodes, self.edges),
+                                       [TrafficDemand(from_id, to_id, abs(delta))], self.flow_routing)
+            touched = []
+            for edge, flow in zip(self.edges, flows.tolist()):
+                if flow > 0:
+                    edge.flow += flow if delta > 0 else -flow
+                    if abs(edge.flow) < 1e-9:
+                        edge.flow = 0.0
+                    touched.append(edge)
+        else:
+            routes = self.get_routes()
+            touched = apply_demand_delta(self.get_edge_index(), routes, from_id, to_id, delta)
+        positions = {id(edge): i for i, edge in enumerate(self.edges)} if slice_flows is not None else None
+        for edge in touched:
+            if slice_flows is None:
+                self._assign_capacity(edge)
+            else:
+                i = positions[id(edge)]
+                slice_flows.flows[peak, i] = edge.flow
+                self._assign_capacity(edge, float(slice_flows.flows[:, i].max()))
+            self.record_change("set_capacity", from_id=edge.from_id, to_id=edge.to_id,
+                               capacity=edge.capacity, cost=edge.cost, flow=edge.flow)
+
+        # Потоки по-прежнему соответствуют нагрузке - фиксируем это под новыми версиями
+        self.versions.bump(tv.DEMANDS, tv.CAPACITIES)
+        self.result_cache.put("demand_lookup", (tv.DEMANDS,), demand_lookup)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        if slice_flows is not None:
+            self.result_cache.put("traffic_slices", tv.FLOWS_DEPENDS_ON, slice_flows)
+            self.result_cache.put("traffic_peak_slice", tv.FLOWS_DEPENDS_ON, peak)
+        self.drawingCanvas.update()
+        self.update_info_panels()
+        return touched
+
+    def get_analysis_arrays(self):
+        """Топология и маршруты требований в виде массивов для расчетов анализа."""
+        if not self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON):
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
+            return None
+        if not self.require_single_path_flows():
+            return None
+        arrays = self.result_cache.get("analysis_arrays", tv.FLOWS_DEPENDS_ON)
+        if arrays is None:
+            routes = self.get_routes()
+            topology = TopologyArrays.from_model(self.nodes, self.edges)
+            demand_routes = DemandRoutes.from_model(topology, self.edges, routes, self.demands)
+            # Деревья путей нужны с той же нумерацией узлов, что и в массивах топологии
+            route_trees = self.result_cache.get("route_index", tv.ROUTES_DEPENDS_ON)
+            if route_trees is None or route_trees.ids != list(self.nodes.keys()):
+                route_trees = DynamicHopRoutes.from_routes(self.nodes, self.edges, routes)
+            arrays = (topology, demand_routes, route_trees)
+            self.result_cache.put("analysis_arrays", tv.FLOWS_DEPENDS_ON, arrays)
+        return arrays
+
+    def require_single_path_flows(self) -> bool:
+        """Маршруты требований и деревья путей верны, только если трафик пары идет одним путем по числу хопов."""
+        if self.flow_routing is None:
+            return True
+        QMessageBox.warning(self, "Ошибка",
+                            f"Потоки рассчитаны с маршрутизацией \"{FLOW_ROUTING_TITLES[self.flow_routing]}\", "
+                            f"а этот расчет ведет трафик каждой пары одним путем по числу хопов.\n"
+                            f"Выберите \"Этапы\" -> \"Маршрутизация потоков\" -> \"Один путь по числу хопов\" "
+                            f"и пересчитайте Этап 3.")
+        return False
+
+    def simulate_packet_delays(self):
+        arrays = self.get_analysis_arrays()
+        if arrays is None: return
+        topology, demand_routes, _ = arrays
+        # Канал без пропускной способности пакет не обслужит никогда - требования через него не моделируем
+        unusable = topology.capacity[demand_routes.path_edges] <= 0
+        blocked = np.bincount(demand_routes.demand_of_path_entry(), weights=unusable,
+                              minlength=demand_routes.demand_count) > 0
+        if blocked.any():
+            QMessageBox.warning(self, "Имитационное моделирование",
+                                f"Маршруты требований проходят через каналы без пропускной способности "
+                                f"({len(np.unique(demand_routes.path_edges[unusable]))}). Эти требования "
+                                f"({int(blocked.sum())}) исключены из моделирования.")
+            demand_routes = demand_routes.subset(np.nonzero(~blocked)[0])
+        if demand_routes.demand_count == 0:
+            QMessageBox.warning(self, "Ошибка", "Нет требований с маршрутами для моделирования.")
+            return
+        names = [self.nodes[node_id].name for node_id in topology.node_ids]
+        link_names = [f"{names[u]} - {names[v]}" for u, v in zip(topology.edge_u.tolist(), topology.edge_v.tolist())]
+        demand_names = [f"{names[s]} -> {names[t]}"
+                        for s, t in zip(demand_routes.source.tolist(), demand_routes.target.tolist())]
+        bits = self.avg_packet_size_bits
+        dialog = SimulationDialog(link_names, demand_names,
+                                  lambda horizon: expected_packet_hops(demand_routes, bits, horizon), self)
+        dialog.simulationRequested.connect(
+            lambda *settings: self.run_packet_simulation(dialog, topology, demand_routes, *settings))
+        dialog.exec()
+
+    def run_packet_simulation(self, dialog, topology, demand_routes, process, horizon, warmup_share,
+                              packet_sizes, independent_sizes, seed):
+        self.statusBar().showMessage("Имитационное моделирование пакетов...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with span("Имитационное моделирование"):
+                report = simulate_packets(topology, demand_routes, self.avg_packet_size_bits, horizon,
+                                          process=process, packet_sizes=packet_sizes,
+                                          independent_sizes=independent_sizes, warmup_share=warmup_share,
+                                          seed=seed)
+        finally:
+            QApplication.restoreOverrideCursor()
+        dialog.set_report(report)
+        self.statusBar().showMessage(f"Смоделировано пакетов: {report.packets}.", 5000)
+        self.refresh_debug_panel()
+
+    def analyze_link_failures(self):
+        arrays = self.get_analysis_arrays()
+        if arrays is None: return
+        topology, demand_routes, route_trees = arrays
+        self.statusBar().showMessage(f"Анализ отказов: {topology.edge_count} сценариев...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            results = link_failure_sweep(topology, demand_routes, route_trees, self.avg_packet_size_bits,
+                                         self.overload_threshold)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Анализ отказов каналов завершен.", 5000)
+        dialog = FailureAnalysisDialog(results, "Анализ отказов каналов (N-1)", "Отказавший канал",
+                                       self.nodes, self)
+        dialog.exec()
+
+    def analyze_node_failures(self):
+        arrays = self.get_analysis_arrays()
+        if arrays is None: return
+        topology, demand_routes, route_trees = arrays
+        self.statusBar().showMessage(f"Анализ отказов: {topology.node_count} сценариев...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            results = node_failure_sweep(topology, demand_routes, route_trees, self.avg_packet_size_bits,
+                                         self.overload_threshold)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Анализ отказов узлов завершен.", 5000)
+        dialog = FailureAnalysisDialog(results, "Анализ отказов узлов (N-1)", "Отказавший узел",
+                                       self.nodes, self)
+        dialog.exec()
+
+    def estimate_network_reliability(self):
+        if len(self.nodes) < 2 or not self.edges:
+            QMessageBox.warning(self, "Ошибка", "Недостаточно узлов и каналов для оценки надежности.")
+            return
+        node_availability, ok = QInputDialog.getDouble(self, "Надежность сети", "Готовность узла:",
+                                                       value=self.node_availability, min=0.0, max=1.0,
+                                                       decimals=6)
+        if not ok: return
+        link_availability, ok = QInputDialog.getDouble(self, "Надежность сети",
+                                                       "Готовность канала длиной 100:",
+                                                       value=self.link_availability, min=0.0, max=1.0,
+                                                       decimals=6)
+        if not ok: return
+        self.node_availability = node_availability
+        self.link_availability = link_availability
+
+        topology = TopologyArrays.from_model(self.nodes, self.edges)
+        self.statusBar().showMessage("Оценка надежности методом Монте-Карло...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = estimate_reliability(topology, self.demands, node_availability, link_availability)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Оценка надежности завершена.", 5000)
+
+        stop_text = "точность достигнута" if result.stopped_early else "достигнут лимит выборок"
+        QMessageBox.information(
+            self, "Надежность сети",
+            f"Разыграно состояний сети: {result.samples} ({stop_text})\n\n"
+            f"Вероятность связности всей сети: {result.all_terminal:.6f} ± {result.all_terminal_ci:.6f}\n"
+            f"Доля доступного трафика: {result.demand_reachability:.6f} ± {result.demand_reachability_ci:.6f}\n\n"
+            f"(95% доверительные интервалы)")
+
+    def optimize_capacities(self):
+        """Подбирает тарифы минимальной стоимости под заданный бюджет задержки."""
+        arrays = self.get_analysis_arrays()
+        if arrays is None: return
+        topology, demand_routes, _ = arrays
+
+        budget_kinds = {"Максимальная задержка по маршрутам": MAX_DELAY_BUDGET,
+                        "Средняя задержка по каналам": AVG_DELAY_BUDGET}
+        kind_text, ok = QInputDialog.getItem(self, "Оптимизация пропускных способностей",
+                                             "Ограничение:", list(budget_kinds), 0, False)
+        if not ok: return
+        budget, ok = QInputDialog.getDouble(self, "Оптимизация пропускных способностей",
+                                            "Допустимая задержка (мс):", value=1.0, min=0.0001,
+                                            max=1_000_000.0, decimals=4)
+        if not ok: return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            plan = optimize_capacities(topology.flow, demand_routes, self.tariff.capacities,
+                                       self._calculate_cost_from_capacity, self.avg_packet_size_bits,
+                                       budget_kinds[kind_text], budget)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        old_cost = sum(self._calculate_cost_from_capacity(edge.capacity) for edge in self.edges)
+        feasible_text = "уложились в бюджет" if plan.feasible else "бюджет недостижим при доступных тарифах"
+        answer = QMessageBox.question(
+            self, "Оптимизация пропускных способностей",
+            f"Результат: {feasible_text}.\n\n"
+            f"Стоимость оборудования: {old_cost:.2f} -> {plan.capacity_cost:.2f} у.е.\n"
+            f"Макс. задержка по маршрутам: {plan.max_delay:.4f} мс\n"
+            f"Средняя задержка по каналам: {plan.avg_delay:.4f} мс\n\n"
+            f"Применить новые пропускные способности?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        for edge, capacity in zip(self.edges, plan.capacities):
+            if edge.capacity == capacity:
+                continue
+            edge.capacity = capacity
+            edge.cost = self._calculate_cost_from_length(edge.length) + self._calculate_cost_from_capacity(capacity)
+            self.record_change("set_capacity", from_id=edge.from_id, to_id=edge.to_id,
+                               capacity=capacity, cost=edge.cost)
+        # Потоки не менялись - фиксируем их актуальность под новой версией тарифов
+        self.versions.bump(tv.CAPACITIES)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.drawingCanvas.update()
+        self.update_info_panels()
+        self.statusBar().showMessage("Пропускные способности обновлены.", 5000)
+
+    def optimize_topology(self):
+        """Добавляет и удаляет каналы методом насыщенных разрезов, пока это улучшает проект."""
+        arrays = self.get_analysis_arrays()
+        if arrays is None: return
+        _, _, route_trees = arrays
+
+        optimizer = CutSaturationOptimizer(self.nodes, self.edges, self.demands, route_trees,
+                                           self.tariff.capacities, self._calculate_cost_from_length,
+                                           self._calculate_cost_from_capacity, self.avg_packet_size_bits,
+                                           self.overload_threshold)
+        current_delay = optimizer.max_delay()
+        budget, ok = QInputDialog.getDouble(self, "Оптимизация топологии",
+                                            "Допустимая макс. задержка по маршрутам (мс):",
+                                            value=current_delay if current_delay != float('inf') else 1000.0,
+                                            min=0.0001, max=1_000_000.0, decimals=4)
+        if not ok: return
+        max_iterations, ok = QInputDialog.getInt(self, "Оптимизация топологии", "Максимум итераций:",
+                                                 value=1000, min=1, max=100_000)
+        if not ok: return
+
+        def progress(iteration, cost, delay):
+            if iteration % 10 == 0:
+                self.statusBar().showMessage(f"Оптимизация топологии: итерация {iteration}, "
+                                             f"стоимость {cost:.2f}, задержка {delay:.4f} мс")
+                QApplication.processEvents()
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = optimizer.run(budget, max_iterations, progress)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Оптимизация топологии завершена.", 5000)
+
+        answer = QMessageBox.question(
+            self, "Оптимизация топологии",
+            f"Итераций: {result.iterations}, добавлено каналов: {result.added}, удалено: {result.removed}\n\n"
+            f"Стоимость каналов: {result.initial_cost:.2f} -> {result.final_cost:.2f} у.е.\n"
+            f"Макс. задержка по маршрутам: {result.initial_max_delay:.4f} -> {result.final_max_delay:.4f} мс\n"
+            f"Перегруженных каналов: {result.overloaded_edges}\n\n"
+            f"Применить новую топологию?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        self.edges = result.edges
+        self.on_selection_cleared()
+        # Маршруты, потоки и тарифы новой топологии уже посчитаны оптимизатором
+        self.versions.bump(tv.EDGES, tv.CAPACITIES)
+        self.routes = result.route_trees.routes()
+        self.result_cache.put("routes", tv.ROUTES_DEPENDS_ON, self.routes)
+        self.result_cache.put("route_index", tv.ROUTES_DEPENDS_ON, result.route_trees)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.snapshot_journal()
+        self.drawingCanvas.update()
+        self.update_info_panels()
+
+    def route_by_load(self):
+        """Перераспределяет потоки по нескольким путям, минимизируя среднюю задержку (отклонение потока)."""
+        if not self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON):
+            QMessageBox.warning(self, "Ошибка", "Сначала необходимо рассчитать потоки (Этап 3).")
+            return
+        # Начальные потоки - любые актуальные: один путь, ECMP или прошлое перераспределение
+        topology = TopologyArrays.from_model(self.nodes, self.edges)
+
+        modes = ["Текущие тарифы каналов", "Максимальный тариф, затем подбор тарифов под потоки"]
+        mode, ok = QInputDialog.getItem(self, "Маршрутизация с учетом нагрузки",
+                                        "Пропускные способности при расчете:", modes, 0, False)
+        if not ok: return
+        max_iterations, ok = QInputDialog.getInt(self, "Маршрутизация с учетом нагрузки", "Максимум итераций:",
+                                                 value=200, min=1, max=10_000)
+        if not ok: return
+        reassign = mode == modes[1]
+        capacity = np.full(topology.edge_count, float(self.tariff.capacities[-1])) if reassign else None
+
+        def progress(iteration, gap):
+            self.statusBar().showMessage(f"Отклонение потока: итерация {iteration}, "
+                                         f"удаленность от оптимума {gap:.2%}")
+            QApplication.processEvents()
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = flow_deviation(topology, self.demands, topology.flow, self.avg_packet_size_bits,
+                                    capacity, max_iterations=max_iterations, progress=progress)
+        finally:
+            QApplication.restoreOverrideCursor()
+        self.statusBar().showMessage("Расчет маршрутизации с учетом нагрузки завершен.", 5000)
+
+        new_capacity = topology.capacity
+        if reassign:
+            new_capacity = np.array([select_capacity(f, self.tariff.capacities) for f in result.flow.tolist()],
+                                    dtype=np.float64)
+        total_traffic = sum(d.volume for d in self.demands if d.volume > 0)
+        old_delay = kleinrock_delay(topology.flow, topology.capacity, total_traffic, self.avg_packet_size_bits)
+        new_delay = kleinrock_delay(result.flow, new_capacity, total_traffic, self.avg_packet_size_bits)
+        old_overloaded = int(np.count_nonzero((topology.flow > 0) & (topology.flow >= topology.capacity)))
+        new_overloaded = int(np.count_nonzero((result.flow > 0) & (result.flow >= new_capacity)))
+        status = "оптимум достигнут" if result.converged else "достигнут лимит итераций"
+        if not result.feasible:
+            status += "; весь трафик без перегрузки каналов не размещается"
+        answer = QMessageBox.question(
+            self, "Маршрутизация с учетом нагрузки",
+            f"Итераций: {result.iterations} ({status}, удаленность от оптимума {result.relative_gap:.2%})\n\n"
+            f"Средняя задержка пакета: {old_delay:.4f} -> {new_delay:.4f} мс\n"
+            f"Перегруженных каналов: {old_overloaded} -> {new_overloaded}\n\n"
+            f"Трафик пар узлов делится между несколькими путями; таблица маршрутов "
+            f"по-прежнему показывает пути по числу хопов.\n\n"
+            f"Применить новые потоки?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+
+        for edge, flow in zip(self.edges, result.flow.tolist()):
+            old_state = (edge.flow, edge.capacity)
+            edge.flow = flow
+            if reassign:
+                self._assign_capacity(edge)
+            if (edge.flow, edge.capacity) != old_state:
+                self.record_change("set_capacity", from_id=edge.from_id, to_id=edge.to_id,
+                                   capacity=edge.capacity, cost=edge.cost, flow=edge.flow)
+        # Потоки соответствуют нагрузке, но распределены иначе - фиксируем их под новыми версиями;
+        # анализ по маршрутам требований для них недоступен до пересчета Этапа 3
+        self.flow_routing = LOAD_AWARE
+        self.versions.bump(tv.CAPACITIES, tv.ROUTING_MODE)
+        self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        self.drawingCanvas.update()
+        self.update_info_panels()
+
     def calculate_routes(self):
         if len(self.nodes) < 2:
             QMessageBox.warning(self, "Ошибка", "Недостаточно узлов для расчета маршрутов.")
             return
 
-        # Если окно уже открыто, просто показываем его и выходим
+        routes_versions = self.versions.snapshot(tv.ROUTES_DEPENDS_ON)
+        if self.routes_dialog is None or self.routes_dialog_versions != routes_versions:
+            if not self.confirm_memory("Этап 2", lambda compact: predict_routes_stage(self.nodes, self.edges,
+                                                                                       compact)):
+                return
+        self.get_routes()
+        row_limit = COMPACT_ROUTE_ROWS if self.compact_memory else None
+
+        # Если окно уже открыто, показываем его (обновив таблицу, если топология менялась)
         if self.routes_dialog is not None:
+            if self.routes_dialog_versions != routes_versions:
+                self.highlighted_path = []
+                self.routes_dialog.row_limit = row_limit
+                self.routes_dialog.set_routes(self.nodes, self.routes)
+                self.routes_dialog_versions = routes_versions
+                self.drawingCanvas.update()
             self.routes_dialog.show()
             self.routes_dialog.activateWindow()  # Этого достаточно, чтобы окно стало активным
             return
 
-        print("Расчет маршрутов по числу хопов...")
-        self.routes = dijkstra_all_pairs_hops(self.nodes, self.edges)
-
         # Создаем экземпляр окна и СОХРАНЯЕМ его в self
-        self.routes_dialog = RoutesDialog(self.nodes, self.routes, self)
+        self.routes_dialog = RoutesDialog(self.nodes, self.routes, self, row_limit=row_limit)
+        self.routes_dialog_versions = routes_versions
         # Подключаем его сигнал к нашему слоту для подсветки
         self.routes_dialog.routeSelected.connect(self.on_route_highlighted)
+        self.routes_dialog.alternativesRequested.connect(self.show_alternative_routes)
         # Подключаем сигнал о закрытии окна к нашему слоту для очистки
         self.routes_dialog.finished.connect(self.on_routes_dialog_closed)
 
         # Показываем окно НЕМОДАЛЬНО
         self.routes_dialog.show()
 
+    def get_routes(self) -> Dict:
+        """Возвращает актуальные маршруты, пересчитывая их только после изменения топологии."""
+        routes = self.result_cache.get("routes", tv.ROUTES_DEPENDS_ON)
+        if routes is None:
+            key = disk_cache.routes_key(self.nodes, self.edges)
+            routes = self.disk_cache.load_routes(key)
+            if routes is None and self.compact_memory:
+                print("Расчет маршрутов по числу хопов (компактный режим)...")
+                route_index = DynamicHopRoutes.from_graph(self.nodes, self.edges)
+                routes = HopRouteView(route_index)
+                self.result_cache.put("route_index", tv.ROUTES_DEPENDS_ON, route_index)
+            elif routes is None:
+                print("Расчет маршрутов по числу хопов...")
+                routes = dijkstra_all_pairs_hops(self.nodes, self.edges)
+                self.disk_cache.store_routes(key, routes)
+            self.result_cache.put("routes", tv.ROUTES_DEPENDS_ON, routes)
+            # Таблица Дейкстры (в т.ч. с диска) однозначно задана топологией, а среди
+            # равноценных путей деревья обхода и инкрементальное обновление могут выбрать другие
+            if not isinstance(routes, HopRouteView):
+                self.result_cache.put("canonical_routes", tv.ROUTES_DEPENDS_ON, True)
+        self.routes = routes
+        return routes
+
+    def begin_route_update(self):
+        """
+        Перед правкой топологии: если маршруты актуальны, возвращает их вместе с
+        динамической таблицей, чтобы после правки обновить только затронутые пары.
+        """
+        routes = self.result_cache.get("routes", tv.ROUTES_DEPENDS_ON)
+        if routes is None:
+            return None
+        # Компактные маршруты читаются прямо из деревьев путей - правим сами деревья
+        if isinstance(routes, HopRouteView):
+            return routes, routes.table
+        route_index = self.result_cache.get("route_index", tv.ROUTES_DEPENDS_ON)
+        if route_index is None:
+            route_index = DynamicHopRoutes.from_routes(self.nodes, self.edges, routes)
+        # Маршруты из кэша на диске доступны только для чтения
+        if not isinstance(routes, dict):
+            routes = dict(routes)
+        return routes, route_index
+
+    def finish_route_update(self, state, changed):
+        """После правки топологии: переносит изменившиеся маршруты и сохраняет их под новой версией."""
+        routes, route_index = state
+        if not isinstance(routes, HopRouteView):
+            route_index.apply_changes(routes, changed)
+        self.routes = routes
+        self.result_cache.put("routes", tv.ROUTES_DEPENDS_ON, routes)
+        self.result_cache.put("route_index", tv.ROUTES_DEPENDS_ON, route_index)
+        print(f"Маршруты обновлены инкрементально, изменилось пар: {len(set(changed))}")
+
+    def get_k_shortest_paths(self, from_id: int, to_id: int, k: int):
+        """k кратчайших (по числу хопов) путей пары; найденные пути хранятся до изменения топологии."""
+        k_paths = self.result_cache.get("k_paths", tv.ROUTES_DEPENDS_ON)
+        if k_paths is None:
+            k_paths = {}
+            self.result_cache.put("k_paths", tv.ROUTES_DEPENDS_ON, k_paths)
+        stored = k_paths.get((from_id, to_id))
+        # Если раньше искали не меньше путей, нужные k - их начало
+        if stored is None or (stored[0] < k and len(stored[1]) == stored[0]):
+            engine = self.result_cache.get("k_paths_engine", tv.ROUTES_DEPENDS_ON)
+            if engine is None:
+                engine = KShortestPaths(TopologyArrays.from_model(self.nodes, self.edges))
+                self.result_cache.put("k_paths_engine", tv.ROUTES_DEPENDS_ON, engine)
+            stored = (k, engine.paths(from_id, to_id, k))
+            k_paths[(from_id, to_id)] = stored
+        return stored[1][:k]
+
+    def show_alternative_routes(self, from_id: int, to_id: int, k: int):
+        if self.routes_dialog is None:
+            return
+        paths = self.get_k_shortest_paths(from_id, to_id, k)
+        lengths = [sum(self.edges[e].length for e in path.edges) for path in paths]
+        self.routes_dialog.set_alternatives(self.nodes, paths, lengths)
+
+    def plan_backup_routes(self):
+        """k кратчайших путей для всех пар с нагрузкой (или всех пар маршрутов) - в пуле процессов."""
+        if len(self.nodes) < 2 or not self.edges:
+            QMessageBox.warning(self, "Ошибка", "Недостаточно узлов и каналов для расчета маршрутов.")
+            return
+        k, ok = QInputDialog.getInt(self, "Резервные маршруты", "Маршрутов для каждой пары (k):",
+                                    value=3, min=2, max=MAX_K)
+        if not ok: return
+        pairs = [(d.from_id, d.to_id) for d in self.demands] or list(self.get_routes().keys())
+
+        self.statusBar().showMessage(f"Поиск {k} кратчайших путей для {len(pairs)} пар...")
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            result = bulk_k_shortest_paths(TopologyArrays.from_model(self.nodes, self.edges), pairs, k)
+        finally:
+            QApplication.restoreOverrideCursor()
+        k_paths = self.result_cache.get("k_paths", tv.ROUTES_DEPENDS_ON) or {}
+        k_paths.update({pair: (k, paths) for pair, paths in result.items()})
+        self.result_cache.put("k_paths", tv.ROUTES_DEPENDS_ON, k_paths)
+        self.statusBar().showMessage("Резервные маршруты рассчитаны.", 5000)
+
+        without_backup = sum(1 for paths in result.values() if len(paths) < 2)
+        disjoint = sum(1 for paths in result.values() if any(p.shared_with_primary == 0 for p in paths[1:]))
+        QMessageBox.information(
+            self, "Резервные маршруты",
+            f"Пар узлов: {len(result)}\n"
+            f"С резервным маршрутом без общих рёбер с основным: {disjoint}\n"
+            f"С резервными маршрутами, частично совпадающими с основным: {len(result) - disjoint - without_backup}\n"
+            f"Без резервного маршрута: {without_backup}\n\n"
+            f"Маршруты пары показываются в окне маршрутов (Этап 2) при выборе строки.")
+
     def on_route_highlighted(self, path):
         self.highlighted_path = path
         self.drawingCanvas.update()
@@ -488,6 +1649,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         base_cost = self._calculate_cost_from_length(self.selected_edge.length)
         capacity_cost = self._calculate_cost_from_capacity(new_capacity)
         self.selected_edge.cost = base_cost + capacity_cost
+        self.versions.bump(tv.CAPACITIES)
+        self.record_change("set_capacity", from_id=self.selected_edge.from_id, to_id=self.selected_edge.to_id,
+                           capacity=new_capacity, cost=self.selected_edge.cost)
 
         # ... и обновляем интерфейс
         self.drawingCanvas.update()
@@ -510,17 +1674,33 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
         # Начальная capacity может быть любой, например 0
         new_edge = Edge(from_id=start_node_id, to_id=end_node_id, capacity=0.0, length=length, cost=cost)
+        route_state = self.begin_route_update()
         self.edges.append(new_edge)
+        self.versions.bump(tv.EDGES)
+        if route_state:
+            self.finish_route_update(route_state, route_state[1].insert_edge(start_node_id, end_node_id))
+        self.record_change("add_edge", from_id=start_node_id, to_id=end_node_id,
+                           capacity=new_edge.capacity, length=length, cost=cost)
 
     def delete_selected_item(self):
         print("Действие: Удалить выбранный элемент")
+        route_state = self.begin_route_update() if (self.selected_node or self.selected_edge) else None
         if self.selected_node:
             node_id_to_delete = self.selected_node.id
             del self.nodes[node_id_to_delete]
             self.edges = [e for e in self.edges if e.from_id != node_id_to_delete and e.to_id != node_id_to_delete]
+            self.versions.bump(tv.NODES, tv.EDGES)
+            if route_state:
+                self.finish_route_update(route_state, route_state[1].remove_node(node_id_to_delete))
+            self.record_change("delete_node", id=node_id_to_delete)
             self.on_selection_cleared()
         elif self.selected_edge:
             self.edges.remove(self.selected_edge)
+            self.versions.bump(tv.EDGES)
+            if route_state:
+                self.finish_route_update(route_state, route_state[1].delete_edge(self.selected_edge.from_id,
+                                                                                 self.selected_edge.to_id))
+            self.record_change("delete_edge", from_id=self.selected_edge.from_id, to_id=self.selected_edge.to_id)
             self.on_selection_cleared()
 
         self.drawingCanvas.update()
@@ -533,12 +1713,18 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             # --- Шаг 1: Загрузка узлов (код остается прежним) ---
             self.nodes.clear();
             self.edges.clear()
-            workbook = openpyxl.load_workbook(file_name)
-            sheet = workbook.active
-            for row in sheet.iter_rows(min_row=2):
-                node = Node(id=int(row[0].value), name=str(row[1].value),
-                            position=(int(row[2].value), int(row[3].value)), cost=float(row[4].value))
-                self.nodes[node.id] = node
+            # Новый проект из Excel еще не связан с файлом - журналируем его во временный
+            self.journal.discard()
+            self.project_path = None
+            self.journal.set_project_path(UNTITLED_PROJECT)
+            self.versions.bump_all()
+            with span("excel_read"):
+                workbook = openpyxl.load_workbook(file_name)
+                sheet = workbook.active
+                for row in sheet.iter_rows(min_row=2):
+                    node = Node(id=int(row[0].value), name=str(row[1].value),
+                                position=(int(row[2].value), int(row[3].value)), cost=float(row[4].value))
+                    self.nodes[node.id] = node
 
             if len(self.nodes) < 2:
                 self.drawingCanvas.update()
@@ -546,39 +1732,42 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
             # --- Шаг 2 (НОВЫЙ): Построение MST с помощью алгоритма Прима ---
             print("Построение Минимального остовного дерева...")
-            mst_edge_tuples = prim_mst(self.nodes)
-            for from_id, to_id in mst_edge_tuples:
-                self.create_edge(from_id, to_id)  # Используем наш метод для создания рёбер
+            with span("mst_edges"):
+                mst_edge_tuples = prim_mst(self.nodes)
+                for from_id, to_id in mst_edge_tuples:
+                    self.create_edge(from_id, to_id)  # Используем наш метод для создания рёбер
 
             # --- Шаг 3 (НОВЫЙ): Обеспечение двусвязности ---
             print("Обеспечение двусвязности...")
-            node_degrees = {node_id: 0 for node_id in self.nodes}
-            for edge in self.edges:
-                node_degrees[edge.from_id] += 1
-                node_degrees[edge.to_id] += 1
-
-            leaf_nodes_ids = [node_id for node_id, degree in node_degrees.items() if degree == 1]
-
-            for leaf_id in leaf_nodes_ids:
-                # Находим соседа этого "листа"
-                connected_neighbor = next(e.to_id if e.from_id == leaf_id else e.from_id for e in self.edges if
-                                          leaf_id in (e.from_id, e.to_id))
-
-                # Ищем кандидатов для новой связи
-                candidates = [
-                    node_id for node_id in self.nodes
-                    if node_id != leaf_id and node_id != connected_neighbor
-                ]
-                # Убираем тех, с кем уже есть связь
-                candidates = [c for c in candidates if not any(
-                    (e.from_id == leaf_id and e.to_id == c) or (e.from_id == c and e.to_id == leaf_id) for e in
-                    self.edges)]
-
-                if candidates:
-                    target_id = random.choice(candidates)
-                    print(f"Добавляем резервное ребро от {leaf_id} к {target_id}")
-                    self.create_edge(leaf_id, target_id)
-
+            with span("leaf_backup_edges"):
+                node_degrees = {node_id: 0 for node_id in self.nodes}
+                for edge in self.edges:
+                    node_degrees[edge.from_id] += 1
+                    node_degrees[edge.to_id] += 1
+
+                leaf_nodes_ids = [node_id for node_id, degree in node_degrees.items() if degree == 1]
+
+                for leaf_id in leaf_nodes_ids:
+                    # Находим соседа этого "листа"
+                    connected_neighbor = next(e.to_id if e.from_id == leaf_id else e.from_id for e in self.edges if
+                                              leaf_id in (e.from_id, e.to_id))
+
+                    # Ищем кандидатов для новой связи
+                    candidates = [
+                        node_id for node_id in self.nodes
+                        if node_id != leaf_id and node_id != connected_neighbor
+                    ]
+                    # Убираем тех, с кем уже есть связь
+                    candidates = [c for c in candidates if not any(
+                        (e.from_id == leaf_id and e.to_id == c) or (e.from_id == c and e.to_id == leaf_id) for e in
+                        self.edges)]
+
+                    if candidates:
+                        target_id = random.choice(candidates)
+                        print(f"Добавляем резервное ребро от {leaf_id} к {target_id}")
+                        self.create_edge(leaf_id, target_id)
+
+            self.snapshot_journal()
             self.drawingCanvas.update()
             QMessageBox.information(self, "Загрузка завершена",
                                     f"Успешно загружено {len(self.nodes)} узлов. Топология построена.")
@@ -588,12 +1777,91 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def add_node(self):
         print("Действие: Добавить узел")
         new_id = max(self.nodes.keys()) + 1 if self.nodes else 0
-        pos_x = self.drawingCanvas.width() // 2
-        pos_y = self.drawingCanvas.height() // 2
+        # Ближайшее к центру холста место, где новый узел не ляжет на существующие
+        width, height = self.drawingCanvas.width(), self.drawingCanvas.height()
+        occupied = np.array([node.position for node in self.nodes.values()], dtype=np.float64).reshape(-1, 2)
+        pos_x, pos_y = free_position(occupied, (width // 2, height // 2), NODE_SPACING)
         new_node = Node(id=new_id, position=(pos_x, pos_y), name=f"Node{new_id}", cost=0.0)
+        route_state = self.begin_route_update()
         self.nodes[new_id] = new_node
+        self.versions.bump(tv.NODES)
+        if route_state:
+            route_state[1].add_node(new_id)
+            self.finish_route_update(route_state, [])
+        self.record_change("add_node", id=new_id, name=new_node.name, position=new_node.position, cost=new_node.cost)
         self.drawingCanvas.update()
 
+    # --- Авто-раскладка ---
+
+    def auto_layout(self):
+        """
+        Силовая раскладка в фоновом потоке; холст показывает промежуточные координаты.
+        Применение пересчитывает длины и стоимости рёбер, отмена возвращает прежние координаты.
+        """
+        if len(self.nodes) < 2:
+            QMessageBox.warning(self, "Ошибка", "Для раскладки нужно хотя бы два узла.")
+            return
+        iterations, ok = QInputDialog.getInt(self, "Авто-раскладка узлов", "Число итераций:",
+                                             value=300, min=10, max=10000)
+        if not ok: return
+
+        node_ids = list(self.nodes.keys())
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        original = [self.nodes[node_id].position for node_id in node_ids]
+        edge_u = np.array([index[edge.from_id] for edge in self.edges], dtype=np.int64)
+        edge_v = np.array([index[edge.to_id] for edge in self.edges], dtype=np.int64)
+        layout = ForceLayout(np.array(original, dtype=np.float64), edge_u, edge_v, iterations)
+        worker = LayoutWorker(layout, self.drawingCanvas.width(), self.drawingCanvas.height(), LAYOUT_MARGIN, self)
+        dialog = AutoLayoutDialog(iterations, len(node_ids), self)
+        worker.positionsReady.connect(
+            lambda positions, iteration: self.show_layout_frame(worker, node_ids, positions, iteration))
+        self.layout_worker, self.layout_dialog = worker, dialog
+        worker.start()
+        accepted = dialog.exec()
+        worker.requestInterruption()
+        worker.wait()
+        # Кадры, которые поток успел отправить до остановки, больше не показываем
+        self.layout_worker = self.layout_dialog = None
+        if accepted:
+            with span("Авто-раскладка: применение"):
+                self.apply_layout(node_ids, worker.canvas_positions().tolist())
+        else:
+            for node_id, position in zip(node_ids, original):
+                self.nodes[node_id].position = position
+            self.drawingCanvas.update()
+
+    def show_layout_frame(self, worker, node_ids, positions, iteration: int):
+        if worker is not self.layout_worker:
+            return
+        for node_id, (x, y) in zip(node_ids, positions.tolist()):
+            self.nodes[node_id].position = (x, y)
+        self.layout_dialog.set_progress(iteration)
+        self.drawingCanvas.update()
+
+    def apply_layout(self, node_ids, positions):
+        """Новые координаты узлов; длины и стоимости рёбер пересчитываются, потоки не меняются."""
+        flows_valid = self.result_cache.is_valid("flows", tv.FLOWS_DEPENDS_ON)
+        for node_id, (x, y) in zip(node_ids, positions):
+            self.nodes[node_id].position = (x, y)
+        for edge in self.edges:
+            edge.length = self._calculate_distance(self.nodes[edge.from_id].position, self.nodes[edge.to_id].position)
+            edge.cost = self._calculate_cost_from_length(edge.length) + self._calculate_cost_from_capacity(edge.capacity)
+        self.versions.bump(tv.POSITIONS, tv.CAPACITIES)
+        if flows_valid:
+            self.result_cache.put("flows", tv.FLOWS_DEPENDS_ON, True)
+        # Сдвинулись все узлы - дешевле сразу сделать снимок журнала
+        self.snapshot_journal()
+        self.drawingCanvas.update()
+        self.update_info_panels()
+        self.statusBar().showMessage(f"Раскладка применена: {len(node_ids)} узлов, длины и стоимости рёбер "
+                                     f"пересчитаны.", 5000)
+
+    def node_moved(self, node_id):
+        """Вызывается холстом, когда перетаскивание узла завершено."""
+        node = self.nodes[node_id]
+        self.versions.bump(tv.POSITIONS)
+        self.record_change("move_node", id=node_id, position=node.position)
+
     def move_mode_changed(self, state):
         self.is_move_mode = (state == Qt.CheckState.Checked.value)
         print(f"Действие: Режим перемещения изменен на {self.is_move_mode}")
@@ -608,6 +1876,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         except ValueError:
             QMessageBox.warning(self, "Ошибка ввода", "Стоимость и производительность должны быть числами.")
             self.nodeCostEdit.setText(str(self.selected_node.cost))
+        self.versions.bump(tv.NODE_ATTRS)
+        self.record_change("update_node", id=self.selected_node.id,
+                           name=self.selected_node.name, cost=self.selected_node.cost)
         self.drawingCanvas.update()
 
     def update_edge_properties(self):
@@ -629,6 +1900,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                                                  value=current_size_bytes, min=64, max=9000)
         if ok:
             self.avg_packet_size_bits = new_size_bytes * 8
+            self.versions.bump(tv.PACKET_SIZE)
             self.statusBar().showMessage(f"Размер пакета установлен: {new_size_bytes} байт.", 5000)
             # Если уже были расчеты, их нужно сбросить, так как задержки изменятся!
             # Найдем ребра, у которых есть задержка, и сбросим ее
@@ -639,6 +1911,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
 
 
 if __name__ == '__main__':
+    # Нужно для пула процессов в собранном .exe
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,179 @@
+# memory_accounting.py
+
+import os
+import sys
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+from disk_cache import StoredRoutes
+from dynamic_routes import HopRouteView
+
+# Прогноз пика больше этой доли свободной памяти - повод предупредить пользователя
+MEMORY_WARNING_SHARE = 0.5
+# Сколько элементов коллекции измеряем, чтобы оценить средний размер
+SAMPLE_SIZE = 200
+# Сколько источников обходим в ширину для оценки средней длины маршрута
+SAMPLE_SOURCES = 8
+# Ячейка таблицы Qt (QTableWidgetItem с данными) без текста - по замерам, байт;
+# память Qt выделяется в C++ и tracemalloc ее не видит
+QT_TABLE_ITEM_BYTES = 200
+# Ячейка листа openpyxl в обычном (не потоковом) режиме вместе с записью в словаре листа, байт
+OPENPYXL_CELL_BYTES = 200
+# В компактном режиме таблица маршрутов показывает не больше строк
+COMPACT_ROUTE_ROWS = 20_000
+
+
+def _instance_bytes(obj) -> int:
+    """Объект dataclass со словарем атрибутов и неразделяемыми значениями (float, str, tuple)."""
+    size = sys.getsizeof(obj) + sys.getsizeof(vars(obj))
+    for value in vars(obj).values():
+        if isinstance(value, (float, str, tuple)):
+            size += sys.getsizeof(value)
+    return size
+
+
+def _sample(items) -> list:
+    items = list(items) if not isinstance(items, list) else items
+    if len(items) <= SAMPLE_SIZE:
+        return items
+    step = len(items) // SAMPLE_SIZE
+    return items[::step][:SAMPLE_SIZE]
+
+
+def collection_bytes(objects) -> int:
+    """Контейнер объектов модели: сам контейнер плюс средний объект выборки, умноженный на их число."""
+    values = list(objects.values()) if isinstance(objects, dict) else list(objects)
+    if not values:
+        return sys.getsizeof(objects)
+    sample = _sample(values)
+    average = sum(_instance_bytes(obj) for obj in sample) / len(sample)
+    return int(sys.getsizeof(objects) + average * len(values))
+
+
+def routes_bytes(routes) -> int:
+    """Таблица маршрутов в любом из представлений: словарь путей, файлы кэша или деревья путей."""
+    if isinstance(routes, HopRouteView):
+        return routes.table.dist.nbytes + routes.table.parent.nbytes
+    if isinstance(routes, StoredRoutes):
+        # Массивы отображены в память с диска: в памяти процесса только прочитанные страницы
+        return 0
+    if not routes:
+        return sys.getsizeof(routes)
+    sample = _sample(list(routes.items())[:SAMPLE_SIZE * 50])
+    average = sum(sys.getsizeof(key) + sys.getsizeof(path) for key, path in sample) / len(sample)
+    return int(sys.getsizeof(routes) + average * len(routes))
+
+
+def table_bytes(table) -> int:
+    """Таблица QTableWidget: ячейки плюс текст в UTF-16; длина текста оценивается по выборке строк."""
+    rows, columns = table.rowCount(), table.columnCount()
+    if rows == 0:
+        return 0
+    sample_rows = range(0, rows, max(1, rows // SAMPLE_SIZE))
+    text_chars = [sum(len(table.item(r, c).text()) for c in range(columns) if table.item(r, c) is not None)
+                  for r in sample_rows]
+    return int(rows * (columns * QT_TABLE_ITEM_BYTES + 2 * np.mean(text_chars)))
+
+
+def available_memory() -> int | None:
+    """Свободная физическая память, байт (None - не удалось узнать)."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("length", ctypes.c_ulong), ("load", ctypes.c_ulong),
+                        ("total_phys", ctypes.c_ulonglong), ("avail_phys", ctypes.c_ulonglong),
+                        ("total_page", ctypes.c_ulonglong), ("avail_page", ctypes.c_ulonglong),
+                        ("total_virtual", ctypes.c_ulonglong), ("avail_virtual", ctypes.c_ulonglong),
+                        ("avail_extended", ctypes.c_ulonglong)]
+        status = MemoryStatus()
+        status.length = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.avail_phys)
+        return None
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+# --- Прогноз пика для этапов ---
+
+# Размеры элементарных объектов Python на этой платформе
+_DICT_ENTRY_BYTES = sys.getsizeof({i: None for i in range(4096)}) / 4096
+_PAIR_BYTES = sys.getsizeof((0, 0))
+_LIST_BYTES = sys.getsizeof([])
+# Первые экземпляры класса хранят атрибуты иначе - меряем один из многих
+_DEMAND_BYTES = _instance_bytes([TrafficDemand(from_id=0, to_id=1, volume=1.0) for _ in range(SAMPLE_SIZE)][-1])
+
+
+def estimate_mean_hops(nodes: Dict[int, Node], edges: List[Edge]) -> float:
+    """Средняя длина маршрута в хопах по обходу в ширину из нескольких узлов."""
+    adj = {node_id: [] for node_id in nodes}
+    for edge in edges:
+        adj[edge.from_id].append(edge.to_id)
+        adj[edge.to_id].append(edge.from_id)
+    ids = list(nodes)
+    total, pairs = 0, 0
+    for source in ids[::max(1, len(ids) // SAMPLE_SOURCES)][:SAMPLE_SOURCES]:
+        dist = {source: 0}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for v in adj[u]:
+                if v not in dist:
+                    dist[v] = dist[u] + 1
+                    queue.append(v)
+        total += sum(dist.values())
+        pairs += len(dist) - 1
+    return total / pairs if pairs else 1.0
+
+
+def predict_routes_stage(nodes: Dict[int, Node], edges: List[Edge], compact: bool) -> Dict[str, int]:
+    """Прогноз памяти Этапа 2 (маршруты и их таблица) по частям, байт."""
+    n = len(nodes)
+    pairs = n * (n - 1)
+    hops = estimate_mean_hops(nodes, edges)
+    name_chars = np.mean([len(node.name) for node in _sample(list(nodes.values()))]) if nodes else 0
+    row_text = 2 * name_chars + 2 + (hops + 1) * (name_chars + 4)
+    if compact:
+        rows = min(pairs, COMPACT_ROUTE_ROWS)
+        return {"Деревья путей (матрицы расстояний и предков)": 8 * n * n,
+                "Таблица маршрутов": int(rows * (4 * QT_TABLE_ITEM_BYTES + 2 * row_text + 8))}
+    path_bytes = _LIST_BYTES + 8 * (hops + 1) * 1.125  # список растет с запасом
+    return {
+        "Словарь маршрутов": int(pairs * (_DICT_ENTRY_BYTES + _PAIR_BYTES + path_bytes)),
+        # store_routes сортирует пары и собирает массивы для записи на диск
+        "Запись в кэш на диске": int(pairs * (8 + _PAIR_BYTES + 24 + 8 * (hops + 1))),
+        "Таблица маршрутов": int(pairs * (4 * QT_TABLE_ITEM_BYTES + 2 * row_text + 8)),
+    }
+
+
+def predict_flows_stage(nodes: Dict[int, Node], compact: bool) -> Dict[str, int]:
+    """Прогноз памяти Этапа 3 для матрицы нагрузки N x N (худший случай - все ячейки заполнены), байт."""
+    n = len(nodes)
+    cells = n * n
+    demands = n * (n - 1)
+    return {
+        "Лист Excel": OPENPYXL_CELL_BYTES * (n if compact else cells),
+        "Требования": int(demands * (_DEMAND_BYTES + 8)),
+    }
+
+
+def predict_generated_demands(demand_count: int) -> Dict[str, int]:
+    """Прогноз памяти Этапа 3 для матрицы, сгенерированной по модели: листа Excel нет."""
+    return {"Требования": int(demand_count * (_DEMAND_BYTES + 8))}
+
+
+def format_bytes(size: float) -> str:
+    return f"{size / 2 ** 20:.1f} МБ"
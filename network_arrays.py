@@ -0,0 +1,213 @@
+# network_arrays.py
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+
+
+class TopologyArrays:
+    """
+    Снимок топологии в виде массивов numpy: узлы пронумерованы 0..N-1,
+    рёбра 0..E-1 в порядке списка self.edges, смежность хранится в CSR-виде.
+    Используется векторизованными расчетами и передается в дочерние процессы.
+    """
+
+    def __init__(self, node_ids, edge_u, edge_v, capacity, flow, length):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.index: Dict[int, int] = {int(node_id): i for i, node_id in enumerate(self.node_ids)}
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.flow = np.asarray(flow, dtype=np.float64)
+        self.length = np.asarray(length, dtype=np.float64)
+        self._build_adjacency()
+
+    @classmethod
+    def from_model(cls, nodes: Dict[int, Node], edges: List[Edge]) -> "TopologyArrays":
+        node_ids = list(nodes.keys())
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        return cls(node_ids,
+                   [index[e.from_id] for e in edges],
+                   [index[e.to_id] for e in edges],
+                   [e.capacity for e in edges],
+                   [e.flow for e in edges],
+                   [e.length for e in edges])
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_u)
+
+    def _build_adjacency(self):
+        """CSR-смежность: соседи узла i - adj_node[adj_ptr[i]:adj_ptr[i+1]], ребра - adj_edge[...]."""
+        n, m = self.node_count, self.edge_count
+        heads = np.concatenate([self.edge_u, self.edge_v])
+        tails = np.concatenate([self.edge_v, self.edge_u])
+        edge_ids = np.concatenate([np.arange(m), np.arange(m)]).astype(np.int32)
+        # Соседи каждого узла идут в порядке списка рёбер - как в dijkstra_all_pairs_hops
+        order = np.lexsort((edge_ids, heads))
+        self.adj_node = tails[order]
+        self.adj_edge = edge_ids[order]
+        self.adj_ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(heads, minlength=n), out=self.adj_ptr[1:])
+
+    def adjacency_lists(self) -> List[List[Tuple[int, int]]]:
+        """Смежность в виде списков [(сосед, ребро), ...] - для обходов на чистом Python."""
+        ptr, nbr, eid = self.adj_ptr.tolist(), self.adj_node.tolist(), self.adj_edge.tolist()
+        return [list(zip(nbr[ptr[i]:ptr[i + 1]], eid[ptr[i]:ptr[i + 1]])) for i in range(self.node_count)]
+
+    def in_arc_slots(self) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Входящие дуги по "слотам" для векторизованных проходов по всем узлам сразу.
+        heads - узлы с соседями по убыванию степени; slots[k] - номера дуг CSR
+        (индексы adj_node/adj_edge), k-х по счету у первых len(slots[k]) узлов heads.
+        Минимум или сумма по входящим дугам считается k срезами вместо reduceat.
+        """
+        degree = np.diff(self.adj_ptr)
+        heads = np.argsort(-degree, kind='stable')
+        heads = heads[degree[heads] > 0]
+        slots = [self.adj_ptr[heads[degree[heads] > k]] + k for k in range(int(degree.max(initial=0)))]
+        return heads, slots
+
+    def edge_lookup(self):
+        """Поиск ребра по паре узлов для массивов пар: сортированные ключи min * N + max."""
+        n = self.node_count
+        u = self.edge_u.astype(np.int64)
+        v = self.edge_v.astype(np.int64)
+        keys = np.minimum(u, v) * n + np.maximum(u, v)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        def find(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+            pair_keys = np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b)
+            return order[np.searchsorted(sorted_keys, pair_keys)]
+
+        return find
+
+
+class DemandRoutes:
+    """
+    Требования вместе с их маршрутами, выраженными через индексы рёбер:
+    рёбра маршрута требования d - path_edges[path_ptr[d]:path_ptr[d+1]].
+    """
+
+    def __init__(self, source, target, volume, path_ptr, path_edges):
+        self.source = np.asarray(source, dtype=np.int32)
+        self.target = np.asarray(target, dtype=np.int32)
+        self.volume = np.asarray(volume, dtype=np.float64)
+        self.path_ptr = np.asarray(path_ptr, dtype=np.int64)
+        self.path_edges = np.asarray(path_edges, dtype=np.int32)
+
+    @classmethod
+    def from_model(cls, topology: TopologyArrays, edges: List[Edge],
+                   routes: Dict[Tuple[int, int], List[int]], demands: List[TrafficDemand]) -> "DemandRoutes":
+        """Требования без маршрута пропускаются - они не дают потока и на Этапе 3."""
+        edge_ids = {}
+        for i, edge in enumerate(edges):
+            edge_ids[(edge.from_id, edge.to_id)] = i
+            edge_ids[(edge.to_id, edge.from_id)] = i
+        source, target, volume, path_ptr, path_edges = [], [], [], [0], []
+        for demand in demands:
+            path = routes.get((demand.from_id, demand.to_id))
+            if path is None:
+                continue
+            source.append(topology.index[demand.from_id])
+            target.append(topology.index[demand.to_id])
+            volume.append(demand.volume)
+            path_edges.extend(edge_ids[(path[i], path[i + 1])] for i in range(len(path) - 1))
+            path_ptr.append(len(path_edges))
+        return cls(source, target, volume, path_ptr, path_edges)
+
+    @property
+    def demand_count(self) -> int:
+        return len(self.source)
+
+    def demand_of_path_entry(self) -> np.ndarray:
+        """Номер требования для каждого элемента path_edges."""
+        return np.repeat(np.arange(self.demand_count, dtype=np.int32), np.diff(self.path_ptr))
+
+    def edge_demand_index(self):
+        """
+        Обратный индекс: какие требования проходят через ребро.
+        Возвращает (ptr, demand_ids): требования ребра e - demand_ids[ptr[e]:ptr[e+1]].
+        """
+        owners = self.demand_of_path_entry()
+        order = np.argsort(self.path_edges, kind='stable')
+        edge_count = int(self.path_edges.max()) + 1 if len(self.path_edges) else 0
+        ptr = np.zeros(edge_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.path_edges, minlength=edge_count), out=ptr[1:])
+        return ptr, owners[order]
+
+    def subset_paths(self, demand_ids: np.ndarray):
+        """Маршруты части требований в том же CSR-виде: (path_ptr, path_edges)."""
+        starts = self.path_ptr[demand_ids]
+        lengths = self.path_ptr[demand_ids + 1] - starts
+        ptr = np.zeros(len(demand_ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=ptr[1:])
+        positions = np.repeat(starts - ptr[:-1], lengths) + np.arange(ptr[-1])
+        return ptr, self.path_edges[positions]
+
+    def subset(self, demand_ids: np.ndarray) -> "DemandRoutes":
+        """Часть требований вместе с их маршрутами."""
+        path_ptr, path_edges = self.subset_paths(demand_ids)
+        return DemandRoutes(self.source[demand_ids], self.target[demand_ids], self.volume[demand_ids],
+                            path_ptr, path_edges)
+
+    def edge_flows(self, edge_count: int) -> np.ndarray:
+        """Суммарный поток по каждому ребру (то же, что делает Этап 3)."""
+        owners = self.demand_of_path_entry()
+        return np.bincount(self.path_edges, weights=self.volume[owners], minlength=edge_count)
+
+
+def source_demand_rows(topology: TopologyArrays, demands: List[TrafficDemand]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Матрица нагрузки по источникам: sources - узлы, у которых есть требования,
+    rows[i, t] - суммарный объем от sources[i] к узлу t.
+    """
+    source_index: Dict[int, int] = {}
+    entries = []
+    for demand in demands:
+        if demand.from_id in topology.index and demand.to_id in topology.index and demand.volume > 0:
+            s = topology.index[demand.from_id]
+            source_index.setdefault(s, len(source_index))
+            entries.append((source_index[s], topology.index[demand.to_id], demand.volume))
+    rows = np.zeros((len(source_index), topology.node_count))
+    for row, target, volume in entries:
+        rows[row, target] += volume
+    return np.array(list(source_index), dtype=np.int64), rows
+
+
+def mm1_delays(flow: np.ndarray, capacity: np.ndarray, avg_packet_size_bits: int) -> np.ndarray:
+    """Векторизованная версия calculate_edge_delays: задержка M/M/1 каждого ребра в мс."""
+    if avg_packet_size_bits <= 0:
+        avg_packet_size_bits = 12000  # 1500 байт по умолчанию
+    flow, capacity = np.broadcast_arrays(np.asarray(flow, dtype=np.float64),
+                                         np.asarray(capacity, dtype=np.float64))
+    delays = np.zeros(flow.shape)
+    overloaded = flow >= capacity
+    normal = (capacity > 0) & (flow > 0) & ~overloaded
+    delays[overloaded] = np.inf
+    # Порядок операций как в calculate_edge_delays, чтобы результаты совпадали до бита
+    flow_pps = (flow[normal] * 1_000_000) / avg_packet_size_bits
+    capacity_pps = (capacity[normal] * 1_000_000) / avg_packet_size_bits
+    delays[normal] = (1 / (capacity_pps - flow_pps)) * 1000
+    return delays
+
+
+def path_sums(values: np.ndarray, path_ptr: np.ndarray, path_edges: np.ndarray) -> np.ndarray:
+    """
+    Сумма значений рёбер вдоль каждого пути за один проход по всем путям.
+    Бесконечные значения (перегруженные рёбра) дают бесконечную сумму.
+    """
+    entries = values[path_edges]
+    infinite = np.isinf(entries)
+    finite_cumsum = np.concatenate([[0.0], np.cumsum(np.where(infinite, 0.0, entries))])
+    infinite_cumsum = np.concatenate([[0], np.cumsum(infinite)])
+    sums = finite_cumsum[path_ptr[1:]] - finite_cumsum[path_ptr[:-1]]
+    sums[infinite_cumsum[path_ptr[1:]] - infinite_cumsum[path_ptr[:-1]] > 0] = np.inf
+    return sums
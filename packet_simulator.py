@@ -0,0 +1,271 @@
+# packet_simulator.py
+
+import heapq
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from instrumentation import timed, count
+from network_arrays import TopologyArrays, DemandRoutes, mm1_delays, path_sums
+
+# Процессы поступления пакетов требования (средний интервал у всех одинаковый - 1 / интенсивность)
+POISSON = "poisson"
+BURSTY = "bursty"
+PARETO = "pareto"
+ARRIVAL_PROCESSES = {
+    POISSON: "Пуассоновский (как в модели M/M/1)",
+    BURSTY: "Пачечный (гиперэкспоненциальный, C² = 10)",
+    PARETO: "С тяжелым хвостом (Парето, α = 1.5)",
+}
+# Квадрат коэффициента вариации интервалов пачечного потока
+BURSTY_SCV = 10.0
+# Параметр формы распределения Парето (при α <= 2 дисперсия бесконечна)
+PARETO_SHAPE = 1.5
+# Размер пакета: экспоненциальный (как в M/M/1) или постоянный
+EXPONENTIAL_SIZE = "exponential"
+CONSTANT_SIZE = "constant"
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class DelayStats:
+    """Распределение задержки по группам (каналам или требованиям), мс."""
+    packets: np.ndarray
+    mean: np.ndarray
+    p50: np.ndarray
+    p95: np.ndarray
+    p99: np.ndarray
+    max: np.ndarray
+    analytic: np.ndarray      # задержка M/M/1 при той же нагрузке (для требований - сумма по маршруту)
+
+
+@dataclass
+class SimulationReport:
+    """Итог имитационного моделирования пакетов."""
+    process: str
+    horizon_s: float
+    warmup_s: float
+    links: DelayStats              # по рёбрам, в порядке topology
+    demands: DelayStats            # по требованиям, в порядке demand_routes
+    measured_utilization: np.ndarray
+    packets: int                   # сколько пакетов сгенерировано
+    events: int                    # обработанные события: приходы пакетов на каналы
+    elapsed_s: float
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+
+def interarrival_times(rng: np.random.Generator, process: str, n: int) -> np.ndarray:
+    """n интервалов между пакетами со средним 1 - одним вызовом генератора на весь пакет."""
+    if process == POISSON:
+        return rng.standard_exponential(n)
+    if process == BURSTY:
+        # Гиперэкспоненциальное распределение с уравновешенными средними фаз
+        p = 0.5 * (1 + math.sqrt((BURSTY_SCV - 1) / (BURSTY_SCV + 1)))
+        fast = rng.random(n) < p
+        return rng.standard_exponential(n) / np.where(fast, 2 * p, 2 * (1 - p))
+    if process == PARETO:
+        scale = (PARETO_SHAPE - 1) / PARETO_SHAPE
+        return scale * (1.0 - rng.random(n)) ** (-1 / PARETO_SHAPE)
+    raise ValueError(f"Неизвестный процесс поступления: {process}")
+
+
+def residual_times(rng: np.random.Generator, process: str, n: int) -> np.ndarray:
+    """
+    Время до первого пакета в установившемся потоке (равновесное распределение остаточного
+    интервала, среднее 1). Если начать с обычного интервала, пачечный поток в начале
+    горизонта дает заметно больше пакетов, чем в среднем.
+    """
+    if process == POISSON:
+        return rng.standard_exponential(n)
+    if process == BURSTY:
+        # У фаз с уравновешенными средними остаточный интервал попадает в каждую с вероятностью 1/2
+        p = 0.5 * (1 + math.sqrt((BURSTY_SCV - 1) / (BURSTY_SCV + 1)))
+        fast = rng.random(n) < 0.5
+        return rng.standard_exponential(n) / np.where(fast, 2 * p, 2 * (1 - p))
+    if process == PARETO:
+        a = PARETO_SHAPE
+        scale = (a - 1) / a
+        u = rng.random(n)
+        body = u < scale
+        tail = scale * (a * (1.0 - u[~body])) ** (-1 / (a - 1))
+        result = np.empty(n)
+        result[body] = u[body] * a * scale / (a - 1)
+        result[~body] = tail
+        return result
+    raise ValueError(f"Неизвестный процесс поступления: {process}")
+
+
+def generate_arrivals(rng: np.random.Generator, process: str, rates: np.ndarray, horizon: float):
+    """
+    Моменты появления пакетов всех требований на [0, horizon).
+    Интервалы генерируются блоками сразу для всех требований, которым еще не хватило
+    пакетов до конца горизонта; суммы внутри требования - одна общая cumsum со сдвигом.
+    Возвращает (номер требования пакета, момент появления, с).
+    """
+    owners, times = [], []
+    clock = np.zeros(len(rates))
+    pending = np.nonzero(rates > 0)[0]
+    first_block = True
+    while pending.size:
+        expected = rates[pending] * (horizon - clock[pending])
+        block = np.ceil(expected + 4 * np.sqrt(expected) + 16).astype(np.int64)
+        gaps = interarrival_times(rng, process, int(block.sum()))
+        ends = np.cumsum(block)
+        starts = ends - block
+        if first_block:
+            gaps[starts] = residual_times(rng, process, len(starts))
+            first_block = False
+        gaps /= np.repeat(rates[pending], block)
+        totals = np.cumsum(gaps)
+        base = np.repeat(totals[starts] - gaps[starts] - clock[pending], block)
+        arrival = totals - base
+        owner = np.repeat(pending, block)
+        keep = arrival < horizon
+        owners.append(owner[keep])
+        times.append(arrival[keep])
+        clock[pending] = arrival[ends - 1]
+        pending = pending[clock[pending] < horizon]
+    if not owners:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(owners), np.concatenate(times)
+
+
+def run_fifo_network(link: list, service: list, is_last: list, born: list, first_entries: list,
+                     edge_count: int) -> list:
+    """
+    Событийный цикл: очередь событий - куча приходов пакетов на следующий канал маршрута,
+    приходы новых пакетов сливаются с ней из отсортированного списка born (их в куче не
+    держим - в ней только пакеты в пути). События обрабатываются по времени, поэтому
+    момент ухода из FIFO-канала известен уже в момент прихода: D = max(A, освобождение) + S,
+    и отдельное событие ухода не нужно. Списки Python вместо массивов - обращение
+    к элементу numpy из цикла в несколько раз медленнее.
+    Возвращает момент ухода для каждого перехода.
+    """
+    push, pop = heapq.heappush, heapq.heappop
+    heap = []
+    free = [0.0] * edge_count
+    departure = [0.0] * len(link)
+    born = born + [math.inf]
+    i, next_born, n = 0, born[0], len(first_entries)
+    while True:
+        if heap and heap[0][0] < next_born:
+            t, e = pop(heap)
+        elif i < n:
+            t, e = next_born, first_entries[i]
+            i += 1
+            next_born = born[i]
+        else:
+            break
+        l = link[e]
+        f = free[l]
+        d = (t if t > f else f) + service[e]
+        free[l] = d
+        departure[e] = d
+        if not is_last[e]:
+            push(heap, (d, e + 1))
+    return departure
+
+
+def _group_stats(groups: np.ndarray, values: np.ndarray, group_count: int, analytic: np.ndarray) -> DelayStats:
+    """Среднее и квантили values по группам: сортировка по значению, затем устойчивая - по группе."""
+    values = values * 1000
+    packets = np.bincount(groups, minlength=group_count)
+    sums = np.bincount(groups, weights=values, minlength=group_count)
+    starts = np.zeros(group_count, dtype=np.int64)
+    np.cumsum(packets[:-1], out=starts[1:])
+    order = np.argsort(values)
+    values = values[order[np.argsort(groups[order], kind='stable')]]
+    present = packets > 0
+
+    def quantile(q):
+        result = np.full(group_count, np.nan)
+        index = starts + np.floor(q * (packets - 1)).astype(np.int64)
+        result[present] = values[index[present]]
+        return result
+
+    mean = np.full(group_count, np.nan)
+    mean[present] = sums[present] / packets[present]
+    p50, p95, p99 = (quantile(q) for q in PERCENTILES)
+    return DelayStats(packets=packets, mean=mean, p50=p50, p95=p95, p99=p99, max=quantile(1.0),
+                      analytic=analytic)
+
+
+def expected_packet_hops(demand_routes: DemandRoutes, avg_packet_size_bits: int, horizon: float) -> float:
+    """Сколько пакето-переходов по каналам даст моделирование на горизонте horizon."""
+    rates = demand_routes.volume * 1_000_000 / avg_packet_size_bits
+    return float(np.dot(rates, np.diff(demand_routes.path_ptr))) * horizon
+
+
+@timed("packet_simulation")
+def simulate_packets(topology: TopologyArrays, demand_routes: DemandRoutes, avg_packet_size_bits: int,
+                     horizon: float, process: str = POISSON, packet_sizes: str = EXPONENTIAL_SIZE,
+                     independent_sizes: bool = True, warmup_share: float = 0.1, seed: int = 0) -> SimulationReport:
+    """
+    Дискретно-событийное моделирование пакетов по маршрутам требований через
+    FIFO-очереди каналов (по одной очереди на канал, как в расчете потоков).
+    Всё, что не зависит от порядка событий, - моменты появления пакетов, их переходы
+    и время обслуживания - генерируется массивами заранее; в событийном цикле
+    (run_fifo_network) остаются только куча и сравнения.
+    independent_sizes - размер пакета заново на каждом канале (допущение
+    независимости Клейнрока, в котором выведена формула M/M/1).
+    Статистика собирается по пакетам, появившимся после warmup_share * horizon.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    # Требования без маршрута (недостижимые) пакетов не порождают
+    routed = np.diff(demand_routes.path_ptr) > 0
+    rates = np.where(routed, demand_routes.volume * 1_000_000 / avg_packet_size_bits, 0.0)
+    owner, born = generate_arrivals(rng, process, rates, horizon)
+    packet_count = len(born)
+
+    # Переходы пакетов по каналам: рёбра маршрута пакета - рёбра маршрута его требования
+    hops = np.diff(demand_routes.path_ptr)[owner]
+    entry_packet = np.repeat(np.arange(packet_count), hops)
+    packet_first = np.zeros(packet_count + 1, dtype=np.int64)
+    np.cumsum(hops, out=packet_first[1:])
+    position = np.arange(len(entry_packet)) - packet_first[entry_packet]
+    link = demand_routes.path_edges[demand_routes.path_ptr[owner[entry_packet]] + position]
+
+    def draw_sizes(n):
+        if packet_sizes == CONSTANT_SIZE:
+            return np.full(n, float(avg_packet_size_bits))
+        return rng.standard_exponential(n) * avg_packet_size_bits
+
+    sizes = draw_sizes(len(link)) if independent_sizes else draw_sizes(packet_count)[entry_packet]
+    service = sizes / (topology.capacity[link] * 1_000_000)
+
+    is_last = np.zeros(len(link), dtype=bool)
+    is_last[packet_first[1:] - 1] = True
+    born_order = np.argsort(born, kind='stable')
+    departure = np.array(run_fifo_network(link.tolist(), service.tolist(), is_last.tolist(),
+                                          born[born_order].tolist(), packet_first[:-1][born_order].tolist(),
+                                          topology.edge_count))
+    # Приход на канал: появление пакета или уход с предыдущего канала маршрута
+    arrival = np.empty(len(link))
+    arrival[1:] = departure[:-1]
+    arrival[packet_first[:-1]] = born
+
+    warmup = warmup_share * horizon
+    measured = born[entry_packet] >= warmup
+    flow = demand_routes.edge_flows(topology.edge_count)
+    link_analytic = mm1_delays(flow, topology.capacity, avg_packet_size_bits)
+    links = _group_stats(link[measured], (departure - arrival)[measured], topology.edge_count, link_analytic)
+
+    last_entry = packet_first[1:] - 1
+    finished = born >= warmup
+    end_to_end = departure[last_entry] - born
+    demand_analytic = path_sums(link_analytic, demand_routes.path_ptr, demand_routes.path_edges)
+    demands = _group_stats(owner[finished], end_to_end[finished], demand_routes.demand_count, demand_analytic)
+
+    busy = np.bincount(link[measured], weights=service[measured], minlength=topology.edge_count)
+    count("packets", packet_count)
+    count("packet_hops", len(link))
+    return SimulationReport(process=process, horizon_s=horizon, warmup_s=warmup, links=links, demands=demands,
+                            measured_utilization=busy / (horizon - warmup), packets=packet_count,
+                            events=len(link),
+                            elapsed_s=time.perf_counter() - started)
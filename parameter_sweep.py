@@ -0,0 +1,102 @@
+# parameter_sweep.py
+
+from dataclasses import dataclass, replace
+from typing import List, Tuple
+
+import numpy as np
+
+from graph_algorithms import dijkstra_max_delay_path
+from instrumentation import timed, count
+from network_arrays import mm1_delays
+
+
+@dataclass
+class UnitDelays:
+    """
+    Показатели задержки при размере пакета 1 бит. Задержка M/M/1 канала
+    1 / (C/L - f/L) = L / (C - f) пропорциональна размеру пакета L, а перегрузка
+    (f >= C) от L не зависит, поэтому выбор путей не меняется и любой показатель
+    задержки при размере L - это показатель при 1 бите, умноженный на L.
+    """
+    edge_delays: np.ndarray          # мс на бит пакета; inf - перегрузка
+    max_delay: float                 # как dijkstra_max_delay_path
+    avg_delay: float                 # как MainWindow._calculate_average_delay
+    route_max_delay: float | None    # максимум сквозных задержек требований (None - нет требований)
+    kleinrock_delay: float | None    # средняя задержка пакета по трафику
+    utilization: np.ndarray          # загрузки каналов по возрастанию
+
+
+@dataclass
+class SweepResult:
+    """Сравнение сценариев: показатели задержки по размерам пакета и загрузки по парам порогов."""
+    packet_sizes: np.ndarray         # байт, (P,)
+    high_thresholds: np.ndarray      # доли, (T,)
+    overload_thresholds: np.ndarray  # доли, (T,)
+    max_delay: np.ndarray            # мс, (P,)
+    avg_delay: np.ndarray            # мс, (P,)
+    route_max_delay: np.ndarray | None
+    kleinrock_delay: np.ndarray | None
+    high_load_edges: np.ndarray      # число каналов с высокой нагрузкой, (T,)
+    overloaded_edges: np.ndarray     # число перегруженных каналов, (T,)
+    edge_delays_per_bit: np.ndarray  # для задержек отдельных каналов, см. edge_delays()
+
+    @property
+    def point_count(self) -> int:
+        return len(self.packet_sizes) * len(self.high_thresholds)
+
+    def edge_delays(self) -> np.ndarray:
+        """Задержки всех каналов во всех сценариях размера пакета, мс, (P, E)."""
+        return np.outer(self.packet_sizes * 8, self.edge_delays_per_bit)
+
+
+@timed("sweep_unit_delays")
+def unit_delays(nodes, edges, demand_report=None) -> UnitDelays:
+    """
+    Один расчет задержек при пакете в 1 бит. demand_report - результат demand_delays
+    с avg_packet_size_bits=1 (или None, если потоки не рассчитаны по требованиям).
+    """
+    flow = np.array([e.flow for e in edges], dtype=np.float64)
+    capacity = np.array([e.capacity for e in edges], dtype=np.float64)
+    per_bit = mm1_delays(flow, capacity, 1)
+    # Поиск пути с максимальной задержкой - по копиям рёбер, задержки проекта не трогаем
+    unit_edges = [replace(edge, delay=float(delay)) for edge, delay in zip(edges, per_bit)]
+    max_delay = dijkstra_max_delay_path(nodes, unit_edges)
+    loaded = (flow > 0) & np.isfinite(per_bit)
+    avg_delay = float(per_bit[loaded].mean()) if loaded.any() else 0.0
+    utilization = np.divide(flow, capacity, out=np.zeros_like(flow), where=capacity > 0)
+    count("edges", len(edges))
+    return UnitDelays(edge_delays=per_bit, max_delay=max_delay, avg_delay=avg_delay,
+                      route_max_delay=demand_report.max_delay if demand_report is not None else None,
+                      kleinrock_delay=demand_report.network_average if demand_report is not None else None,
+                      utilization=np.sort(utilization))
+
+
+def _edges_at_or_above(sorted_values: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    return len(sorted_values) - np.searchsorted(sorted_values, thresholds, side='left')
+
+
+@timed("parameter_sweep")
+def sweep(unit: UnitDelays, packet_sizes_bytes, threshold_pairs: List[Tuple[float, float]]) -> SweepResult:
+    """
+    Все сценарии сразу: задержки - произведение вектора размеров пакета на
+    показатели при 1 бите, число каналов по уровням загрузки - бинарный поиск
+    порогов в отсортированных загрузках. Стоимость не зависит от числа каналов.
+    Классы загрузки как на холсте: перегрузка - u >= overload, высокая - high <= u < overload.
+    """
+    sizes = np.asarray(packet_sizes_bytes, dtype=np.float64)
+    bits = sizes * 8
+    pairs = np.asarray(threshold_pairs, dtype=np.float64).reshape(-1, 2)
+    high, overload = pairs[:, 0], pairs[:, 1]
+    overloaded = _edges_at_or_above(unit.utilization, overload)
+    high_load = np.maximum(_edges_at_or_above(unit.utilization, high) - overloaded, 0)
+    count("points", len(sizes) * len(pairs))
+
+    def scaled(value):
+        return None if value is None else bits * value
+
+    return SweepResult(packet_sizes=sizes, high_thresholds=high, overload_thresholds=overload,
+                       max_delay=bits * unit.max_delay, avg_delay=bits * unit.avg_delay,
+                       route_max_delay=scaled(unit.route_max_delay),
+                       kleinrock_delay=scaled(unit.kleinrock_delay),
+                       high_load_edges=high_load, overloaded_edges=overloaded,
+                       edge_delays_per_bit=unit.edge_delays)
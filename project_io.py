@@ -0,0 +1,184 @@
+# project_io.py
+
+import json
+from dataclasses import fields
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from data_models import Node, Edge
+
+# Размер блока, которым читается файл проекта
+READ_CHUNK_SIZE = 64 * 1024
+
+# Отступ, с которым json.dump(..., indent=4) сохранял проекты раньше
+INDENT = " " * 4
+
+_NODE_FIELDS = [f.name for f in fields(Node)]
+_EDGE_FIELDS = [f.name for f in fields(Edge)]
+
+
+# --- Потоковая запись ---
+
+def _encode_value(value, level: int) -> str:
+    """Кодирует одно поле так же, как это делал json.dump с indent=4."""
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return "[]"
+        inner = INDENT * (level + 1)
+        items = (inner + _encode_value(item, level + 1) for item in value)
+        return "[\n" + ",\n".join(items) + "\n" + INDENT * level + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _write_record(f, record, field_names: List[str], level: int):
+    """Пишет один Node/Edge поле за полем, без промежуточного словаря."""
+    inner = INDENT * (level + 1)
+    f.write(INDENT * level + "{\n")
+    for i, name in enumerate(field_names):
+        if i:
+            f.write(",\n")
+        f.write(f"{inner}{json.dumps(name)}: {_encode_value(getattr(record, name), level + 1)}")
+    f.write("\n" + INDENT * level + "}")
+
+
+def _write_array(f, key: str, records: Iterable, field_names: List[str]):
+    f.write(f"{INDENT}{json.dumps(key)}: [")
+    first = True
+    for record in records:
+        f.write("\n" if first else ",\n")
+        _write_record(f, record, field_names, 2)
+        first = False
+    f.write("]" if first else "\n" + INDENT + "]")
+
+
+def save_project_json(file_name: str, nodes: Iterable[Node], edges: Iterable[Edge], tariff: dict | None = None):
+    """
+    Сохраняет проект, записывая узлы и рёбра по одному.
+    Формат файла байт-в-байт совпадает с прежним json.dump(..., indent=4); каталог
+    тарифов проекта (если он не встроенный) дописывается отдельным разделом.
+    """
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write("{\n")
+        _write_array(f, "nodes", nodes, _NODE_FIELDS)
+        f.write(",\n")
+        _write_array(f, "edges", edges, _EDGE_FIELDS)
+        if tariff is not None:
+            encoded = json.dumps(tariff, ensure_ascii=False, indent=4).replace("\n", "\n" + INDENT)
+            f.write(f",\n{INDENT}{json.dumps('tariff')}: {encoded}")
+        f.write("\n}")
+
+
+# --- Потоковое чтение ---
+
+class _StreamReader:
+    """Буфер над файлом, из которого JSON-значения разбираются по одному."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        # Отбрасываем уже разобранную часть, чтобы буфер не рос
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Возвращает следующий значимый символ (пропуская пробелы), не сдвигая позицию."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Ожидался символ '{char}', найдено '{found or 'конец файла'}'")
+        self.pos += 1
+
+    def value(self):
+        """Разбирает одно JSON-значение целиком, при необходимости дочитывая файл."""
+        self.peek()
+        while True:
+            try:
+                result, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Число на границе блока могло быть обрезано - дочитываем и разбираем заново
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return result
+
+    def array_items(self) -> Iterator:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def iter_project_json(file_name: str) -> Iterator[Tuple[str, object]]:
+    """
+    Разбирает файл проекта по мере чтения.
+    Выдает пары ("node", Node) и ("edge", Edge) в порядке их следования в файле
+    и ("tariff", словарь каталога), если каталог тарифов сохранен в проекте.
+    """
+    with open(file_name, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "nodes":
+                for node_data in reader.array_items():
+                    node_data['position'] = tuple(node_data['position'])
+                    yield "node", Node(**node_data)
+            elif key == "edges":
+                for edge_data in reader.array_items():
+                    yield "edge", Edge(**edge_data)
+            elif key == "tariff":
+                yield "tariff", reader.value()
+            else:
+                reader.value()  # Неизвестные разделы пропускаем
+            if reader.peek() == ",":
+                reader.pos += 1
+                continue
+            reader.expect("}")
+            return
+
+
+def load_project_json(file_name: str) -> Tuple[Dict[int, Node], List[Edge], dict | None]:
+    """Загружает проект целиком в виде (словарь узлов, список рёбер, каталог тарифов или None)."""
+    nodes: Dict[int, Node] = {}
+    edges: List[Edge] = []
+    tariff = None
+    for kind, record in iter_project_json(file_name):
+        if kind == "node":
+            nodes[record.id] = record
+        elif kind == "edge":
+            edges.append(record)
+        else:
+            tariff = record
+    return nodes, edges, tariff
@@ -0,0 +1,237 @@
+# reliability.py
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from data_models import TrafficDemand
+from network_arrays import TopologyArrays
+
+# Сколько элементов (выборка x ребро) держим в памяти за один пакет
+BATCH_ELEMENTS = 2_000_000
+# Квантиль нормального распределения для 95% доверительного интервала
+Z_95 = 1.959963984540054
+
+
+@dataclass
+class ReliabilityResult:
+    """Оценка надежности сети методом Монте-Карло."""
+    samples: int                    # сколько состояний сети разыграно
+    all_terminal: float             # вероятность, что все узлы исправны и связаны
+    all_terminal_ci: float          # полуширина 95% доверительного интервала
+    demand_reachability: float      # ожидаемая доля трафика, для которой есть путь
+    demand_reachability_ci: float
+    stopped_early: bool             # точность достигнута раньше лимита выборок
+
+
+def link_availabilities(lengths: np.ndarray, availability_per_100: float) -> np.ndarray:
+    """Готовность канала падает с длиной: availability_per_100 на каждые 100 единиц длины."""
+    return np.power(availability_per_100, np.asarray(lengths, dtype=np.float64) / 100.0)
+
+
+# --- Связность пакета выборок ---
+
+def batch_components(node_count: int, edge_u: np.ndarray, edge_v: np.ndarray,
+                     edge_up: np.ndarray) -> np.ndarray:
+    """
+    Векторизованный union-find сразу для пакета выборок.
+    edge_up - матрица (выборки x рёбра) исправных рёбер. Узлы всех выборок
+    нумеруются подряд (b * N + i), затем корни концов каждого ребра
+    подвешиваются к меньшему и пути сжимаются, пока компоненты не перестанут сливаться.
+    Возвращает матрицу (выборки x узлы) с номером корня компоненты узла.
+    """
+    batch = edge_up.shape[0]
+    sample_ids, edge_ids = np.nonzero(edge_up)
+    offsets = sample_ids.astype(np.int64) * node_count
+    a = offsets + edge_u[edge_ids]
+    b = offsets + edge_v[edge_ids]
+    parent = np.arange(batch * node_count, dtype=np.int64)
+    while a.size:
+        root_a, root_b = parent[a], parent[b]
+        pending = root_a != root_b
+        if not pending.any():
+            break
+        a, b = a[pending], b[pending]
+        root_a, root_b = root_a[pending], root_b[pending]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        # Сжатие путей: после него parent каждого узла - корень его компоненты
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return parent.reshape(batch, node_count)
+
+
+# --- Состояние дочернего процесса ---
+
+_shared: Dict = {}
+
+
+def _init_worker(state: Dict):
+    _shared.clear()
+    _shared.update(state)
+
+
+def _sample_block(seed: np.random.SeedSequence, samples: int) -> np.ndarray:
+    """
+    Разыгрывает samples состояний сети и возвращает суммы для оценок:
+    [число выборок, связных выборок, сумма доли трафика, сумма квадратов доли].
+    """
+    rng = np.random.default_rng(seed)
+    edge_u, edge_v = _shared["edge_u"], _shared["edge_v"]
+    edge_avail, node_avail = _shared["edge_availability"], _shared["node_availability"]
+    node_count = len(node_avail)
+    demand_source, demand_target = _shared["demand_source"], _shared["demand_target"]
+    demand_weight = _shared["demand_weight"]
+    batch_size = max(1, BATCH_ELEMENTS // max(len(edge_u), node_count, 1))
+
+    # Выборки без единого отказа встречаются чаще всего - их исход известен заранее
+    base_connected, base_share = _shared["base_connected"], _shared["base_share"]
+
+    totals = np.zeros(4)
+    done = 0
+    while done < samples:
+        batch = min(batch_size, samples - done)
+        done += batch
+        # Пакетные испытания Бернулли: каждый элемент исправен со своей готовностью
+        node_up = rng.random((batch, node_count), dtype=np.float32) < node_avail
+        edge_up = rng.random((batch, len(edge_u)), dtype=np.float32) < edge_avail
+        failed = ~(node_up.all(axis=1) & edge_up.all(axis=1))
+        connected = np.full(batch, base_connected)
+        share = np.full(batch, base_share)
+
+        if failed.any():
+            node_up, edge_up = node_up[failed], edge_up[failed]
+            edge_up &= node_up[:, edge_u] & node_up[:, edge_v]
+            roots = batch_components(node_count, edge_u, edge_v, edge_up)
+            local_roots = roots - np.arange(len(roots), dtype=np.int64)[:, None] * node_count
+            component_count = np.count_nonzero(local_roots == np.arange(node_count), axis=1)
+            connected[failed] = node_up.all(axis=1) & (component_count == 1)
+            if len(demand_weight):
+                reachable = (node_up[:, demand_source] & node_up[:, demand_target]
+                             & (roots[:, demand_source] == roots[:, demand_target]))
+                share[failed] = reachable @ demand_weight
+            else:
+                share[failed] = connected[failed]
+        totals += (batch, connected.sum(), share.sum(), np.square(share).sum())
+    return totals
+
+
+# --- Запуск ---
+
+def _wilson_half_width(successes: float, n: float) -> float:
+    """Полуширина интервала Уилсона - не вырождается в ноль при p = 0 или 1."""
+    p = successes / n
+    z2 = Z_95 * Z_95
+    return Z_95 * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+
+
+def _summarize(totals: np.ndarray, stopped_early: bool) -> ReliabilityResult:
+    n, connected, share_sum, share_sq = totals
+    share_mean = share_sum / n
+    share_var = max(share_sq / n - share_mean * share_mean, 0.0) * n / max(n - 1, 1)
+    return ReliabilityResult(samples=int(n),
+                             all_terminal=float(connected / n),
+                             all_terminal_ci=float(_wilson_half_width(connected, n)),
+                             demand_reachability=float(share_mean),
+                             demand_reachability_ci=float(Z_95 * math.sqrt(share_var / n)),
+                             stopped_early=bool(stopped_early))
+
+
+def _shared_state(topology: TopologyArrays, demands: List[TrafficDemand], node_availability: float,
+                  link_availability_per_100: float) -> Dict:
+    # Требования между одной парой узлов объединяем, вес - доля от всего трафика
+    pairs: Dict = {}
+    for demand in demands:
+        if demand.from_id in topology.index and demand.to_id in topology.index and demand.volume > 0:
+            key = (topology.index[demand.from_id], topology.index[demand.to_id])
+            pairs[key] = pairs.get(key, 0.0) + demand.volume
+    total_volume = sum(pairs.values())
+    edge_u, edge_v = topology.edge_u.astype(np.int64), topology.edge_v.astype(np.int64)
+    demand_source = np.array([s for s, _ in pairs], dtype=np.int64)
+    demand_target = np.array([t for _, t in pairs], dtype=np.int64)
+    demand_weight = np.array([v / total_volume for v in pairs.values()], dtype=np.float64)
+
+    # Исход выборки, в которой всё исправно
+    roots = batch_components(topology.node_count, edge_u, edge_v, np.ones((1, len(edge_u)), dtype=bool))[0]
+    base_connected = topology.node_count > 0 and bool(np.all(roots == roots[0]))
+    if len(demand_weight):
+        base_share = float(demand_weight[roots[demand_source] == roots[demand_target]].sum())
+    else:
+        base_share = float(base_connected)
+    return {
+        "edge_u": edge_u,
+        "edge_v": edge_v,
+        # float32, как и разыгрываемые случайные числа
+        "edge_availability": link_availabilities(topology.length, link_availability_per_100).astype(np.float32),
+        "node_availability": np.full(topology.node_count, node_availability, dtype=np.float32),
+        "demand_source": demand_source,
+        "demand_target": demand_target,
+        "demand_weight": demand_weight,
+        "base_connected": base_connected,
+        "base_share": base_share,
+    }
+
+
+def estimate_reliability(topology: TopologyArrays, demands: List[TrafficDemand],
+                         node_availability: float, link_availability_per_100: float,
+                         max_samples: int = 1_000_000, min_samples: int = 20_000,
+                         tolerance: float = 1e-3, block_samples: int = 20_000,
+                         seed: int | None = None, workers: int | None = None) -> ReliabilityResult:
+    """
+    Оценивает вероятность связности всей сети и долю доступного трафика.
+    Выборки разыгрываются блоками (параллельно в нескольких процессах); после
+    каждого блока проверяется точность, и расчет останавливается, как только
+    полуширина обоих 95% интервалов не больше tolerance.
+    Блоки получают независимые потоки случайных чисел из одного seed и учитываются
+    строго по порядку, а блоки раунда после остановки отбрасываются, поэтому
+    при заданном seed результат не зависит от числа процессов.
+    """
+    state = _shared_state(topology, demands, node_availability, link_availability_per_100)
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed)
+    totals = np.zeros(4)
+
+    def finished() -> bool:
+        if totals[0] < min_samples:
+            return False
+        result = _summarize(totals, True)
+        return result.all_terminal_ci <= tolerance and result.demand_reachability_ci <= tolerance
+
+    pool = None
+    if workers > 1 and max_samples > block_samples:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(state,))
+    else:
+        _init_worker(state)
+    try:
+        stopped_early = False
+        while totals[0] < max_samples:
+            # Один раунд - по блоку на процесс, но не больше оставшегося лимита
+            remaining = max_samples - int(totals[0])
+            sizes = []
+            while remaining > 0 and len(sizes) < workers:
+                sizes.append(min(block_samples, remaining))
+                remaining -= sizes[-1]
+            block_seeds = seeds.spawn(len(sizes))
+            if pool is None:
+                parts = [_sample_block(s, n) for s, n in zip(block_seeds, sizes)]
+            else:
+                parts = list(pool.map(_sample_block, block_seeds, sizes))
+            done = False
+            for part in parts:
+                totals += part
+                if finished():
+                    done = True
+                    break
+            if done:
+                stopped_early = totals[0] < max_samples
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return _summarize(totals, stopped_early)
@@ -1,13 +1,20 @@
+from itertools import islice
+
 from PyQt6.QtWidgets import (QWidget, QTableWidget, QVBoxLayout, QAbstractItemView,
-                             QTableWidgetItem, QLineEdit, QFormLayout, QLabel)
+                             QTableWidgetItem, QLineEdit, QFormLayout, QLabel, QSpinBox)
 from PyQt6.QtCore import pyqtSignal, Qt
 
+from instrumentation import timed, count
+from k_shortest_paths import MAX_K
+
 
 class RoutesDialog(QWidget):
     routeSelected = pyqtSignal(list)
     finished = pyqtSignal()
+    # Запрос k кратчайших путей для пары: (откуда, куда, k)
+    alternativesRequested = pyqtSignal(int, int, int)
 
-    def __init__(self, nodes, routes, parent=None):
+    def __init__(self, nodes, routes, parent=None, row_limit=None):
         super().__init__(parent)
         self.setWindowFlags(self.windowFlags() | Qt.WindowType.Window)
 
@@ -15,6 +22,10 @@ class RoutesDialog(QWidget):
         self.setMinimumSize(700, 500)  # Немного увеличим окно
 
         self.full_paths = []
+        # Компактный режим памяти: в таблице не больше row_limit маршрутов
+        self.row_limit = row_limit
+        self.limit_label = QLabel(self)
+        self.limit_label.hide()
 
         # --- ШАГ 1: Создаем виджеты для поиска ---
         self.from_search_edit = QLineEdit(self)
@@ -34,20 +45,51 @@ class RoutesDialog(QWidget):
         self.table.horizontalHeader().setStretchLastSection(True)
         self.populate_table(nodes, routes)
 
+        # Альтернативные (резервные) маршруты выбранной пары
+        self.current_pair = None
+        self.alternative_paths = []
+        self.k_spin = QSpinBox(self)
+        self.k_spin.setRange(1, MAX_K)
+        self.k_spin.setValue(3)
+        k_layout = QFormLayout()
+        k_layout.addRow(QLabel("Маршрутов для пары (k):"), self.k_spin)
+        self.alternatives_table = QTableWidget()
+        self.alternatives_table.setColumnCount(5)
+        self.alternatives_table.setHorizontalHeaderLabels(["№", "Хопов", "Длина", "Общих рёбер с основным",
+                                                           "Маршрут"])
+        self.alternatives_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.alternatives_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.alternatives_table.horizontalHeader().setStretchLastSection(True)
+
         # --- ШАГ 3: Привязываем сигналы ---
         self.table.itemSelectionChanged.connect(self.on_selection_changed)
         # Сигнал textChanged срабатывает при каждом изменении текста в поле
         self.from_search_edit.textChanged.connect(self.filter_routes)
         self.to_search_edit.textChanged.connect(self.filter_routes)
+        self.k_spin.valueChanged.connect(self.request_alternatives)
+        self.alternatives_table.itemSelectionChanged.connect(self.on_alternative_selected)
 
         # --- ШАГ 4: Собираем основной layout ---
         main_layout = QVBoxLayout(self)
         main_layout.addLayout(search_layout)  # Добавляем поля поиска сверху
+        main_layout.addWidget(self.limit_label)
         main_layout.addWidget(self.table)  # Добавляем таблицу под ними
+        main_layout.addWidget(QLabel("Альтернативные маршруты пары (k кратчайших):"))
+        main_layout.addLayout(k_layout)
+        main_layout.addWidget(self.alternatives_table)
 
+    @timed("routes_table_fill")
     def populate_table(self, nodes, routes):
         # ... (этот метод остается БЕЗ ИЗМЕНЕНИЙ) ...
-        sorted_routes = sorted(routes.items())
+        count("rows", len(routes))
+        if self.row_limit is not None and len(routes) > self.row_limit:
+            # Без сортировки всех пар: берем первые row_limit маршрутов как есть
+            sorted_routes = islice(routes.items(), self.row_limit)
+            self.limit_label.setText(f"Компактный режим: показаны {self.row_limit} из {len(routes)} маршрутов.")
+            self.limit_label.show()
+        else:
+            sorted_routes = sorted(routes.items())
+            self.limit_label.hide()
         for (from_id, to_id), path in sorted_routes:
             row_position = self.table.rowCount()
             self.table.insertRow(row_position)
@@ -61,6 +103,18 @@ class RoutesDialog(QWidget):
             self.table.setItem(row_position, 2, QTableWidgetItem(str(hop_count)))
             self.table.setItem(row_position, 3, QTableWidgetItem(path_str))
 
+    def set_routes(self, nodes, routes):
+        """Перезаполняет таблицу новыми маршрутами (после изменения топологии)."""
+        self.table.blockSignals(True)
+        self.table.setRowCount(0)
+        self.full_paths = []
+        self.populate_table(nodes, routes)
+        self.table.blockSignals(False)
+        self.current_pair = None
+        self.alternative_paths = []
+        self.alternatives_table.setRowCount(0)
+        self.filter_routes()
+
     def on_selection_changed(self):
         # ... (этот метод остается БЕЗ ИЗМЕНЕНИЙ) ...
         selected_rows = self.table.selectionModel().selectedRows()
@@ -68,6 +122,33 @@ class RoutesDialog(QWidget):
         selected_row_index = selected_rows[0].row()
         selected_path = self.full_paths[selected_row_index]
         self.routeSelected.emit(selected_path)
+        self.current_pair = (selected_path[0], selected_path[-1])
+        self.request_alternatives()
+
+    def request_alternatives(self):
+        if self.current_pair is not None:
+            self.alternativesRequested.emit(self.current_pair[0], self.current_pair[1], self.k_spin.value())
+
+    def set_alternatives(self, nodes, paths, lengths):
+        """Заполняет таблицу альтернатив: paths - список KPath, lengths - длина каждого пути."""
+        self.alternatives_table.blockSignals(True)
+        self.alternatives_table.setRowCount(0)
+        self.alternative_paths = [p.nodes for p in paths]
+        for number, (path, length) in enumerate(zip(paths, lengths), start=1):
+            row = self.alternatives_table.rowCount()
+            self.alternatives_table.insertRow(row)
+            path_str = " -> ".join(nodes[node_id].name for node_id in path.nodes)
+            self.alternatives_table.setItem(row, 0, QTableWidgetItem(str(number)))
+            self.alternatives_table.setItem(row, 1, QTableWidgetItem(str(len(path.edges))))
+            self.alternatives_table.setItem(row, 2, QTableWidgetItem(f"{length:.2f}"))
+            self.alternatives_table.setItem(row, 3, QTableWidgetItem(str(path.shared_with_primary)))
+            self.alternatives_table.setItem(row, 4, QTableWidgetItem(path_str))
+        self.alternatives_table.blockSignals(False)
+
+    def on_alternative_selected(self):
+        selected_rows = self.alternatives_table.selectionModel().selectedRows()
+        if not selected_rows: return
+        self.routeSelected.emit(self.alternative_paths[selected_rows[0].row()])
 
     # --- НОВЫЙ МЕТОД ДЛЯ ФИЛЬТРАЦИИ ---
     def filter_routes(self):
@@ -0,0 +1,186 @@
+# simulation_dialog.py
+
+import csv
+
+import numpy as np
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFormLayout,
+                             QTableWidgetItem, QLabel, QComboBox, QDoubleSpinBox, QSpinBox, QCheckBox,
+                             QTabWidget, QAbstractItemView, QFileDialog, QMessageBox)
+
+from packet_simulator import ARRIVAL_PROCESSES, EXPONENTIAL_SIZE, CONSTANT_SIZE
+
+# Столько переходов пакетов моделируется уже несколько минут - предупреждаем до запуска
+HOPS_WARNING = 50_000_000
+HEADERS = ["Пакетов", "Среднее (мс)", "p50 (мс)", "p95 (мс)", "p99 (мс)", "Макс. (мс)",
+           "M/M/1 (мс)", "Отклонение от M/M/1 (%)"]
+
+
+def _number_text(value) -> str:
+    if value is None or np.isnan(value):
+        return "-"
+    return f"{value:.4f}" if value != float('inf') else "∞ (Перегрузка)"
+
+
+def _thousands(value) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def _deviation(mean, analytic):
+    if np.isnan(mean) or not np.isfinite(analytic) or analytic <= 0:
+        return None
+    return (mean / analytic - 1) * 100
+
+
+class SimulationDialog(QDialog):
+    """Параметры имитационного моделирования и распределения задержек по каналам и требованиям."""
+    # Запрос моделирования: (процесс, горизонт с, доля разогрева, размер пакета, независимые размеры, seed)
+    simulationRequested = pyqtSignal(str, float, float, str, bool, int)
+
+    def __init__(self, link_names, demand_names, estimate_hops, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Имитационное моделирование пакетов")
+        self.setMinimumSize(1000, 600)
+        self.link_names = link_names
+        self.demand_names = demand_names
+        self.estimate_hops = estimate_hops   # горизонт, с -> ожидаемое число переходов пакетов
+        self.report = None
+
+        self.process_combo = QComboBox()
+        for process, title in ARRIVAL_PROCESSES.items():
+            self.process_combo.addItem(title, process)
+        self.horizon_spin = QDoubleSpinBox()
+        self.horizon_spin.setRange(0.001, 3600.0)
+        self.horizon_spin.setDecimals(3)
+        self.horizon_spin.setValue(1.0)
+        self.horizon_spin.setSuffix(" с")
+        self.warmup_spin = QSpinBox()
+        self.warmup_spin.setRange(0, 90)
+        self.warmup_spin.setValue(10)
+        self.warmup_spin.setSuffix(" %")
+        self.size_combo = QComboBox()
+        self.size_combo.addItem("Экспоненциальный (как в M/M/1)", EXPONENTIAL_SIZE)
+        self.size_combo.addItem("Постоянный", CONSTANT_SIZE)
+        self.independent_check = QCheckBox("Размер пакета заново на каждом канале (допущение Клейнрока)")
+        self.independent_check.setChecked(True)
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setRange(0, 2 ** 31 - 1)
+        self.estimate_label = QLabel()
+        self.horizon_spin.valueChanged.connect(self.update_estimate)
+        self.update_estimate()
+
+        form = QFormLayout()
+        form.addRow(QLabel("Поступление пакетов:"), self.process_combo)
+        form.addRow(QLabel("Моделируемое время:"), self.horizon_spin)
+        form.addRow(QLabel("Разогрев (не в статистике):"), self.warmup_spin)
+        form.addRow(QLabel("Размер пакета:"), self.size_combo)
+        form.addRow(self.independent_check)
+        form.addRow(QLabel("Начальное значение генератора:"), self.seed_spin)
+        form.addRow(QLabel("Оценка объема:"), self.estimate_label)
+
+        self.summary_label = QLabel()
+        self.links_table = self._make_table(["Канал"] + HEADERS + ["Загрузка (%)"])
+        self.demands_table = self._make_table(["Требование"] + HEADERS)
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.links_table, "Каналы")
+        self.tabs.addTab(self.demands_table, "Требования")
+
+        run_button = QPushButton("Смоделировать")
+        run_button.clicked.connect(self.request_simulation)
+        export_button = QPushButton("Экспорт в CSV...")
+        export_button.clicked.connect(self.export_csv)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(run_button)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(export_button)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addLayout(buttons_layout)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.tabs)
+
+    @staticmethod
+    def _make_table(headers):
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        return table
+
+    def update_estimate(self):
+        hops = self.estimate_hops(self.horizon_spin.value())
+        self.estimate_label.setText(f"≈ {_thousands(hops)} переходов пакетов по каналам")
+
+    def request_simulation(self):
+        hops = self.estimate_hops(self.horizon_spin.value())
+        if hops > HOPS_WARNING:
+            reply = QMessageBox.question(
+                self, "Имитационное моделирование",
+                f"Будет смоделировано около {_thousands(hops)} переходов пакетов - это может занять "
+                f"несколько минут. Продолжить?")
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        self.simulationRequested.emit(self.process_combo.currentData(), self.horizon_spin.value(),
+                                      self.warmup_spin.value() / 100, self.size_combo.currentData(),
+                                      self.independent_check.isChecked(), self.seed_spin.value())
+
+    # --- Результаты ---
+
+    def _link_rows(self):
+        stats = self.report.links
+        for i, name in enumerate(self.link_names):
+            yield [name] + self._stats_values(stats, i) + [float(self.report.measured_utilization[i]) * 100]
+
+    def _demand_rows(self):
+        stats = self.report.demands
+        for i, name in enumerate(self.demand_names):
+            yield [name] + self._stats_values(stats, i)
+
+    @staticmethod
+    def _stats_values(stats, i):
+        mean, analytic = float(stats.mean[i]), float(stats.analytic[i])
+        return [int(stats.packets[i]), mean, float(stats.p50[i]), float(stats.p95[i]), float(stats.p99[i]),
+                float(stats.max[i]), analytic, _deviation(mean, analytic)]
+
+    def set_report(self, report):
+        self.report = report
+        process = ARRIVAL_PROCESSES.get(report.process, report.process)
+        self.summary_label.setText(
+            f"<b>Поступление:</b> {process}. <b>Пакетов:</b> {_thousands(report.packets)}, "
+            f"<b>событий:</b> {_thousands(report.events)} за {report.elapsed_s:.2f} с "
+            f"({_thousands(report.events_per_second)} событий/с). "
+            f"<b>Разогрев:</b> {report.warmup_s:g} из {report.horizon_s:g} с.<br>"
+            f"<i>M/M/1 - аналитическая задержка при тех же потоках; у требований - сумма по маршруту.</i>")
+        self._fill(self.links_table, self._link_rows())
+        self._fill(self.demands_table, self._demand_rows())
+
+    @staticmethod
+    def _fill(table, rows):
+        rows = list(rows)
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            texts = [str(values[0]), str(values[1])] + [_number_text(value) for value in values[2:]]
+            for column, text in enumerate(texts):
+                table.setItem(row, column, QTableWidgetItem(text))
+
+    def export_csv(self):
+        if self.report is None:
+            QMessageBox.warning(self, "Экспорт", "Сначала выполните моделирование.")
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "Экспорт результатов моделирования", "", "CSV Files (*.csv)")
+        if not file_name: return
+        try:
+            # utf-8-sig и ';' - чтобы Excel сразу открыл файл с кириллицей по столбцам
+            with open(file_name, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(["Тип", "Элемент"] + HEADERS + ["Загрузка (%)"])
+                for kind, rows in (("Канал", self._link_rows()), ("Требование", self._demand_rows())):
+                    for values in rows:
+                        writer.writerow([kind] + ["" if v is None or (isinstance(v, float) and np.isnan(v)) else v
+                                                  for v in values])
+            QMessageBox.information(self, "Экспорт", "Результаты сохранены.")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка экспорта", f"Произошла ошибка:\n{e}")
@@ -4,60 +4,80 @@ from typing import List, Dict, Tuple
 from collections import defaultdict
 # Предполагаем, что data_models.py лежит рядом
 from data_models import Edge, TrafficDemand
+from instrumentation import timed, count
 
 
+def edge_key(u: int, v: int) -> Tuple[int, int]:
+    """Ключ неориентированного ребра: пара концов в порядке возрастания."""
+    return (u, v) if u <= v else (v, u)
 
 
+def build_edge_index(edges: List[Edge]) -> Dict[Tuple[int, int], Edge]:
+    """Словарь для поиска ребра по паре узлов за O(1) вместо перебора всего списка."""
+    return {edge_key(edge.from_id, edge.to_id): edge for edge in edges}
 
 
-def calculate_flows_and_capacity(
+def path_edges(edge_index: Dict[Tuple[int, int], Edge], path: List[int]) -> List[Edge]:
+    """Рёбра, по которым проходит маршрут."""
+    return [edge_index[edge_key(path[i], path[i + 1])] for i in range(len(path) - 1)]
+
+
+@timed("accumulate_flows")
+def accumulate_flows(
         edges: List[Edge],
         routes: Dict[Tuple[int, int], List[int]],
-        demands: List[TrafficDemand]
-):
+        demands: List[TrafficDemand],
+        edge_index: Dict[Tuple[int, int], Edge] = None
+) -> List[TrafficDemand]:
     """
-    Python-версия логики Этапа 3.
-    1. Обнуляет старые потоки.
-    2. Рассчитывает суммарный поток (flow) на каждом ребре.
-    3. Подбирает подходящую пропускную способность (capacity).
+    Обнуляет потоки и прогоняет все требования по их маршрутам.
+    Возвращает требования, для которых маршрут не найден.
     """
-    # "Прайс-лист" тарифов, как у вас
-    available_capacities = [10, 25, 50, 100, 250, 500, 1000]
-
-    # Шаг 1: Обнуляем потоки на всех ребрах
+    if edge_index is None:
+        edge_index = build_edge_index(edges)
     for edge in edges:
         edge.flow = 0.0
-
-    # Шаг 2: Рассчитываем суммарные потоки
-    # Прогоняем трафик по маршрутам
+    unrouted = []
+    route_hops = 0
     for demand in demands:
         route_key = (demand.from_id, demand.to_id)
         if route_key in routes:
-            path = routes[route_key]
-            # Проходим по каждому сегменту пути
-            for i in range(len(path) - 1):
-                u, v = path[i], path[i + 1]
-
-                # Находим соответствующее ребро в нашем списке
-                # (неэффективно для больших графов, но просто для примера)
-                for edge in edges:
-                    if (edge.from_id == u and edge.to_id == v) or \
-                            (edge.from_id == v and edge.to_id == u):
-                        edge.flow += demand.volume
-                        break  # Нашли ребро, выходим из внутреннего цикла
-
-    # Шаг 3: Подбираем пропускную способность для каждого ребра
-    for edge in edges:
-        required_flow = edge.flow
+            route = routes[route_key]
+            route_hops += len(route) - 1
+            for edge in path_edges(edge_index, route):
+                edge.flow += demand.volume
+        else:
+            unrouted.append(demand)
+    count("demands", len(demands))
+    count("route_hops", route_hops)
+    return unrouted
 
-        # Ищем первый тариф, который больше или равен потоку
-        selected_capacity = next((c for c in available_capacities if c >= required_flow), 0)
 
-        if selected_capacity == 0 and required_flow > 0:
-            # Если поток больше максимального тарифа, берем максимальный
-            selected_capacity = available_capacities[-1]
-        elif required_flow == 0:
-            # Ставим минимальный тариф, если потока нет
-            selected_capacity = available_capacities[0]
+def select_capacity(required_flow: float, available_capacities: List[float]) -> float:
+    """Наименьший тариф не ниже потока (или максимальный); для ребра без потока - 0."""
+    if required_flow == 0:
+        return 0
+    return next((c for c in available_capacities if c >= required_flow), available_capacities[-1])
 
-        edge.capacity = selected_capacity
\ No newline at end of file
+
+def apply_demand_delta(
+        edge_index: Dict[Tuple[int, int], Edge],
+        routes: Dict[Tuple[int, int], List[int]],
+        from_id: int,
+        to_id: int,
+        delta: float
+) -> List[Edge]:
+    """
+    Добавляет (или вычитает) объем delta вдоль маршрута одной пары.
+    Возвращает рёбра, поток на которых изменился; остальные рёбра не трогаются.
+    """
+    route_key = (from_id, to_id)
+    if delta == 0 or route_key not in routes:
+        return []
+    touched = path_edges(edge_index, routes[route_key])
+    for edge in touched:
+        edge.flow += delta
+        # Гасим накопленную погрешность, чтобы "пустое" ребро снова стало нулевым
+        if abs(edge.flow) < 1e-9:
+            edge.flow = 0.0
+    return touched
@@ -0,0 +1,165 @@
+# sweep_dialog.py
+
+import csv
+import re
+
+import numpy as np
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFormLayout,
+                             QTableWidgetItem, QLabel, QLineEdit, QAbstractItemView, QFileDialog, QMessageBox)
+
+from instrumentation import timed, count
+
+# Больше сценариев за раз не принимаем - таблица Qt на таком числе строк уже тормозит
+MAX_POINTS = 100_000
+HEADERS = ["Пакет (байт)", "Высокая (%)", "Перегрузка (%)", "Макс. задержка (мс)", "Средняя задержка (мс)",
+           "Макс. по маршрутам (мс)", "Клейнрок (мс)", "Каналов с высокой нагрузкой", "Перегружено каналов"]
+
+
+def _delay_text(delay) -> str:
+    if delay is None:
+        return "-"
+    return f"{delay:.4f}" if delay != float('inf') else "∞ (Перегрузка)"
+
+
+def parse_packet_sizes(text: str) -> list:
+    """Размеры пакета через запятую; "64-1500:8" - диапазон с шагом (по умолчанию 1 байт)."""
+    sizes = []
+    for token in re.split(r"[,;\s]+", text.strip()):
+        if not token:
+            continue
+        match = re.fullmatch(r"(\d+)-(\d+)(?::(\d+))?", token)
+        if match:
+            first, last, step = int(match[1]), int(match[2]), int(match[3] or 1)
+            if step <= 0 or last < first:
+                raise ValueError(f"Неверный диапазон: {token}")
+            sizes.extend(range(first, last + 1, step))
+        else:
+            sizes.append(int(token))
+    if not sizes or min(sizes) < 64 or max(sizes) > 9000:
+        raise ValueError("Размеры пакета должны быть от 64 до 9000 байт.")
+    return sizes
+
+
+def parse_threshold_pairs(text: str) -> list:
+    """Пары порогов в процентах "высокая/перегрузка" через запятую, например "60/90, 70/95"."""
+    pairs = []
+    for token in re.split(r"[,;\s]+", text.strip()):
+        if not token:
+            continue
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)/(\d+(?:\.\d+)?)", token)
+        if not match:
+            raise ValueError(f"Неверная пара порогов: {token} (нужно, например, 60/90)")
+        pairs.append((float(match[1]) / 100, float(match[2]) / 100))
+    if not pairs:
+        raise ValueError("Задайте хотя бы одну пару порогов.")
+    return pairs
+
+
+class SweepDialog(QDialog):
+    """Сравнение сценариев размера пакета и порогов загрузки в одной таблице."""
+    # Запрос расчета: (размеры пакета в байтах, пары порогов в долях)
+    sweepRequested = pyqtSignal(list, list)
+
+    def __init__(self, packet_size_bytes, high_threshold, overload_threshold, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сравнение сценариев: размер пакета и пороги загрузки")
+        self.setMinimumSize(1000, 550)
+        self.result = None
+
+        sizes = sorted({64, 512, 1500, packet_size_bytes})
+        self.sizes_edit = QLineEdit(", ".join(str(size) for size in sizes))
+        self.sizes_edit.setToolTip("Через запятую; диапазон с шагом: 64-1500:64")
+        self.thresholds_edit = QLineEdit(f"{high_threshold * 100:g}/{overload_threshold * 100:g}")
+        self.thresholds_edit.setToolTip("Пары \"высокая/перегрузка\" в процентах через запятую")
+        form = QFormLayout()
+        form.addRow(QLabel("Размеры пакета (байт):"), self.sizes_edit)
+        form.addRow(QLabel("Пороги загрузки (%):"), self.thresholds_edit)
+
+        self.summary_label = QLabel()
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(HEADERS))
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+
+        run_button = QPushButton("Рассчитать")
+        run_button.clicked.connect(self.request_sweep)
+        export_button = QPushButton("Экспорт в CSV...")
+        export_button.clicked.connect(self.export_csv)
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(run_button)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(export_button)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addLayout(buttons_layout)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.table)
+
+    def request_sweep(self):
+        try:
+            sizes = parse_packet_sizes(self.sizes_edit.text())
+            pairs = parse_threshold_pairs(self.thresholds_edit.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Ошибка ввода", str(e))
+            return
+        if len(sizes) * len(pairs) > MAX_POINTS:
+            QMessageBox.warning(self, "Ошибка ввода", f"Слишком много сценариев (больше {MAX_POINTS}).")
+            return
+        self.sweepRequested.emit(sizes, pairs)
+
+    def _rows(self):
+        """Строки таблицы: (номер размера пакета, номер пары порогов) - сначала по размеру пакета."""
+        result = self.result
+        for p in range(len(result.packet_sizes)):
+            for t in range(len(result.high_thresholds)):
+                yield p, t
+
+    def _row_values(self, p, t):
+        result = self.result
+        return [int(result.packet_sizes[p]), result.high_thresholds[t] * 100, result.overload_thresholds[t] * 100,
+                float(result.max_delay[p]), float(result.avg_delay[p]),
+                float(result.route_max_delay[p]) if result.route_max_delay is not None else None,
+                float(result.kleinrock_delay[p]) if result.kleinrock_delay is not None else None,
+                int(result.high_load_edges[t]), int(result.overloaded_edges[t])]
+
+    def set_result(self, result):
+        self.result = result
+        worst = int(np.argmax(result.max_delay))
+        self.summary_label.setText(
+            f"<b>Сценариев:</b> {result.point_count}. "
+            f"<b>Наибольшая задержка:</b> {_delay_text(float(result.max_delay[worst]))} мс "
+            f"при пакете {int(result.packet_sizes[worst])} байт")
+        self.populate_table()
+
+    @timed("sweep_table_fill")
+    def populate_table(self):
+        count("rows", self.result.point_count)
+        self.table.setRowCount(self.result.point_count)
+        for row, (p, t) in enumerate(self._rows()):
+            values = self._row_values(p, t)
+            texts = [str(values[0]), f"{values[1]:g}", f"{values[2]:g}"]
+            texts += [_delay_text(value) for value in values[3:7]]
+            texts += [str(values[7]), str(values[8])]
+            for column, text in enumerate(texts):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def export_csv(self):
+        if self.result is None:
+            QMessageBox.warning(self, "Экспорт", "Сначала рассчитайте сценарии.")
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "Экспорт сценариев", "", "CSV Files (*.csv)")
+        if not file_name: return
+        try:
+            # utf-8-sig и ';' - чтобы Excel сразу открыл файл с кириллицей по столбцам
+            with open(file_name, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(HEADERS)
+                for p, t in self._rows():
+                    writer.writerow(["" if value is None else value for value in self._row_values(p, t)])
+            QMessageBox.information(self, "Экспорт", "Результаты сохранены.")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка экспорта", f"Произошла ошибка:\n{e}")
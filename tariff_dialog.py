@@ -0,0 +1,67 @@
+# tariff_dialog.py
+
+import os
+
+from PyQt6.QtWidgets import (QDialog, QTableWidget, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QTableWidgetItem, QLabel, QAbstractItemView)
+
+
+class TariffComparisonDialog(QDialog):
+    """Стоимость текущих потоков по каждому каталогу тарифов, от самого выгодного."""
+
+    def __init__(self, quotes, current_name, current_cost, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Сравнение тарифных каталогов")
+        self.setMinimumSize(900, 450)
+        self.quotes = quotes
+
+        summary_label = QLabel(f"<b>Текущий каталог:</b> {current_name}, стоимость каналов "
+                               f"{current_cost:.2f} у.е. <b>Каталогов:</b> {len(quotes)}<br>"
+                               f"<i>Потоки и маршруты не пересчитываются: каждому каналу подбирается "
+                               f"наименьший тариф каталога не ниже его потока.</i>")
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels([
+            "Каталог", "Файл", "Оборудование", "Аренда линий", "Итого (у.е.)", "Разница с текущим",
+            "Каналов сверх макс. тарифа"
+        ])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.populate_table(quotes, current_cost)
+
+        self.apply_button = QPushButton("Применить выбранный каталог")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.accept)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.reject)
+        self.table.itemSelectionChanged.connect(
+            lambda: self.apply_button.setEnabled(bool(self.table.selectionModel().selectedRows())))
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.apply_button)
+        buttons_layout.addWidget(close_button)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(summary_label)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons_layout)
+
+    def populate_table(self, quotes, current_cost):
+        self.table.setRowCount(len(quotes))
+        for row, quote in enumerate(quotes):
+            source = os.path.basename(quote.catalogue.source) if quote.catalogue.source else "-"
+            self.table.setItem(row, 0, QTableWidgetItem(quote.catalogue.name))
+            self.table.setItem(row, 1, QTableWidgetItem(source))
+            self.table.setItem(row, 2, QTableWidgetItem(f"{quote.capacity_cost:.2f}"))
+            self.table.setItem(row, 3, QTableWidgetItem(f"{quote.length_cost:.2f}"))
+            self.table.setItem(row, 4, QTableWidgetItem(f"{quote.total_cost:.2f}"))
+            self.table.setItem(row, 5, QTableWidgetItem(f"{quote.total_cost - current_cost:+.2f}"))
+            self.table.setItem(row, 6, QTableWidgetItem(str(quote.overloaded_edges)))
+
+    def selected_quote(self):
+        """Выбранная строка (после accept) или None."""
+        rows = self.table.selectionModel().selectedRows()
+        return self.quotes[rows[0].row()] if rows else None
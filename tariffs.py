@@ -0,0 +1,196 @@
+# tariffs.py
+
+import hashlib
+import json
+from dataclasses import dataclass, field, asdict
+from typing import List
+
+import numpy as np
+
+from instrumentation import timed, count
+
+# Сколько элементов промежуточного массива (каталоги x рёбра x ступени) обрабатываем за раз
+MAX_LOOKUP_CELLS = 4_000_000
+
+
+@dataclass
+class PriceBands:
+    """
+    Ступенчатая цена: значение в (0, bounds[0]] стоит prices[0], в (bounds[i-1], bounds[i]] -
+    prices[i], больше bounds[-1] - prices[-1]; нулевое (и отрицательное) значение стоит zero_price.
+    """
+    bounds: List[float]
+    prices: List[float]   # на одну больше, чем bounds
+    zero_price: float = 0.0
+
+    def __post_init__(self):
+        if len(self.prices) != len(self.bounds) + 1:
+            raise ValueError("Цен должно быть на одну больше, чем границ ступеней.")
+        if any(b2 <= b1 for b1, b2 in zip(self.bounds, self.bounds[1:])):
+            raise ValueError("Границы ступеней должны возрастать.")
+
+    def price(self, value: float) -> float:
+        if value <= 0:
+            return self.zero_price
+        return self.prices[next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))]
+
+
+@dataclass
+class TariffCatalogue:
+    """Тарифы одного поставщика: ряд пропускных способностей и цены каналов."""
+    name: str
+    capacities: List[float]          # возрастающий ряд, Мбит/с (0 - канал без потока)
+    capacity_prices: PriceBands      # оборудование, от пропускной способности
+    length_prices: PriceBands        # аренда линии, от длины
+    source: str = field(default="", compare=False)  # файл, из которого загружен каталог
+
+    def __post_init__(self):
+        if not self.capacities or any(c2 <= c1 for c1, c2 in zip(self.capacities, self.capacities[1:])):
+            raise ValueError(f"Каталог {self.name}: ряд пропускных способностей должен возрастать.")
+
+    def select_capacity(self, required_flow: float) -> float:
+        """Наименьший тариф не ниже потока (или максимальный); для ребра без потока - 0."""
+        if required_flow == 0:
+            return 0
+        return next((c for c in self.capacities if c >= required_flow), self.capacities[-1])
+
+    def capacity_cost(self, capacity: float) -> float:
+        return self.capacity_prices.price(capacity)
+
+    def length_cost(self, length: float) -> float:
+        return self.length_prices.price(length)
+
+    def fingerprint(self) -> str:
+        """Отпечаток ряда и цен - для ключей кэша, чьи результаты зависят от каталога."""
+        data = asdict(self)
+        del data["name"], data["source"]
+        return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+# Тарифы, с которыми программа работала до загружаемых каталогов
+DEFAULT_CATALOGUE = TariffCatalogue(
+    name="Встроенный",
+    capacities=[0, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024],
+    capacity_prices=PriceBands(bounds=[64, 128, 500], prices=[100.0, 250.0, 600.0, 1000.0], zero_price=10.0),
+    length_prices=PriceBands(bounds=[100, 300], prices=[50.0, 150.0, 400.0], zero_price=0.0),
+)
+
+
+# --- Загрузка и сохранение ---
+
+def catalogue_from_dict(data: dict, source: str = "") -> TariffCatalogue:
+    return TariffCatalogue(name=str(data["name"]), capacities=list(data["capacities"]),
+                           capacity_prices=PriceBands(**data["capacity_prices"]),
+                           length_prices=PriceBands(**data["length_prices"]), source=source)
+
+
+def load_catalogues(file_name: str) -> List[TariffCatalogue]:
+    """
+    Файл JSON с одним каталогом или списком каталогов:
+    {"name": ..., "capacities": [...],
+     "capacity_prices": {"bounds": [...], "prices": [...], "zero_price": ...},
+     "length_prices": {...}}
+    """
+    with open(file_name, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    items = data if isinstance(data, list) else [data]
+    try:
+        return [catalogue_from_dict(item, file_name) for item in items]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Неверный формат каталога в файле {file_name}: {e}") from e
+
+
+def catalogue_to_dict(catalogue: TariffCatalogue) -> dict:
+    """Каталог в формате файла каталогов (без пути к файлу) - так он хранится и в проекте."""
+    data = asdict(catalogue)
+    del data["source"]
+    return data
+
+
+def save_catalogues(file_name: str, catalogues: List[TariffCatalogue]):
+    items = [catalogue_to_dict(catalogue) for catalogue in catalogues]
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(items, f, ensure_ascii=False, indent=4)
+
+
+# --- Сравнение каталогов ---
+
+@dataclass
+class TariffQuote:
+    """Стоимость текущих потоков по одному каталогу."""
+    catalogue: TariffCatalogue
+    capacities: np.ndarray       # подобранная пропускная способность каждого ребра
+    capacity_cost: float         # оборудование
+    length_cost: float           # аренда линий
+    overloaded_edges: int        # рёбра, поток которых больше максимального тарифа каталога
+
+    @property
+    def total_cost(self) -> float:
+        return self.capacity_cost + self.length_cost
+
+
+def _padded(rows: List[List[float]], fill: float) -> np.ndarray:
+    """Ряды разной длины в одной матрице (каталоги x ступени), хвосты заполнены fill."""
+    width = max(len(row) for row in rows)
+    matrix = np.full((len(rows), width), fill, dtype=np.float64)
+    for k, row in enumerate(rows):
+        matrix[k, :len(row)] = row
+    return matrix
+
+
+def _steps_below(bounds: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Для каждого каталога k и ребра e - число границ bounds[k] строго меньше values[k, e]
+    (то же, что searchsorted(..., side='left') по каждому каталогу). Одно сравнение
+    с трансляцией на все каталоги сразу, по частям рёбер, чтобы ограничить память.
+    """
+    catalogues, edges = values.shape
+    chunk = max(1, MAX_LOOKUP_CELLS // max(1, catalogues * bounds.shape[1]))
+    steps = np.empty((catalogues, edges), dtype=np.int64)
+    for first in range(0, edges, chunk):
+        part = values[:, first:first + chunk]
+        steps[:, first:first + chunk] = (bounds[:, None, :] < part[:, :, None]).sum(axis=2)
+    return steps
+
+
+def _band_prices(bands: List[PriceBands], values: np.ndarray) -> np.ndarray:
+    """Цена каждого значения values[k, e] по ступеням каталога k."""
+    bounds = _padded([b.bounds for b in bands], np.inf)
+    prices = _padded([b.prices for b in bands], np.nan)
+    zero = np.array([b.zero_price for b in bands])
+    steps = _steps_below(bounds, values)
+    result = np.take_along_axis(prices, steps, axis=1)
+    return np.where(values > 0, result, zero[:, None])
+
+
+@timed("tariff_comparison")
+def compare_catalogues(flows, lengths, catalogues: List[TariffCatalogue]) -> List[TariffQuote]:
+    """
+    Переоценка текущих потоков по каждому каталогу без пересчета маршрутов и потоков:
+    подбор пропускной способности и обе цены - поиск ступени сразу для всех каталогов.
+    Сначала каталоги, способные пропустить все потоки, затем по возрастанию стоимости.
+    """
+    flows = np.asarray(flows, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    k, e = len(catalogues), len(flows)
+    if k == 0:
+        return []
+    ladders = _padded([c.capacities for c in catalogues], np.inf)
+    sizes = np.array([len(c.capacities) for c in catalogues])
+    flow_matrix = np.broadcast_to(flows, (k, e))
+    # Первая ступень не ниже потока; если такой нет - максимальная ступень каталога
+    steps = _steps_below(ladders, flow_matrix)
+    overloaded = steps >= sizes[:, None]
+    steps = np.minimum(steps, sizes[:, None] - 1)
+    capacities = np.where(flows > 0, np.take_along_axis(ladders, steps, axis=1), 0.0)
+
+    capacity_costs = _band_prices([c.capacity_prices for c in catalogues], capacities).sum(axis=1)
+    length_costs = _band_prices([c.length_prices for c in catalogues], np.broadcast_to(lengths, (k, e))).sum(axis=1)
+    count("catalogues", k)
+    count("edges", e)
+
+    quotes = [TariffQuote(catalogue=catalogue, capacities=capacities[i], capacity_cost=float(capacity_costs[i]),
+                          length_cost=float(length_costs[i]), overloaded_edges=int(overloaded[i].sum()))
+              for i, catalogue in enumerate(catalogues)]
+    quotes.sort(key=lambda q: (q.overloaded_edges > 0, q.total_cost))
+    return quotes
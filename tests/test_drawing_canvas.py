@@ -0,0 +1,55 @@
+# tests/test_drawing_canvas.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    """MainWindow без экрана с одним узлом в режиме перемещения; журнал изменений перехватывается."""
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    import disk_cache
+    import main_app
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(main_app, "UNTITLED_PROJECT", str(tmp_path / "untitled.json"))
+    for name in ("information", "warning", "question", "critical"):
+        monkeypatch.setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No))
+    w = main_app.MainWindow()
+    w.disk_cache = disk_cache.DiskCache(str(tmp_path / "cache"))
+    w.nodes[1] = Node(id=1, name="N1", position=(50, 50), cost=10.0)
+    w.versions.bump_all()
+    w.is_move_mode = True
+    w.changes = []
+    monkeypatch.setattr(w, "record_change", lambda op, **data: w.changes.append((op, data)))
+    yield w
+    w.journal_timer.stop()
+    w.close()
+    app.processEvents()
+
+
+def test_click_without_drag_is_not_journaled(window):
+    from PyQt6.QtCore import QPoint, Qt
+    from PyQt6.QtTest import QTest
+    import topology_versions as tv
+
+    canvas = window.drawingCanvas
+    before = window.versions.snapshot((tv.POSITIONS,))
+    QTest.mouseClick(canvas, Qt.MouseButton.LeftButton, pos=QPoint(50, 50))
+    assert window.changes == []
+    assert window.versions.snapshot((tv.POSITIONS,)) == before
+
+    # Настоящее перетаскивание по-прежнему попадает в журнал
+    QTest.mousePress(canvas, Qt.MouseButton.LeftButton, pos=QPoint(50, 50))
+    QTest.mouseMove(canvas, QPoint(80, 60))
+    QTest.mouseRelease(canvas, Qt.MouseButton.LeftButton, pos=QPoint(80, 60))
+    assert window.changes == [("move_node", {"id": 1, "position": (80, 60)})]
+    assert window.versions.snapshot((tv.POSITIONS,)) != before
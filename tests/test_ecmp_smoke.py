@@ -0,0 +1,69 @@
+# tests/test_ecmp_smoke.py
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node, Edge, TrafficDemand
+from ecmp_routing import ecmp_edge_flows, SPLIT_EVEN, SPLIT_BY_PATHS
+from network_arrays import TopologyArrays
+
+# Ромб 0 -> {1, 2} -> 3: два равноценных пути по два хопа
+DIAMOND_NODES = {i: Node(id=i, name=f"N{i}", position=pos, cost=10.0)
+                 for i, pos in enumerate([(0, 100), (100, 0), (100, 200), (200, 100)])}
+DIAMOND_EDGES = [(0, 1), (0, 2), (1, 3), (2, 3)]
+
+
+def diamond_edges():
+    return [Edge(from_id=a, to_id=b, length=100.0) for a, b in DIAMOND_EDGES]
+
+
+@pytest.mark.parametrize("split", [SPLIT_EVEN, SPLIT_BY_PATHS])
+def test_ecmp_edge_flows_split_diamond(split):
+    topology = TopologyArrays.from_model(DIAMOND_NODES, diamond_edges())
+    flows, unrouted = ecmp_edge_flows(topology, [TrafficDemand(0, 3, 10.0)], split)
+    assert unrouted == []
+    assert np.allclose(flows, [5.0, 5.0, 5.0, 5.0])
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    """MainWindow без экрана; кэш и автосохранение - во временном каталоге."""
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    import disk_cache
+    import main_app
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(main_app, "UNTITLED_PROJECT", str(tmp_path / "untitled.json"))
+    for name in ("information", "warning", "question", "critical"):
+        monkeypatch.setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No))
+    w = main_app.MainWindow()
+    w.disk_cache = disk_cache.DiskCache(str(tmp_path / "cache"))
+    w.nodes.update({i: Node(**vars(node)) for i, node in DIAMOND_NODES.items()})
+    w.edges.extend(diamond_edges())
+    w.versions.bump_all()
+    yield w
+    w.journal_timer.stop()
+    w.close()
+    app.processEvents()
+
+
+def test_stage3_ecmp_diamond(window):
+    """Этап 3 в режиме ECMP: поток пары делится поровну между двумя путями ромба."""
+    window.set_routing_mode(next(a for a in window.routingModeGroup.actions() if a.data() == SPLIT_EVEN))
+    window.calculate_flows_for_demands([TrafficDemand(0, 3, 10.0)])
+    assert [edge.flow for edge in window.edges] == pytest.approx([5.0, 5.0, 5.0, 5.0])
+    assert all(edge.capacity >= edge.flow for edge in window.edges)
+
+    # Изменение требования раскладывается по тем же путям
+    window.apply_demand_change(0, 3, 4.0)
+    assert [edge.flow for edge in window.edges] == pytest.approx([2.0, 2.0, 2.0, 2.0])
+
+    # Анализ по маршрутам требований с потоками ECMP не запускается
+    assert window.get_analysis_arrays() is None
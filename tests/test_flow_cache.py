@@ -0,0 +1,87 @@
+# tests/test_flow_cache.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node, TrafficDemand
+
+# После добавления канала 0-1 у пары 1->4 два пути по два хопа: инкрементальное
+# обновление оставляет 1-2-4, а Дейкстра на новой топологии выбирает 1-0-4
+NODES = {i: Node(id=i, name=f"N{i}", position=pos, cost=10.0)
+         for i, pos in enumerate([(0, 0), (100, 0), (100, 100), (0, 200), (200, 200)])}
+EDGES = [(2, 4), (0, 4), (0, 2), (1, 2), (2, 3)]
+NEW_EDGE = (0, 1)
+DEMANDS = [TrafficDemand(1, 4, 10.0)]
+
+
+@pytest.fixture
+def make_window(tmp_path, monkeypatch):
+    """Фабрика MainWindow без экрана с общим кэшем на диске во временном каталоге."""
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    from PyQt6.QtWidgets import QApplication, QMessageBox
+    import disk_cache
+    import main_app
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(main_app, "UNTITLED_PROJECT", str(tmp_path / "untitled.json"))
+    for name in ("information", "warning", "question", "critical"):
+        monkeypatch.setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No))
+    windows = []
+
+    def make(edges, compact_memory=False):
+        w = main_app.MainWindow()
+        w.disk_cache = disk_cache.DiskCache(str(tmp_path / "cache"))
+        w.compact_memory = compact_memory
+        w.nodes.update({i: Node(**vars(node)) for i, node in NODES.items()})
+        w.versions.bump_all()
+        for a, b in edges:
+            w.create_edge(a, b)
+        windows.append(w)
+        return w
+
+    yield make
+    for w in windows:
+        w.journal_timer.stop()
+        w.close()
+    app.processEvents()
+
+
+def edge_flows(window):
+    return {(e.from_id, e.to_id): e.flow for e in window.edges}
+
+
+def test_incremental_routes_do_not_share_disk_flows(make_window):
+    """Потоки по инкрементально обновленным маршрутам не попадают в кэш под ключом топологии."""
+    first = make_window(EDGES)
+    first.get_routes()
+    first.create_edge(*NEW_EDGE)
+    first.calculate_flows_for_demands(list(DEMANDS))
+    assert first.routes[(1, 4)] == [1, 2, 4]
+    assert edge_flows(first)[(1, 2)] == pytest.approx(10.0)
+
+    # Новый сеанс с той же топологией считает маршруты Дейкстрой и должен получить потоки по ним
+    second = make_window(EDGES + [NEW_EDGE])
+    second.calculate_flows_for_demands(list(DEMANDS))
+    assert second.routes[(1, 4)] == [1, 0, 4]
+    flows = edge_flows(second)
+    assert flows[(0, 1)] == pytest.approx(10.0)
+    assert flows[(0, 4)] == pytest.approx(10.0)
+    assert flows[(1, 2)] == 0
+
+
+def test_compact_routes_do_not_share_disk_flows(make_window):
+    """Деревья обхода компактного режима разрешают равенство хопов иначе, чем Дейкстра."""
+    compact = make_window(EDGES + [NEW_EDGE], compact_memory=True)
+    compact.calculate_flows_for_demands(list(DEMANDS))
+    assert compact.routes[(1, 4)] == [1, 2, 4]
+
+    second = make_window(EDGES + [NEW_EDGE])
+    second.calculate_flows_for_demands(list(DEMANDS))
+    assert second.routes[(1, 4)] == [1, 0, 4]
+    assert edge_flows(second)[(0, 1)] == pytest.approx(10.0)
+    assert edge_flows(second)[(1, 2)] == 0
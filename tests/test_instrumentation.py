@@ -0,0 +1,59 @@
+# tests/test_instrumentation.py
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node, Edge, TrafficDemand
+from demand_delays import demand_delays
+from dynamic_routes import DynamicHopRoutes
+from ecmp_routing import ecmp_edge_flows, SPLIT_EVEN
+from flow_deviation import flow_deviation
+from graph_algorithms import dijkstra_all_pairs_hops
+from instrumentation import instrument, span
+from network_arrays import TopologyArrays
+from stage3_logic import accumulate_flows
+
+# Ромб 0 -> {1, 2} -> 3 с обратным требованием
+NODES = {i: Node(id=i, name=f"N{i}", position=pos, cost=10.0)
+         for i, pos in enumerate([(0, 100), (100, 0), (100, 200), (200, 100)])}
+DEMANDS = [TrafficDemand(0, 3, 10.0), TrafficDemand(3, 0, 4.0), TrafficDemand(1, 2, 2.0)]
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "profiled"])
+def instrumented(request):
+    """Замеры с профилировщиком и tracemalloc и без них."""
+    instrument.clear()
+    instrument.profile_enabled = instrument.memory_enabled = request.param
+    yield instrument
+    instrument.profile_enabled = instrument.memory_enabled = False
+    instrument.clear()
+
+
+def test_decorated_functions_inside_span(instrumented):
+    """Размеченные функции расчетов работают внутри замера и добавляют в него свои шаги и счетчики."""
+    edges = [Edge(from_id=a, to_id=b, length=100.0, capacity=64) for a, b in [(0, 1), (0, 2), (1, 3), (2, 3)]]
+    with span("stage"):
+        routes = dijkstra_all_pairs_hops(NODES, edges)
+        assert accumulate_flows(edges, routes, DEMANDS) == []
+        topology = TopologyArrays.from_model(NODES, edges)
+        report = demand_delays(topology, DynamicHopRoutes.from_routes(NODES, edges, routes), DEMANDS, 12000)
+        flows, unrouted = ecmp_edge_flows(topology, DEMANDS, SPLIT_EVEN)
+        result = flow_deviation(topology, DEMANDS, topology.flow, 12000)
+
+    assert unrouted == []
+    assert np.all(np.isfinite(report.delays))
+    assert flows.sum() == pytest.approx(sum(e.flow for e in edges))
+    assert result.flow.sum() > 0
+
+    record = instrumented.last()
+    assert record.name == "stage"
+    children = {child.name: child for child in record.children}
+    for name in ("dijkstra_all_pairs_hops", "accumulate_flows", "demand_delays", "ecmp_edge_flows",
+                 "flow_deviation"):
+        assert name in children
+    assert children["accumulate_flows"].counters["demands"] == len(DEMANDS)
@@ -0,0 +1,28 @@
+# tests/test_reliability.py
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node, Edge, TrafficDemand
+from network_arrays import TopologyArrays
+from reliability import estimate_reliability
+
+# Кольцо из шести узлов с одной хордой
+NODES = {i: Node(id=i, name=f"N{i}", position=(100 * i, 0), cost=10.0) for i in range(6)}
+EDGES = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 0), (0, 3)]
+DEMANDS = [TrafficDemand(0, 3, 10.0), TrafficDemand(1, 4, 5.0), TrafficDemand(2, 5, 1.0)]
+
+
+@pytest.mark.parametrize("workers", [2, 3, 5])
+def test_early_stop_does_not_depend_on_workers(workers):
+    """При заданном seed досрочная остановка и итог одинаковы при любом числе процессов."""
+    topology = TopologyArrays.from_model(NODES, [Edge(from_id=a, to_id=b, length=100.0) for a, b in EDGES])
+    options = dict(max_samples=40_000, min_samples=1_000, tolerance=0.01, block_samples=1_000, seed=7)
+    single = estimate_reliability(topology, DEMANDS, 0.99, 0.98, workers=1, **options)
+    parallel = estimate_reliability(topology, DEMANDS, 0.99, 0.98, workers=workers, **options)
+    assert single.stopped_early
+    assert parallel == single
@@ -0,0 +1,76 @@
+# tests/test_traffic_profile.py
+
+import os
+import sys
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Node
+
+# Цепочка 0 - 1 - 2; в часе наибольшей нагрузки канал 0-1 свободен,
+# а наибольший поток за сутки у него в другом срезе
+NODES = {i: Node(id=i, name=f"N{i}", position=(100 * i, 0), cost=10.0) for i in range(3)}
+EDGES = [(0, 1), (1, 2)]
+SLICES = {"18-00": [[0, 0, 0], [0, 0, 100], [0, 0, 0]],
+          "03-00": [[0, 60, 0], [0, 0, 0], [0, 0, 0]]}
+
+
+@pytest.fixture
+def window(tmp_path, monkeypatch):
+    """MainWindow без экрана; кэш и автосохранение - во временном каталоге."""
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    monkeypatch.setenv("HOME", str(tmp_path))
+    from PyQt6.QtWidgets import QApplication, QFileDialog, QMessageBox
+    import disk_cache
+    import main_app
+
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for name, matrix in SLICES.items():
+        sheet = workbook.create_sheet(name)
+        for row in matrix:
+            sheet.append(row)
+    profile_file = str(tmp_path / "profile.xlsx")
+    workbook.save(profile_file)
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(main_app, "UNTITLED_PROJECT", str(tmp_path / "untitled.json"))
+    monkeypatch.setattr(QFileDialog, "getOpenFileName", staticmethod(lambda *args, **kwargs: (profile_file, "")))
+    for name in ("information", "warning", "question", "critical"):
+        monkeypatch.setattr(QMessageBox, name, staticmethod(lambda *args, **kwargs: QMessageBox.StandardButton.No))
+    w = main_app.MainWindow()
+    w.disk_cache = disk_cache.DiskCache(str(tmp_path / "cache"))
+    w.nodes.update({i: Node(**vars(node)) for i, node in NODES.items()})
+    w.versions.bump_all()
+    for a, b in EDGES:
+        w.create_edge(a, b)
+    w.get_routes()
+    yield w
+    w.journal_timer.stop()
+    w.close()
+    app.processEvents()
+
+
+def test_demand_change_keeps_profile_peak_capacity(window):
+    """Изменение требования в часе наибольшей нагрузки не снижает тариф ниже потока других срезов."""
+    window.load_traffic_profile_and_calculate_flows()
+    first, second = window.edges
+    assert first.flow == 0 and first.capacity == 64
+    assert second.flow == 100 and second.capacity == 128
+
+    window.apply_demand_change(0, 1, 5.0)
+    assert first.flow == pytest.approx(5.0)
+    assert first.capacity == 64
+
+    # Поток часа наибольшей нагрузки выше суточного максимума - тариф растет вместе с ним
+    window.apply_demand_change(0, 1, 70.0)
+    assert first.capacity == 128
+    window.apply_demand_change(0, 1, 0.0)
+    assert first.flow == 0 and first.capacity == 64
+
+    # Профиль остается актуальным: срезы по-прежнему показываются на холсте
+    window.show_traffic_slice(1)
+    assert "устарел" not in window.sliceLabel.text()
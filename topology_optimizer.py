@@ -0,0 +1,464 @@
+# topology_optimizer.py
+
+import copy
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from data_models import Node, Edge, TrafficDemand
+from dynamic_routes import DynamicHopRoutes, UNREACHABLE
+from stage3_logic import select_capacity
+
+# Сколько кандидатов каждого вида пробуем за одну итерацию
+CANDIDATES_PER_ITERATION = 1
+
+
+@dataclass
+class TopologyOptimizationResult:
+    """Итог оптимизации топологии методом насыщенных разрезов."""
+    edges: List[Edge]                 # новые рёбра с потоками, тарифами и стоимостью
+    route_trees: DynamicHopRoutes     # маршруты новой топологии
+    iterations: int
+    added: int                        # принятых добавлений каналов
+    removed: int                      # принятых удалений каналов
+    initial_cost: float
+    final_cost: float
+    initial_max_delay: float
+    final_max_delay: float
+    overloaded_edges: int
+
+
+def _edge_delay(flow: float, capacity: float, avg_packet_size_bits: int) -> float:
+    """Задержка M/M/1 одного канала - так же, как в calculate_edge_delays."""
+    if capacity <= 0 or flow <= 0 or flow >= capacity:
+        return float('inf') if flow >= capacity else 0.0
+    flow_pps = (flow * 1_000_000) / avg_packet_size_bits
+    capacity_pps = (capacity * 1_000_000) / avg_packet_size_bits
+    if capacity_pps <= flow_pps:
+        return float('inf')  # Поток меньше тарифа лишь на ошибку округления
+    return (1 / (capacity_pps - flow_pps)) * 1000
+
+
+class CutSaturationOptimizer:
+    """
+    Оптимизация топологии в духе метода насыщенных разрезов: находим разрез из
+    самых загруженных каналов, добавляем самый дешевый канал через него, удаляем
+    недогруженные дорогие каналы и повторяем, пока ход улучшает оценку проекта.
+    Маршруты, потоки, тарифы и задержки после каждого хода обновляются только
+    для затронутых пар узлов и рёбер.
+    """
+
+    def __init__(self, nodes: Dict[int, Node], edges: List[Edge], demands: List[TrafficDemand],
+                 route_trees: DynamicHopRoutes, available_capacities: List[float],
+                 length_cost: Callable[[float], float], capacity_cost: Callable[[float], float],
+                 avg_packet_size_bits: int, saturation_threshold: float, underuse_threshold: float = 0.3):
+        if route_trees.ids != list(nodes.keys()):
+            route_trees = DynamicHopRoutes.from_graph(nodes, edges)
+        else:
+            route_trees = copy.deepcopy(route_trees)  # Работаем с копией, проект не трогаем
+        self.tree = route_trees
+        self.node_ids = list(nodes.keys())
+        self.index = route_trees.index
+        self.available_capacities = available_capacities
+        self.length_cost = length_cost
+        self.capacity_cost = capacity_cost
+        self.avg_packet_size_bits = avg_packet_size_bits if avg_packet_size_bits > 0 else 12000
+        self.saturation_threshold = saturation_threshold
+        self.underuse_threshold = underuse_threshold
+
+        n = len(self.node_ids)
+        self.positions = np.array([nodes[node_id].position for node_id in self.node_ids], dtype=np.float64)
+        self.volume = np.zeros((n, n))
+        for demand in demands:
+            if demand.from_id in self.index and demand.to_id in self.index:
+                self.volume[self.index[demand.from_id], self.index[demand.to_id]] += demand.volume
+        self.has_demand = self.volume > 0
+        self.demand_sources, self.demand_targets = np.nonzero(self.has_demand)
+
+        # Рёбра хранятся в "ячейках"; ячейки удаленных рёбер переиспользуются
+        self.edge_id = np.full((n, n), -1, dtype=np.int32)
+        self.slot_u: List[int] = []
+        self.slot_v: List[int] = []
+        self.slot_edge: List[Edge | None] = []
+        self.flow = np.zeros(0)
+        self.capacity = np.zeros(0)
+        self.delay = np.zeros(0)
+        self.cost = np.zeros(0)
+        self.length = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)
+        self.is_overloaded = np.zeros(0, dtype=bool)
+        self.free_slots: List[int] = []
+        self.total_cost = 0.0
+        self.overloaded = 0
+        self.edge_order = {id(edge): i for i, edge in enumerate(edges)}
+        for edge in edges:
+            slot = self._new_slot(self.index[edge.from_id], self.index[edge.to_id], edge.length, edge)
+            # Потоки берем из Этапа 3 - они посчитаны по этим же маршрутам. Тариф и стоимость -
+            # как в проекте (заданные вручную или прошлой оптимизацией); заново тариф
+            # подбирается только рёбрам, поток которых изменит ход оптимизатора
+            self.flow[slot], self.capacity[slot], self.cost[slot] = edge.flow, edge.capacity, edge.cost
+            self.total_cost += edge.cost
+            self._update_delay(slot)
+
+        self.added = 0
+        self.removed = 0
+        self.rejected_additions = set()
+        self.rejected_removals = set()
+
+    # --- Ячейки рёбер ---
+
+    def _new_slot(self, a: int, b: int, length: float, edge: Edge | None = None) -> int:
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.slot_u[slot], self.slot_v[slot], self.slot_edge[slot] = a, b, edge
+        else:
+            slot = len(self.slot_u)
+            self.slot_u.append(a)
+            self.slot_v.append(b)
+            self.slot_edge.append(edge)
+            if slot >= len(self.flow):
+                grow = max(16, len(self.flow))
+                self.flow = np.concatenate([self.flow, np.zeros(grow)])
+                self.capacity = np.concatenate([self.capacity, np.zeros(grow)])
+                self.delay = np.concatenate([self.delay, np.zeros(grow)])
+                self.cost = np.concatenate([self.cost, np.zeros(grow)])
+                self.length = np.concatenate([self.length, np.zeros(grow)])
+                self.active = np.concatenate([self.active, np.zeros(grow, dtype=bool)])
+                self.is_overloaded = np.concatenate([self.is_overloaded, np.zeros(grow, dtype=bool)])
+        self.edge_id[a, b] = self.edge_id[b, a] = slot
+        self.flow[slot] = self.capacity[slot] = self.delay[slot] = self.cost[slot] = 0.0
+        self.length[slot] = length
+        self.active[slot] = True
+        self.is_overloaded[slot] = False
+        return slot
+
+    def _refresh(self, slot: int):
+        """Пересчитывает тариф, стоимость и задержку ребра после изменения потока."""
+        if abs(self.flow[slot]) < 1e-9:
+            self.flow[slot] = 0.0  # Остаток погрешности после вычитания всех объемов
+        self.total_cost -= self.cost[slot]
+        capacity = select_capacity(self.flow[slot], self.available_capacities)
+        self.capacity[slot] = capacity
+        self.cost[slot] = self.length_cost(self.length[slot]) + self.capacity_cost(capacity)
+        self.total_cost += self.cost[slot]
+        self._update_delay(slot)
+
+    def _update_delay(self, slot: int):
+        self.delay[slot] = _edge_delay(self.flow[slot], self.capacity[slot], self.avg_packet_size_bits)
+        overloaded = bool(self.flow[slot] > 0 and self.delay[slot] == float('inf'))
+        self.overloaded += int(overloaded) - int(self.is_overloaded[slot])
+        self.is_overloaded[slot] = overloaded
+
+    # --- Инкрементальные маршруты и потоки ---
+
+    def _walk(self, parents: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+              volumes: np.ndarray) -> np.ndarray:
+        """
+        Добавляет volumes к потокам рёбер путей sources[i] -> targets[i], поднимаясь
+        по строкам предков parents[i] сразу для всех пар. Возвращает затронутые рёбра.
+        """
+        current = targets.copy()
+        touched = []
+        active = np.arange(len(targets))
+        while active.size:
+            previous = parents[active, current[active]]
+            active = active[previous >= 0]
+            previous = previous[previous >= 0]
+            slots = self.edge_id[previous, current[active]]
+            self.flow += np.bincount(slots, weights=volumes[active], minlength=len(self.flow))
+            touched.append(slots)
+            current[active] = previous
+            active = active[previous != sources[active]]
+        return np.concatenate(touched) if touched else np.empty(0, dtype=np.int32)
+
+    def _update_routes(self, a: int, b: int, insert: bool):
+        """
+        Добавляет или удаляет ребро в таблице маршрутов и переносит потоки изменившихся пар.
+        Возвращает прежние строки затронутых деревьев - для отката хода.
+        """
+        dist, parent = self.tree.dist, self.tree.parent
+        # Деревья, которые изменятся - те же условия, что в insert_edge / delete_edge
+        if insert:
+            sources = np.nonzero(np.abs(dist[:, a].astype(np.int64) - dist[:, b]) > 1)[0]
+        else:
+            sources = np.nonzero((parent[:, b] == a) | (parent[:, a] == b))[0]
+        old_parent, old_dist = parent[sources].copy(), dist[sources].copy()
+        row_of = {int(s): i for i, s in enumerate(sources)}
+
+        a_id, b_id = self.node_ids[a], self.node_ids[b]
+        changed = self.tree.insert_edge(a_id, b_id) if insert else self.tree.delete_edge(a_id, b_id)
+        index = self.index
+        pairs = np.array([(index[from_id], index[to_id]) for from_id, to_id in set(changed)],
+                         dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[self.has_demand[pairs[:, 0], pairs[:, 1]]]
+        if len(pairs):
+            sources_of_pairs, targets = pairs[:, 0], pairs[:, 1]
+            rows = np.array([row_of[s] for s in sources_of_pairs.tolist()], dtype=np.int64)
+            volumes = self.volume[sources_of_pairs, targets]
+            touched = np.concatenate([
+                self._walk(old_parent[rows], sources_of_pairs, targets, -volumes),
+                self._walk(self.tree.parent[sources_of_pairs], sources_of_pairs, targets, volumes)])
+            for slot in np.unique(touched).tolist():
+                self._refresh(slot)
+        return sources, old_parent, old_dist
+
+    def _checkpoint(self):
+        """Состояние рёбер до хода. Рёбер немного, поэтому проще скопировать его целиком."""
+        return ([array.copy() for array in self._edge_arrays()],
+                self.total_cost, self.overloaded, list(self.free_slots))
+
+    def _edge_arrays(self):
+        return self.flow, self.capacity, self.delay, self.cost, self.length, self.active, self.is_overloaded
+
+    def _undo(self, a: int, b: int, insert: bool, routes_record, checkpoint):
+        """Точно отменяет ход: строки деревьев путей, смежность и состояние рёбер."""
+        sources, old_parent, old_dist = routes_record
+        self.tree.parent[sources] = old_parent
+        self.tree.dist[sources] = old_dist
+        if insert:
+            self.tree.adj[a].remove(b)
+            self.tree.adj[b].remove(a)
+        else:
+            self.tree._link(a, b)
+        arrays, self.total_cost, self.overloaded, self.free_slots = checkpoint
+        # Массивы могли вырасти при добавлении ребра - дополняем сохраненные нулями
+        size = len(self.flow)
+        (self.flow, self.capacity, self.delay, self.cost, self.length, self.active, self.is_overloaded) = [
+            np.concatenate([saved, np.zeros(size - len(saved), dtype=saved.dtype)]) for saved in arrays]
+
+    def _add_edge(self, a: int, b: int):
+        checkpoint = self._checkpoint()
+        length = float(np.hypot(*(self.positions[a] - self.positions[b])))
+        slot = self._new_slot(a, b, length)
+        self._refresh(slot)
+        return slot, (self._update_routes(a, b, insert=True), checkpoint)
+
+    def _undo_add_edge(self, slot: int, record):
+        a, b = self.slot_u[slot], self.slot_v[slot]
+        self._undo(a, b, True, *record)
+        self.edge_id[a, b] = self.edge_id[b, a] = -1
+
+    def _remove_edge(self, slot: int):
+        checkpoint = self._checkpoint()
+        a, b = self.slot_u[slot], self.slot_v[slot]
+        routes_record = self._update_routes(a, b, insert=False)
+        # Весь трафик ушел с ребра, теперь его можно убрать из учета
+        self.total_cost -= self.cost[slot]
+        self.overloaded -= int(self.is_overloaded[slot])
+        self.edge_id[a, b] = self.edge_id[b, a] = -1
+        self.active[slot] = self.is_overloaded[slot] = False
+        self.flow[slot] = self.capacity[slot] = self.delay[slot] = self.cost[slot] = 0.0
+        self.free_slots.append(slot)
+        return routes_record, checkpoint
+
+    def _undo_remove_edge(self, slot: int, record):
+        a, b = self.slot_u[slot], self.slot_v[slot]
+        self._undo(a, b, False, *record)
+        self.edge_id[a, b] = self.edge_id[b, a] = slot
+
+    # --- Оценка ---
+
+    def max_delay(self) -> float:
+        """
+        Максимальная сквозная задержка по требованиям: пути всех требований
+        проходятся одновременно, по одному шагу к источнику за итерацию.
+        """
+        sources, targets = self.demand_sources, self.demand_targets
+        reachable = self.tree.dist[sources, targets] < UNREACHABLE
+        sources, targets = sources[reachable], targets[reachable]
+        if not sources.size:
+            return 0.0
+        total = np.zeros(len(sources))
+        current = targets.copy()
+        active = np.arange(len(sources))
+        while active.size:
+            previous = self.tree.parent[sources[active], current[active]]
+            total[active] += self.delay[self.edge_id[previous, current[active]]]
+            current[active] = previous
+            active = active[previous != sources[active]]
+        return float(total.max())
+
+    def score(self, delay_budget: float):
+        """Оценка для сравнения: перегрузки, превышение бюджета задержки, стоимость."""
+        over_budget = max(0.0, self.max_delay() - delay_budget)
+        return self.overloaded, over_budget, round(self.total_cost, 6)
+
+    # --- Выбор ходов ---
+
+    def _utilization(self) -> np.ndarray:
+        slots = np.nonzero(self.active)[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = np.where(self.capacity[slots] > 0, self.flow[slots] / self.capacity[slots],
+                                   np.where(self.flow[slots] > 0, np.inf, 0.0))
+        return slots, utilization
+
+    def saturated_cut(self, threshold: float):
+        """
+        Самый насыщенный разрез: добавляем рёбра по возрастанию загрузки, пока
+        граф не станет связным. Последнее ребро замыкает разрез, все рёбра
+        которого загружены не меньше него. Возвращает маску одной стороны
+        разреза или None, если загрузка разреза ниже threshold.
+        """
+        n = len(self.node_ids)
+        slots, utilization = self._utilization()
+        order = np.argsort(utilization, kind='stable')
+        root = list(range(n))
+
+        def find(x):
+            while root[x] != x:
+                root[x] = root[root[x]]
+                x = root[x]
+            return x
+
+        components = n
+        for i in order.tolist():
+            slot = int(slots[i])
+            ra, rb = find(self.slot_u[slot]), find(self.slot_v[slot])
+            if ra == rb:
+                continue
+            if components == 2:
+                if utilization[i] < threshold:
+                    return None
+                return np.array([find(x) == ra for x in range(n)])
+            root[ra] = rb
+            components -= 1
+        return None
+
+    def _addition_candidates(self, side: np.ndarray) -> List[tuple]:
+        """Самые короткие (дешевые) новые каналы через разрез."""
+        left, right = np.nonzero(side)[0], np.nonzero(~side)[0]
+        slots, utilization = self._utilization()
+        # Концы насыщенных рёбер нагружены сильнее всего - новый канал лучше вести в обход них
+        near_cut = np.zeros(len(self.node_ids), dtype=bool)
+        saturated = slots[utilization >= self.saturation_threshold]
+        near_cut[[self.slot_u[s] for s in saturated]] = True
+        near_cut[[self.slot_v[s] for s in saturated]] = True
+
+        delta = self.positions[left][:, None, :] - self.positions[right][None, :, :]
+        lengths = np.hypot(delta[..., 0], delta[..., 1])
+        lengths[self.edge_id[np.ix_(left, right)] >= 0] = np.inf
+        for a, b in self.rejected_additions:
+            if side[a] and not side[b]:
+                lengths[np.searchsorted(left, a), np.searchsorted(right, b)] = np.inf
+            elif side[b] and not side[a]:
+                lengths[np.searchsorted(left, b), np.searchsorted(right, a)] = np.inf
+        preferred = np.where(near_cut[left][:, None] | near_cut[right][None, :], np.inf, lengths)
+        if np.isfinite(preferred).any():
+            lengths = preferred
+        candidates = []
+        for flat in np.argsort(lengths, axis=None)[:CANDIDATES_PER_ITERATION].tolist():
+            i, j = divmod(flat, len(right))
+            if np.isfinite(lengths[i, j]):
+                candidates.append((int(left[i]), int(right[j])))
+        return candidates
+
+    def _is_bridge(self, slot: int) -> bool:
+        """Ребро - мост, если без него его концы не связаны (обход в ширину)."""
+        a, b = self.slot_u[slot], self.slot_v[slot]
+        seen = {a}
+        queue = deque([a])
+        while queue:
+            x = queue.popleft()
+            for y in self.tree.adj[x]:
+                if (x == a and y == b) or (x == b and y == a) or y in seen:
+                    continue
+                if y == b:
+                    return False
+                seen.add(y)
+                queue.append(y)
+        return True
+
+    def _removal_candidates(self) -> List[int]:
+        """Недогруженные каналы, начиная с самых дорогих."""
+        slots, utilization = self._utilization()
+        underused = slots[utilization < self.underuse_threshold]
+        order = underused[np.argsort(-self.cost[underused], kind='stable')]
+        candidates = []
+        for slot in order.tolist():
+            key = (self.slot_u[slot], self.slot_v[slot])
+            if key in self.rejected_removals or self._is_bridge(slot):
+                continue
+            candidates.append(slot)
+            if len(candidates) == CANDIDATES_PER_ITERATION:
+                break
+        return candidates
+
+    # --- Основной цикл ---
+
+    def run(self, delay_budget: float | None = None, max_iterations: int = 1000,
+            progress: Callable[[int, float, float], None] | None = None) -> TopologyOptimizationResult:
+        """
+        Повторяет ходы, пока хоть один улучшает оценку. Бюджет задержки по умолчанию -
+        текущая максимальная задержка, то есть ищем удешевление без ухудшения задержки.
+        """
+        initial_cost, initial_delay = self.total_cost, self.max_delay()
+        if delay_budget is None:
+            delay_budget = initial_delay
+        current = self.score(delay_budget)
+        iterations = 0
+        while iterations < max_iterations:
+            iterations += 1
+            tried = False
+            improved = False
+
+            # Пока есть перегрузки или бюджет задержки превышен, разгружаем самый
+            # загруженный разрез, даже если он еще не достиг порога насыщения
+            overloaded, over_budget, _ = current
+            threshold = 0.0 if overloaded or over_budget > 0 else self.saturation_threshold
+            side = self.saturated_cut(threshold)
+            for a, b in self._addition_candidates(side) if side is not None else []:
+                tried = True
+                slot, record = self._add_edge(a, b)
+                new_score = self.score(delay_budget)
+                if new_score < current:
+                    current, improved = new_score, True
+                    self.added += 1
+                else:
+                    self._undo_add_edge(slot, record)
+                    self.rejected_additions.add((a, b))
+
+            for slot in self._removal_candidates():
+                tried = True
+                record = self._remove_edge(slot)
+                new_score = self.score(delay_budget)
+                if new_score < current:
+                    current, improved = new_score, True
+                    self.removed += 1
+                else:
+                    self._undo_remove_edge(slot, record)
+                    self.rejected_removals.add((self.slot_u[slot], self.slot_v[slot]))
+
+            if improved:
+                # После удачного хода отвергнутые раньше кандидаты снова имеют шанс
+                self.rejected_additions.clear()
+                self.rejected_removals.clear()
+            if progress is not None:
+                progress(iterations, self.total_cost, self.max_delay())
+            if not tried:
+                break
+
+        return TopologyOptimizationResult(edges=self.result_edges(), route_trees=self.tree,
+                                          iterations=iterations, added=self.added, removed=self.removed,
+                                          initial_cost=initial_cost, final_cost=self.total_cost,
+                                          initial_max_delay=initial_delay, final_max_delay=self.max_delay(),
+                                          overloaded_edges=self.overloaded)
+
+    def result_edges(self) -> List[Edge]:
+        """Рёбра в исходном порядке (без удаленных), затем новые. Нетронутые рёбра - копии исходных."""
+        original, added = [], []
+        for slot in np.nonzero(self.active)[0].tolist():
+            capacity = float(self.capacity[slot])
+            values = dict(capacity=int(capacity) if capacity.is_integer() else capacity, flow=float(self.flow[slot]),
+                          cost=float(self.cost[slot]), length=float(self.length[slot]), delay=0.0)
+            edge = self.slot_edge[slot]
+            if edge is not None:
+                unchanged = (edge.flow == self.flow[slot] and edge.capacity == self.capacity[slot]
+                             and edge.cost == self.cost[slot])
+                original.append((self.edge_order[id(edge)], replace(edge) if unchanged else replace(edge, **values)))
+            else:
+                added.append(Edge(from_id=self.node_ids[self.slot_u[slot]], to_id=self.node_ids[self.slot_v[slot]],
+                                  **values))
+        original.sort(key=lambda item: item[0])
+        return [edge for _, edge in original] + added
@@ -0,0 +1,74 @@
+# topology_versions.py
+
+from typing import Dict, Tuple
+
+# Что может меняться в проекте. У каждого раздела свой счетчик версий.
+NODES = "nodes"              # состав узлов
+NODE_ATTRS = "node_attrs"    # имя и стоимость узлов
+POSITIONS = "positions"      # координаты узлов
+EDGES = "edges"              # состав рёбер
+DEMANDS = "demands"          # матрица нагрузки
+CAPACITIES = "capacities"    # потоки, пропускные способности и стоимости рёбер
+PACKET_SIZE = "packet_size"  # avg_packet_size_bits
+THRESHOLDS = "thresholds"    # уровни высокой нагрузки и перегрузки
+ROUTING_MODE = "routing_mode"  # один путь, все равноценные пути (ECMP) или перераспределение с учетом нагрузки
+
+ALL_SECTIONS = (NODES, NODE_ATTRS, POSITIONS, EDGES, DEMANDS, CAPACITIES, PACKET_SIZE, THRESHOLDS,
+                ROUTING_MODE)
+
+# От каких разделов зависит каждый результат
+ROUTES_DEPENDS_ON = (NODES, EDGES)
+FLOWS_DEPENDS_ON = (NODES, EDGES, DEMANDS, CAPACITIES, ROUTING_MODE)
+DELAYS_DEPENDS_ON = (NODES, EDGES, CAPACITIES, PACKET_SIZE)
+DEMAND_DELAYS_DEPENDS_ON = FLOWS_DEPENDS_ON + (PACKET_SIZE,)
+COSTS_DEPENDS_ON = (NODES, NODE_ATTRS, EDGES, CAPACITIES)
+# Задержки при пакете в 1 бит для сравнения сценариев от размера пакета не зависят
+SWEEP_DEPENDS_ON = FLOWS_DEPENDS_ON
+
+
+class TopologyVersions:
+    """Счетчики изменений по разделам проекта."""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = dict.fromkeys(ALL_SECTIONS, 0)
+
+    def bump(self, *sections: str):
+        for section in sections:
+            self.counters[section] += 1
+
+    def bump_all(self):
+        self.bump(*ALL_SECTIONS)
+
+    def snapshot(self, sections: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self.counters[section] for section in sections)
+
+
+class ResultCache:
+    """
+    Кэш результатов расчетов. Каждый результат хранится вместе с версиями
+    разделов, от которых он зависит, и считается устаревшим, как только
+    хотя бы один из этих разделов изменился.
+    """
+
+    def __init__(self, versions: TopologyVersions):
+        self.versions = versions
+        self._entries: Dict[str, tuple] = {}
+
+    def get(self, name: str, depends_on: Tuple[str, ...]):
+        """Возвращает актуальный результат или None."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        stored_versions, value = entry
+        if stored_versions != self.versions.snapshot(depends_on):
+            return None
+        return value
+
+    def put(self, name: str, depends_on: Tuple[str, ...], value):
+        self._entries[name] = (self.versions.snapshot(depends_on), value)
+
+    def is_valid(self, name: str, depends_on: Tuple[str, ...]) -> bool:
+        return self.get(name, depends_on) is not None
+
+    def clear(self):
+        self._entries.clear()
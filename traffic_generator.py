@@ -0,0 +1,152 @@
+# traffic_generator.py
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from data_models import Node, TrafficDemand
+from instrumentation import timed, count
+
+# Модели синтетической матрицы нагрузки
+GRAVITY = "gravity"
+UNIFORM = "uniform"
+HOTSPOT = "hotspot"
+TRAFFIC_MODELS = {
+    GRAVITY: "Гравитационная (веса узлов и расстояние)",
+    UNIFORM: "Равномерная",
+    HOTSPOT: "С узлами-концентраторами",
+}
+# Откуда берется "масса" узла в гравитационной модели и при выборе концентраторов
+WEIGHT_COST = "cost"
+WEIGHT_EQUAL = "equal"
+NODE_WEIGHTS = {
+    WEIGHT_COST: "Стоимость узла",
+    WEIGHT_EQUAL: "Одинаковые",
+}
+# Сколько ячеек матрицы (строки x N) считаем за раз - блок помещается в кэш процессора
+BLOCK_ELEMENTS = 262_144
+# Расстояние между узлами в одной точке холста - как до соседнего пикселя
+MIN_DISTANCE = 1.0
+
+
+@dataclass
+class TrafficModel:
+    """Параметры синтетической матрицы нагрузки."""
+    kind: str = GRAVITY
+    total_volume: float = 1000.0      # сумма всех требований до отсева мелких, Мбит/с
+    weights: str = WEIGHT_COST
+    distance_exponent: float = 2.0    # гравитация: объем ~ w_i * w_j / d^exponent
+    hotspot_count: int = 3            # концентраторы - узлы с наибольшим весом
+    hotspot_share: float = 0.5        # доля общего объема сверх равномерного фона - к концентраторам и от них
+    min_volume: float = 0.0           # требования меньше этого объема отбрасываются, Мбит/с
+
+
+@dataclass
+class GeneratedTraffic:
+    """Ненулевые ячейки матрицы нагрузки: строки и столбцы в порядке id узлов, как на Этапе 3."""
+    node_ids: List[int]
+    rows: np.ndarray
+    columns: np.ndarray
+    volumes: np.ndarray
+    dropped_volume: float             # сумма отброшенных по min_volume требований
+
+    @property
+    def demand_count(self) -> int:
+        return len(self.volumes)
+
+    @property
+    def total_volume(self) -> float:
+        return float(self.volumes.sum())
+
+    def demands(self) -> List[TrafficDemand]:
+        ids = self.node_ids
+        return [TrafficDemand(from_id=ids[i], to_id=ids[j], volume=volume)
+                for i, j, volume in zip(self.rows.tolist(), self.columns.tolist(), self.volumes.tolist())]
+
+
+def node_weights(nodes: List[Node], source: str) -> np.ndarray:
+    if source == WEIGHT_EQUAL:
+        return np.ones(len(nodes))
+    if source == WEIGHT_COST:
+        weights = np.array([max(float(node.cost), 0.0) for node in nodes])
+        if not weights.any():
+            raise ValueError("У всех узлов нулевая стоимость - задайте стоимости или выберите одинаковые веса.")
+        return weights
+    raise ValueError(f"Неизвестный источник весов узлов: {source}")
+
+
+def _block_values(model: TrafficModel, first: int, last: int, x: np.ndarray, y: np.ndarray,
+                  weights: np.ndarray, hot: np.ndarray) -> np.ndarray:
+    """Ненормированные объемы строк first..last-1 матрицы; диагональ нулевая."""
+    n = len(x)
+    if model.kind == GRAVITY:
+        # Квадрат расстояния без корня: d^exponent = (d^2)^(exponent/2), для exponent = 2 - просто d^2
+        values = x[first:last, None] - x
+        np.square(values, out=values)
+        dy = y[first:last, None] - y
+        np.square(dy, out=dy)
+        values += dy
+        np.maximum(values, MIN_DISTANCE ** 2, out=values)
+        if model.distance_exponent != 2:
+            np.power(values, model.distance_exponent / 2, out=values)
+        np.divide(weights, values, out=values)
+        values *= weights[first:last, None]
+    elif model.kind == UNIFORM:
+        values = np.ones((last - first, n))
+    elif model.kind == HOTSPOT:
+        # Равномерный фон (1 - share) плюс share, поровну разделенная между парами,
+        # у которых хотя бы один конец - концентратор
+        k = int(hot.sum())
+        hot_pairs = n * (n - 1) - (n - k) * (n - k - 1)
+        share = min(max(model.hotspot_share, 0.0), 1.0) if hot_pairs else 0.0
+        values = np.full((last - first, n), (1 - share) / max(1, n * (n - 1)))
+        if hot_pairs:
+            values += (share / hot_pairs) * (hot[first:last, None] | hot)
+    else:
+        raise ValueError(f"Неизвестная модель нагрузки: {model.kind}")
+    values[np.arange(last - first), np.arange(first, last)] = 0.0
+    return values
+
+
+@timed("traffic_generation")
+def generate_traffic(nodes: Dict[int, Node], model: TrafficModel) -> GeneratedTraffic:
+    """
+    Матрица нагрузки по модели, векторно по блокам строк: первый проход - сумма
+    ненормированной матрицы, второй - масштаб к total_volume, отсев мелких
+    требований и сбор ненулевых ячеек. Вся матрица N x N в памяти не хранится.
+    """
+    ids = sorted(nodes)
+    ordered = [nodes[node_id] for node_id in ids]
+    n = len(ids)
+    x = np.array([node.position[0] for node in ordered], dtype=np.float64)
+    y = np.array([node.position[1] for node in ordered], dtype=np.float64)
+    weights = node_weights(ordered, model.weights)
+    hot = np.zeros(n, dtype=bool)
+    if model.kind == HOTSPOT:
+        # Наибольший вес, при равенстве - меньший id
+        hot[np.argsort(-weights, kind='stable')[:max(0, model.hotspot_count)]] = True
+    block = max(1, BLOCK_ELEMENTS // max(1, n))
+
+    total = 0.0
+    for first in range(0, n, block):
+        total += float(_block_values(model, first, min(n, first + block), x, y, weights, hot).sum())
+    scale = model.total_volume / total if total > 0 else 0.0
+
+    rows, columns, volumes = [], [], []
+    dropped = 0.0
+    for first in range(0, n, block):
+        values = _block_values(model, first, min(n, first + block), x, y, weights, hot) * scale
+        small = values < model.min_volume
+        dropped += float(values[small].sum())
+        block_rows, block_columns = np.nonzero((values > 0) & ~small)
+        rows.append(block_rows + first)
+        columns.append(block_columns)
+        volumes.append(values[block_rows, block_columns])
+    count("nodes", n)
+    result = GeneratedTraffic(node_ids=ids, rows=np.concatenate(rows) if rows else np.empty(0, dtype=np.int64),
+                              columns=np.concatenate(columns) if columns else np.empty(0, dtype=np.int64),
+                              volumes=np.concatenate(volumes) if volumes else np.empty(0),
+                              dropped_volume=dropped)
+    count("demands", result.demand_count)
+    return result
@@ -0,0 +1,80 @@
+# traffic_generator_dialog.py
+
+from dataclasses import replace
+
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLabel, QComboBox, QDoubleSpinBox, QSpinBox,
+                             QDialogButtonBox)
+
+from traffic_generator import TrafficModel, TRAFFIC_MODELS, NODE_WEIGHTS, GRAVITY, HOTSPOT
+
+
+class TrafficGeneratorDialog(QDialog):
+    """Параметры синтетической матрицы нагрузки для Этапа 3."""
+
+    def __init__(self, model: TrafficModel, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Синтетическая матрица нагрузки")
+        self.model = model
+
+        self.kind_combo = QComboBox()
+        for kind, title in TRAFFIC_MODELS.items():
+            self.kind_combo.addItem(title, kind)
+        self.kind_combo.setCurrentIndex(self.kind_combo.findData(model.kind))
+        self.total_spin = QDoubleSpinBox()
+        self.total_spin.setRange(0.001, 1e9)
+        self.total_spin.setDecimals(3)
+        self.total_spin.setValue(model.total_volume)
+        self.weights_combo = QComboBox()
+        for source, title in NODE_WEIGHTS.items():
+            self.weights_combo.addItem(title, source)
+        self.weights_combo.setCurrentIndex(self.weights_combo.findData(model.weights))
+        self.exponent_spin = QDoubleSpinBox()
+        self.exponent_spin.setRange(0.0, 6.0)
+        self.exponent_spin.setSingleStep(0.5)
+        self.exponent_spin.setValue(model.distance_exponent)
+        self.hotspot_count_spin = QSpinBox()
+        self.hotspot_count_spin.setRange(1, 1_000_000)
+        self.hotspot_count_spin.setValue(model.hotspot_count)
+        self.hotspot_share_spin = QDoubleSpinBox()
+        self.hotspot_share_spin.setRange(0.0, 100.0)
+        self.hotspot_share_spin.setDecimals(1)
+        self.hotspot_share_spin.setValue(model.hotspot_share * 100)
+        self.min_volume_spin = QDoubleSpinBox()
+        self.min_volume_spin.setRange(0.0, 1e9)
+        self.min_volume_spin.setDecimals(4)
+        self.min_volume_spin.setValue(model.min_volume)
+        self.min_volume_spin.setToolTip("На больших сетях отсев мелких требований сокращает их число на порядки")
+
+        form = QFormLayout()
+        form.addRow(QLabel("Модель:"), self.kind_combo)
+        form.addRow(QLabel("Суммарная нагрузка (Мбит/с):"), self.total_spin)
+        form.addRow(QLabel("Вес узла:"), self.weights_combo)
+        form.addRow(QLabel("Показатель степени расстояния:"), self.exponent_spin)
+        form.addRow(QLabel("Число концентраторов:"), self.hotspot_count_spin)
+        form.addRow(QLabel("Доля нагрузки концентраторов (%):"), self.hotspot_share_spin)
+        form.addRow(QLabel("Минимальный объем требования (Мбит/с):"), self.min_volume_spin)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+
+        self.kind_combo.currentIndexChanged.connect(self.update_fields)
+        self.update_fields()
+
+    def update_fields(self):
+        """Доступны только параметры выбранной модели."""
+        kind = self.kind_combo.currentData()
+        self.weights_combo.setEnabled(kind in (GRAVITY, HOTSPOT))
+        self.exponent_spin.setEnabled(kind == GRAVITY)
+        self.hotspot_count_spin.setEnabled(kind == HOTSPOT)
+        self.hotspot_share_spin.setEnabled(kind == HOTSPOT)
+
+    def get_model(self) -> TrafficModel:
+        return replace(self.model, kind=self.kind_combo.currentData(), total_volume=self.total_spin.value(),
+                       weights=self.weights_combo.currentData(), distance_exponent=self.exponent_spin.value(),
+                       hotspot_count=self.hotspot_count_spin.value(),
+                       hotspot_share=self.hotspot_share_spin.value() / 100,
+                       min_volume=self.min_volume_spin.value())
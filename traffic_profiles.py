@@ -0,0 +1,156 @@
+# traffic_profiles.py
+
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import openpyxl
+
+from data_models import TrafficDemand
+from dynamic_routes import DynamicHopRoutes, UNREACHABLE
+from ecmp_routing import ecmp_edge_flows
+from instrumentation import timed, count
+from network_arrays import TopologyArrays, mm1_delays
+
+# Сколько элементов массива нагрузок (источники x узлы x срезы) обрабатываем за раз
+BLOCK_ELEMENTS = 8_000_000
+
+
+@dataclass
+class TrafficProfile:
+    """Суточный профиль нагрузки: матрица на каждый срез времени."""
+    slice_names: List[str]
+    node_ids: List[int]          # порядок строк и столбцов матриц - id узлов по возрастанию, как на Этапе 3
+    volumes: np.ndarray          # (срезы, N, N), Мбит/с; диагональ нулевая
+
+    @property
+    def slice_count(self) -> int:
+        return len(self.slice_names)
+
+    def peak_slice(self) -> int:
+        """Час наибольшей нагрузки: срез с наибольшим суммарным объемом."""
+        return int(np.argmax(self.volumes.sum(axis=(1, 2))))
+
+    def demands(self, slice_index: int) -> List[TrafficDemand]:
+        """Требования одного среза в том же порядке, в каком их создает чтение матрицы на Этапе 3."""
+        matrix = self.volumes[slice_index]
+        rows, columns = np.nonzero(matrix > 0)
+        ids = self.node_ids
+        return [TrafficDemand(from_id=ids[i], to_id=ids[j], volume=float(matrix[i, j]))
+                for i, j in zip(rows.tolist(), columns.tolist())]
+
+
+@timed("excel_read_profile")
+def load_traffic_profile(file_name: str, node_ids: List[int]) -> TrafficProfile:
+    """
+    Книга Excel, в которой каждый лист - БЕЗЗАГОЛОВОЧНАЯ матрица нагрузки одного
+    среза времени (24 или 96 листов на сутки) в формате Этапа 3. Лишние строки
+    и столбцы отбрасываются, пустые и нечисловые ячейки - нулевая нагрузка.
+    """
+    ids = sorted(node_ids)
+    n = len(ids)
+    workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        names = list(workbook.sheetnames)
+        volumes = np.zeros((len(names), n, n))
+        for s, name in enumerate(names):
+            sheet = workbook[name]
+            for i, row in enumerate(sheet.iter_rows(max_row=n, max_col=n, values_only=True)):
+                volumes[s, i, :len(row)] = [v if isinstance(v, (int, float)) and v > 0 else 0.0 for v in row]
+    finally:
+        workbook.close()
+    volumes[:, np.arange(n), np.arange(n)] = 0.0
+    count("slices", len(names))
+    return TrafficProfile(slice_names=names, node_ids=ids, volumes=volumes)
+
+
+@dataclass
+class SliceFlows:
+    """Потоки рёбер во всех срезах профиля."""
+    slice_names: List[str]
+    flows: np.ndarray            # (срезы, E), Мбит/с, рёбра в порядке topology
+
+    @property
+    def peak_flows(self) -> np.ndarray:
+        """Наибольший поток каждого ребра за сутки - по нему подбирается пропускная способность."""
+        return self.flows.max(axis=0)
+
+    def view(self, capacity: np.ndarray, avg_packet_size_bits: int) -> "SliceView":
+        utilization = np.divide(self.flows, capacity, out=np.zeros_like(self.flows), where=capacity > 0)
+        return SliceView(slice_names=self.slice_names, utilization=utilization,
+                         delays=mm1_delays(self.flows, capacity, avg_packet_size_bits))
+
+
+@dataclass
+class SliceView:
+    """Загрузка и задержка каждого ребра в каждом срезе - холст только выбирает строку."""
+    slice_names: List[str]
+    utilization: np.ndarray      # (срезы, E)
+    delays: np.ndarray           # (срезы, E), мс; inf - перегрузка
+
+
+@timed("slice_edge_flows")
+def slice_edge_flows(topology: TopologyArrays, route_trees: DynamicHopRoutes, profile: TrafficProfile) -> SliceFlows:
+    """
+    Потоки всех срезов за один проход по деревьям маршрутов. Для каждого источника
+    нагрузка поддерева узла (его требования плюс транзит через него) накапливается
+    от дальних уровней дерева к ближним; поток ребра (предок, узел) - нагрузка
+    поддерева узла. Вместо числа в каждом узле хранится вектор по срезам, поэтому
+    все срезы считаются теми же операциями, что и один. Источники - блоками.
+    route_trees должны иметь ту же нумерацию узлов, что и topology.
+    """
+    slices, n = profile.slice_count, topology.node_count
+    flows = np.zeros((topology.edge_count, slices))
+    find_edge = topology.edge_lookup()
+    # Строка матрицы профиля для каждого узла topology (узлы не из профиля - пустая строка)
+    positions = {node_id: i for i, node_id in enumerate(profile.node_ids)}
+    rows_of = np.array([positions.get(node_id, -1) for node_id in topology.node_ids], dtype=np.int64)
+    present = rows_of >= 0
+    active = np.zeros(n, dtype=bool)
+    active[present] = profile.volumes[:, rows_of[present], :].any(axis=(0, 2))
+    sources = np.nonzero(active)[0]
+    block = max(1, BLOCK_ELEMENTS // max(1, n * slices))
+
+    for first in range(0, len(sources), block):
+        rows = sources[first:first + block]
+        dist = route_trees.dist[rows]
+        parent = route_trees.parent[rows]
+        # Нагрузка поддерева: строка (номер источника в блоке * N + узел), столбец - срез
+        load = np.zeros((len(rows), n, slices))
+        load[:, present, :] = profile.volumes[:, rows_of[rows], :][:, :, rows_of[present]].transpose(1, 2, 0)
+        load = load.reshape(len(rows) * n, slices)
+        row_ids, node_ids = np.nonzero((dist > 0) & (dist < UNREACHABLE))
+        if not len(node_ids):
+            continue
+        levels = dist[row_ids, node_ids]
+        order = np.argsort(-levels, kind='stable')
+        row_ids, node_ids, levels = row_ids[order], node_ids[order], levels[order]
+        children = row_ids * n + node_ids
+        parents = row_ids * n + parent[row_ids, node_ids]
+        bounds = np.concatenate(([0], np.nonzero(np.diff(levels))[0] + 1, [len(levels)]))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            # Дети одного предка складываются одной reduceat по отсортированным предкам
+            level_parents = parents[start:stop]
+            order = np.argsort(level_parents, kind='stable')
+            grouped = level_parents[order]
+            heads = np.concatenate(([0], np.nonzero(np.diff(grouped))[0] + 1))
+            load[grouped[heads]] += np.add.reduceat(load[children[start:stop][order]], heads, axis=0)
+
+        # Поток ребра - сумма нагрузок поддеревьев под ним по всем источникам блока
+        edges = find_edge(parent[row_ids, node_ids], node_ids)
+        order = np.argsort(edges, kind='stable')
+        grouped = edges[order]
+        heads = np.concatenate(([0], np.nonzero(np.diff(grouped))[0] + 1))
+        flows[grouped[heads]] += np.add.reduceat(load[children[order]], heads, axis=0)
+
+    count("slices", slices)
+    count("sources", len(sources))
+    return SliceFlows(slice_names=profile.slice_names, flows=np.ascontiguousarray(flows.T))
+
+
+@timed("slice_edge_flows_ecmp")
+def slice_edge_flows_ecmp(topology: TopologyArrays, profile: TrafficProfile, split: str) -> SliceFlows:
+    """То же для маршрутизации по равноценным путям: ECMP-проход для каждого среза."""
+    flows = np.array([ecmp_edge_flows(topology, profile.demands(s), split)[0] for s in range(profile.slice_count)])
+    count("slices", profile.slice_count)
+    return SliceFlows(slice_names=profile.slice_names, flows=flows.reshape(profile.slice_count, topology.edge_count))